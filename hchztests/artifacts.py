@@ -0,0 +1,213 @@
+"""
+save the artifacts of failed tests, like screenshots, page source,
+HAR files and browser console logs, without blocking teardown.
+
+the browser state is captured in the test's finalizer, while the
+browser is still on the failing page. the captured data is handed to
+an ArtifactWriter, which compresses and writes it to disk from a
+background thread. every failure gets its own file names, built from
+the test's node id, so repeated failures of tests in the same class
+don't overwrite each other.
+"""
+
+import Queue
+import gzip
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+
+# artifacts in formats that are already compressed are written as is
+PRECOMPRESSED = ['png','jpg','gz','mp4']
+
+
+def artifact_basename(nodeid,seq=None):
+    """
+    build a file name base, unique within the run, from a test's
+    node id, like
+    test_website_tags.py::TestTags::test_tags_faq ->
+    test_website_tags.TestTags.test_tags_faq-20141104-153012-4112-1
+    """
+
+    name = re.sub(r'\.py::','.',nodeid)
+    name = re.sub(r'::|/','.',name)
+    name = re.sub(r'[^\w.\-\[\]]+','_',name).strip('._')
+
+    parts = [name[:150],time.strftime('%Y%m%d-%H%M%S'),str(os.getpid())]
+    if seq is not None:
+        parts.append(str(seq))
+
+    return '-'.join(parts)
+
+
+def _serialize(data):
+
+    if isinstance(data,unicode):
+        return data.encode('utf-8')
+    if isinstance(data,str):
+        return data
+    return json.dumps(data,indent=2,default=str)
+
+
+def capture_browser_artifacts(browser):
+    """
+    capture the state of a hubcheck browser, returning a list of
+    (extension,data) tuples. artifacts the browser can't provide,
+    like console logs from some drivers, are left out.
+    """
+
+    captures = [
+        ('png',lambda: browser._browser.get_screenshot_as_png()),
+        ('html',lambda: browser._browser.page_source),
+        ('har.json',lambda: browser.proxy_client.har),
+        ('console.json',lambda: browser._browser.get_log('browser')),
+    ]
+
+    artifacts = []
+    for ext,capture in captures:
+        try:
+            data = capture()
+        except Exception:
+            continue
+        if data is not None:
+            artifacts.append((ext,data))
+
+    return artifacts
+
+
+class ArtifactWriter(object):
+    """
+    write artifacts to directory from a background thread.
+
+    submit() only queues the data and returns. if more than
+    max_pending artifacts are waiting, new ones are dropped instead of
+    blocking the caller. compresslevel sets the gzip compression of
+    the artifacts, 0 writes them uncompressed.
+    """
+
+    def __init__(self,directory,compresslevel=6,max_pending=100):
+
+        self.directory = directory
+        self.compresslevel = compresslevel
+
+        self.written = []
+        self.errors = []
+        self.dropped = 0
+
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queue = Queue.Queue(max_pending)
+        self._thread = None
+
+
+    def basename(self,nodeid):
+        """
+        return a file name base for the artifacts of one failure
+        """
+
+        with self._lock:
+            seq = next(self._seq)
+
+        return artifact_basename(nodeid,seq)
+
+
+    def submit(self,basename,ext,data):
+        """
+        queue data to be written to basename.ext
+        """
+
+        self._start()
+
+        try:
+            self._queue.put_nowait((basename,ext,data))
+        except Queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+    def _start(self):
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+
+    def _run(self):
+
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+
+    def _write(self,basename,ext,data):
+
+        try:
+            if not os.path.isdir(self.directory):
+                try:
+                    os.makedirs(self.directory)
+                except OSError:
+                    # another writer made it first
+                    if not os.path.isdir(self.directory):
+                        raise
+
+            data = _serialize(data)
+            fn = os.path.join(self.directory,'%s.%s' % (basename,ext))
+
+            if self.compresslevel > 0 \
+               and ext.split('.')[-1] not in PRECOMPRESSED:
+                fn += '.gz'
+                f = gzip.GzipFile(fn,'wb',self.compresslevel)
+            else:
+                f = open(fn,'wb')
+
+            try:
+                f.write(data)
+            finally:
+                f.close()
+
+            with self._lock:
+                self.written.append(fn)
+
+        except Exception:
+            with self._lock:
+                self.errors.append('%s.%s: %s'
+                    % (basename,ext,sys.exc_info()[1]))
+
+
+    def flush(self):
+        """
+        wait for the queued artifacts to be written
+        """
+
+        if self._thread is not None:
+            self._queue.join()
+
+
+    def close(self,timeout=30):
+        """
+        write the queued artifacts and stop the writer thread, waiting
+        at most timeout seconds.
+        """
+
+        with self._lock:
+            thread,self._thread = self._thread,None
+
+        if thread is None:
+            return
+
+        try:
+            self._queue.put(None,True,timeout)
+        except Queue.Full:
+            return
+        thread.join(timeout)
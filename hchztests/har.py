@@ -0,0 +1,212 @@
+import json
+import os
+import re
+import urlparse
+
+
+# mime types of static assets that should be served compressed
+COMPRESSIBLE_TYPES = re.compile(
+    r'(text/css|javascript|ecmascript|image/svg|application/json'
+    + r'|font/(ttf|otf)|application/x-font-(ttf|otf))')
+
+# mime types and file extensions of static assets that should be cacheable
+STATIC_TYPES = re.compile(r'(text/css|javascript|ecmascript|image/|font/'
+                          + r'|application/(x-)?font)')
+STATIC_EXTENSIONS = re.compile(
+    r'\.(css|js|png|jpe?g|gif|svg|ico|woff2?|ttf|otf|eot)$')
+
+# compressible responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def _headers(message):
+
+    return dict([(h['name'].lower(),h['value'])
+                 for h in message.get('headers',[])])
+
+
+def _transferred(response):
+    """
+    return the number of bytes transferred for a response
+    """
+
+    size = response.get('_transferSize',-1)
+    if size is not None and size >= 0:
+        return size
+
+    size = 0
+    for name in ['headersSize','bodySize']:
+        value = response.get(name,-1)
+        if value is not None and value > 0:
+            size += value
+    return size
+
+
+def is_static(url,mimetype):
+
+    path = urlparse.urlsplit(url).path.lower()
+    return STATIC_TYPES.search(mimetype or '') is not None \
+        or STATIC_EXTENSIONS.search(path) is not None
+
+
+def is_cacheable(headers):
+    """
+    check if response headers allow a browser to reuse the response
+    without asking the server again.
+    """
+
+    cache_control = headers.get('cache-control','').lower()
+
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return False
+
+    m = re.search(r'max-age\s*=\s*(\d+)',cache_control)
+    if m is not None:
+        return int(m.group(1)) > 0
+
+    return 'expires' in headers
+
+
+def page_weight(har):
+    """
+    measure the weight of the page recorded in har, a HAR dictionary.
+
+    returns a dictionary with the number of requests, the bytes
+    transferred, the size of the content before and after compression,
+    and the urls of static assets served uncompressed or uncacheable.
+    """
+
+    weight = {'requests'     : 0,
+              'transferred'  : 0,
+              'content_size' : 0,
+              'compressed'   : 0,
+              'uncompressed' : [],
+              'uncacheable'  : []}
+
+    for entry in har.get('log',{}).get('entries',[]):
+
+        url = entry['request']['url']
+        response = entry['response']
+        headers = _headers(response)
+        content = response.get('content',{})
+        mimetype = content.get('mimeType','') \
+            or headers.get('content-type','')
+        size = max(content.get('size',0) or 0,0)
+
+        weight['requests'] += 1
+        weight['transferred'] += _transferred(response)
+        weight['content_size'] += size
+
+        encoding = headers.get('content-encoding','').lower()
+        if encoding not in ['','identity']:
+            weight['compressed'] += 1
+
+        # only check responses that carried content
+        if response.get('status') != 200 or not is_static(url,mimetype):
+            continue
+
+        if encoding in ['','identity'] \
+           and COMPRESSIBLE_TYPES.search(mimetype) is not None \
+           and size >= MIN_COMPRESS_SIZE:
+            weight['uncompressed'].append(url)
+
+        if not is_cacheable(headers):
+            weight['uncacheable'].append(url)
+
+    return weight
+
+
+def load_budget(fn):
+    """
+    load a page weight budget file. the file holds a json dictionary
+    of budgets keyed by page type, with an optional 'default' budget.
+    each budget may set max_transferred, max_requests,
+    max_uncompressed and max_uncacheable.
+    """
+
+    fn = os.path.abspath(os.path.expanduser(os.path.expandvars(fn)))
+    with open(fn,'r') as f:
+        return json.load(f)
+
+
+def check_budget(page_type,weight,budget):
+    """
+    compare the weight of a page against its budget, returning a list
+    of problems. pages with no budget, and no default budget, pass.
+    """
+
+    limits = budget.get(page_type,budget.get('default'))
+    if limits is None:
+        return []
+
+    problems = []
+
+    for name,measured in [('transferred',weight['transferred']),
+                          ('requests',weight['requests'])]:
+        limit = limits.get('max_%s' % (name))
+        if limit is not None and measured > limit:
+            problems.append('%s page %s %s, over the budget of %s'
+                            % (page_type,name,measured,limit))
+
+    for name in ['uncompressed','uncacheable']:
+        limit = limits.get('max_%s' % (name))
+        if limit is not None and len(weight[name]) > limit:
+            problems.append('%s page serves %d %s static assets,'
+                            % (page_type,len(weight[name]),name)
+                            + ' over the budget of %s: %s'
+                            % (limit,', '.join(weight[name])))
+
+    return problems
+
+
+def cold_page_har(browser,url,title='page'):
+    """
+    load url in a restarted hubcheck browser, with an empty cache, and
+    return the HAR of the page load. assets a warm browser serves from
+    its cache never reach the proxy, so their size and headers would
+    be missing from the page weight.
+    """
+
+    # hubcheck starts a new browser, with a new profile,
+    # on the first get() after close()
+    browser.close()
+    browser.get('about:blank')
+
+    browser.proxy_client.new_har(title)
+    browser.get(url)
+
+    return browser.proxy_client.har
+
+
+class PageWeightGuard(object):
+    """
+    record the weight of pages in the suite's performance report and
+    check them against a budget file.
+    """
+
+    def __init__(self,budget_fn=None,perf_report=None):
+
+        self.budget = {}
+        if budget_fn is not None:
+            self.budget = load_budget(budget_fn)
+        self.perf_report = perf_report
+
+
+    def check(self,page_type,har):
+        """
+        measure the page in har, record it as page_type and return
+        the list of budget problems.
+        """
+
+        weight = page_weight(har)
+
+        if self.perf_report is not None:
+            self.perf_report.record('page_weight',page=page_type,
+                requests=weight['requests'],
+                transferred=weight['transferred'],
+                content_size=weight['content_size'],
+                compressed=weight['compressed'],
+                uncompressed=len(weight['uncompressed']),
+                uncacheable=len(weight['uncacheable']))
+
+        return check_budget(page_type,weight,self.budget)
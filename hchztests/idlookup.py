@@ -0,0 +1,118 @@
+from hchztests.perf import summarize
+
+
+# user and group lookups that go through nss, and through ldap
+# and nscd on most hubs. {username} is replaced by the account name.
+LOOKUP_COMMANDS = [
+    ('groups',       'groups {username}'),
+    ('id',           'id {username}'),
+    ('getent_group', 'getent group'),
+]
+
+
+def lookup_timing_script(username,commands,count):
+    """
+    build the command that times count runs of each of the lookup
+    commands, one command after the other. each run is timed with
+    the shell's time keyword, so no extra process is started.
+    """
+
+    parts = ['TIMEFORMAT=%3R;']
+
+    for name,command in commands:
+        command = command.format(username=username)
+        parts.append('for i in $(seq %d); do' % (count)
+                     + ' t=$( { time %s > /dev/null 2>&1 ; } 2>&1 );' \
+                     % (command)
+                     + ' echo "=HCTIME=> %s ${i} ${t}";' % (name)
+                     + ' done;')
+
+    parts.append('true')
+
+    return ' '.join(parts)
+
+
+def parse_lookup_timings(output):
+    """
+    parse the output of lookup_timing_script() into a dictionary of
+    {command name : [seconds of each run, in order]}
+    """
+
+    timings = {}
+
+    for line in output.splitlines():
+        fields = line.strip().split()
+        if len(fields) != 4 or fields[0] != '=HCTIME=>':
+            continue
+        try:
+            seconds = float(fields[3].replace(',','.'))
+        except ValueError:
+            continue
+        timings.setdefault(fields[1],[]).append((int(fields[2]),seconds))
+
+    return dict([(name,[s for i,s in sorted(runs)])
+                 for name,runs in timings.items()])
+
+
+def find_spikes(samples,factor=5.0,floor=0.05):
+    """
+    return the indices of samples that look like cache misses, those
+    more than factor times the median and longer than floor seconds.
+    """
+
+    median = summarize(samples).get('median')
+    if median is None:
+        return []
+
+    limit = max(median*factor,floor)
+    return [i for i,s in enumerate(samples) if s > limit]
+
+
+def summarize_lookups(samples,factor=5.0,floor=0.05):
+    """
+    describe the runs of one lookup command. the first run is reported
+    on its own, the rest are summarized as warm lookups, and warm runs
+    that spike like cache misses are counted.
+
+    the first run is not a cold lookup. logging in to the workspace
+    already looked up the user's groups, so nss and nscd have them.
+    """
+
+    if len(samples) == 0:
+        return {'count' : 0}
+
+    warm = samples[1:]
+    stats = summarize(warm)
+    spikes = find_spikes(warm,factor,floor)
+
+    return {'count'       : len(samples),
+            'first'       : samples[0],
+            'min'         : stats.get('min'),
+            'median'      : stats.get('median'),
+            'p95'         : stats.get('p95'),
+            'max'         : stats.get('max'),
+            'spikes'      : len(spikes),
+            'spike_times' : [warm[i] for i in spikes]}
+
+
+def benchmark_lookups(ws,username,count=20,commands=LOOKUP_COMMANDS,
+                      timeout_per_run=5):
+    """
+    time count runs of each lookup command for username in the
+    workspace shell ws, in one remote command. returns a dictionary
+    of {command name : summarize_lookups() result}.
+    """
+
+    oldtimeout = ws.timeout
+    ws.timeout = max(oldtimeout,count*len(commands)*timeout_per_run)
+
+    try:
+        output,es = ws.execute(lookup_timing_script(username,commands,count),
+                               fail_on_exit_code=False)
+    finally:
+        ws.timeout = oldtimeout
+
+    timings = parse_lookup_timings(output)
+
+    return dict([(name,summarize_lookups(timings.get(name,[])))
+                 for name,command in commands])
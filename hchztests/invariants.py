@@ -0,0 +1,121 @@
+"""
+check the relations between the caption and pagination counts of a
+listing page all at once.
+
+a counts record is a flat dictionary with the url of the page and the
+start, end and total caption and pagination counts, like
+counts_record() builds. invariants are (name,left,operator,right)
+tuples, where left and right name fields of the record or are numbers.
+"""
+
+import operator
+
+
+OPERATORS = {'==' : operator.eq,
+             '!=' : operator.ne,
+             '<=' : operator.le,
+             '<'  : operator.lt,
+             '>=' : operator.ge,
+             '>'  : operator.gt}
+
+
+def _relations(prefix):
+
+    return [('%s_start_lte_%s_end' % (prefix,prefix),
+                '%s_start' % (prefix),'<=','%s_end' % (prefix)),
+            ('%s_start_lte_%s_total' % (prefix,prefix),
+                '%s_start' % (prefix),'<=','%s_total' % (prefix)),
+            ('%s_end_lte_%s_total' % (prefix,prefix),
+                '%s_end' % (prefix),'<=','%s_total' % (prefix)),
+            ('%s_total_gte_zero' % (prefix),'%s_total' % (prefix),'>=',0),
+            ('%s_start_gte_zero' % (prefix),'%s_start' % (prefix),'>=',0),
+            ('%s_end_gte_zero' % (prefix),'%s_end' % (prefix),'>=',0)]
+
+
+# invariants of a page of a listing
+COUNT_INVARIANTS = \
+    [('compare_caption_pagination_%s_counts' % (c),
+        'caption_%s' % (c),'==','pagination_%s' % (c))
+     for c in ['start','end','total']] \
+    + _relations('caption') \
+    + _relations('pagination')
+
+# invariants of the caption counts of a listing showing all items
+DISPLAY_ALL_INVARIANTS = \
+    [('caption_start_lte_caption_end','caption_start','<=','caption_end'),
+     ('caption_start_lte_caption_total','caption_start','<=','caption_total'),
+     ('caption_end_equals_caption_total','caption_end','==','caption_total'),
+     ('caption_total_gte_zero','caption_total','>=',0),
+     ('caption_start_gte_zero','caption_start','>=',0)]
+
+
+def counts_record(url,caption=None,pagination=None):
+    """
+    build a counts record from (start,end,total) caption and
+    pagination counts.
+    """
+
+    record = {'url' : url}
+
+    for prefix,counts in [('caption',caption),('pagination',pagination)]:
+        if counts is None:
+            continue
+        (record['%s_start' % (prefix)],
+         record['%s_end' % (prefix)],
+         record['%s_total' % (prefix)]) = counts
+
+    return record
+
+
+def invariant_names(invariants):
+    """
+    return the names of invariants, for use as parametrized test ids
+    """
+
+    return [name for name,left,op,right in invariants]
+
+
+def evaluate(record,invariants):
+    """
+    evaluate every invariant against record, returning a dictionary
+    of {name : True if the invariant holds}.
+    """
+
+    def value(operand):
+        if isinstance(operand,basestring):
+            return record[operand]
+        return operand
+
+    return dict([(name,OPERATORS[op](value(left),value(right)))
+                 for name,left,op,right in invariants])
+
+
+def violations(record,invariants,names=None):
+    """
+    return a list describing each invariant record violates, in the
+    order of invariants. names limits the check to those invariants.
+    """
+
+    results = evaluate(record,invariants)
+
+    problems = []
+    for name,left,op,right in invariants:
+        if results[name] or (names is not None and name not in names):
+            continue
+        shown = ['%s = %s' % (o,record[o]) for o in [left,right]
+                 if isinstance(o,basestring)]
+        problems.append('%s: expected %s %s %s, %s'
+                        % (name,left,op,right,', '.join(shown)))
+
+    return problems
+
+
+def format_violations(record,problems):
+    """
+    describe all of the violations of record in one message
+    """
+
+    return 'while checking caption and pagination counts on %s,' \
+           % (record['url']) \
+           + ' %d invariant(s) failed:\n%s' \
+           % (len(problems),'\n'.join(problems))
@@ -0,0 +1,147 @@
+import re
+
+
+_exec_re = re.compile("(?:^|\n)exec'ing[^\n]+\n(.*)",re.DOTALL)
+_metrics_re = re.compile("=SUBMIT-METRICS=>.*$",re.MULTILINE)
+
+
+def parse_invoke_app_output(result):
+    """
+    return the output of the tool launched by invoke_app, with the
+    submit metrics stripped off, or None if invoke_app never exec'd
+    the tool.
+    """
+
+    matches = _exec_re.search(result)
+    if matches is None:
+        return None
+
+    toolout = _metrics_re.sub('',matches.group(1))
+    return toolout.strip()
+
+
+class XvfbServer(object):
+    """
+    a virtual X server running in a tool session container.
+
+    the server is started once and shared by every command that
+    needs a display, instead of starting a new server for each
+    command with xvfb-run. the server outlives the workspace shell
+    that started it, so other shells into the same container can
+    attach() to it.
+    """
+
+    def __init__(self,screen='800x600x24',first_display=99,timeout=10):
+
+        self.screen = screen
+        self.first_display = first_display
+        self.timeout = timeout
+        self.display = None
+        self.pid = None
+
+
+    def start(self,ws):
+        """
+        start the X server on the first free display number and
+        export DISPLAY in the workspace shell ws.
+        """
+
+        command = 'd=%s;' % (self.first_display) \
+            + ' while [ -e /tmp/.X${d}-lock ]; do d=$((d+1)); done;' \
+            + ' (nohup Xvfb :${d} -screen 0 %s -nolisten tcp' % (self.screen) \
+            + ' > /dev/null 2>&1 & echo ${d} $!)'
+
+        output,es = ws.execute(command)
+        display,pid = output.split()
+
+        # wait for the server to open its socket
+        command = 'for i in $(seq %d); do' % (self.timeout*10) \
+            + ' [ -e /tmp/.X11-unix/X%s ] && break; sleep 0.1; done;' \
+            % (display) \
+            + ' [ -e /tmp/.X11-unix/X%s ]' % (display)
+        output,es = ws.execute(command,fail_on_exit_code=False)
+        if es != 0:
+            ws.execute('kill %s' % (pid),fail_on_exit_code=False)
+            raise RuntimeError('Xvfb did not start on display :%s' \
+                % (display))
+
+        self.display = display
+        self.pid = pid
+        self.attach(ws)
+
+        return self
+
+
+    def alive(self,ws):
+        """
+        check if the X server is still running
+        """
+
+        if self.pid is None:
+            return False
+
+        output,es = ws.execute('kill -0 %s' % (self.pid),
+                               fail_on_exit_code=False)
+        return es == 0
+
+
+    def attach(self,ws):
+        """
+        point the workspace shell ws at the X server
+        """
+
+        ws.execute('export DISPLAY=:%s' % (self.display))
+
+
+    def stop(self,ws):
+
+        if self.pid is None:
+            return
+
+        ws.execute('kill %s' % (self.pid),fail_on_exit_code=False)
+        self.display = None
+        self.pid = None
+
+
+class InvokeAppRunner(object):
+    """
+    run invoke_app commands in a workspace shell whose DISPLAY
+    points at a shared X server.
+
+    each command runs in its own subshell, so the TOOL_PARAMETERS
+    file of one case does not leak into the next.
+    """
+
+    def __init__(self,ws,timeout=30):
+
+        self.ws = ws
+        self.timeout = timeout
+
+
+    def _subshell(self,command,parameters_path):
+
+        if parameters_path is not None:
+            command = 'export TOOL_PARAMETERS=%s; %s' \
+                % (parameters_path,command)
+
+        return '(%s)' % (command)
+
+
+    def run(self,command,parameters_path=None):
+        """
+        run one invoke_app command, returning the raw output, the
+        exit status and the parsed tool output.
+        """
+
+        # allow up to timeout seconds for the command to run
+        oldtimeout = self.ws.timeout
+        self.ws.timeout = self.timeout
+
+        try:
+            result,err = self.ws.execute(
+                self._subshell(command,parameters_path),
+                fail_on_exit_code=False)
+        finally:
+            self.ws.timeout = oldtimeout
+
+        return (result,err,parse_invoke_app_output(result))
@@ -0,0 +1,207 @@
+"""
+generate website login load without a browser.
+
+each login fetches the login form, posts the account's credentials
+with the form's hidden fields, and checks that the session cookie
+opens a page that needs a logged in user.
+"""
+
+import cookielib
+import httplib
+import re
+import socket
+import ssl
+import time
+import urllib
+import urllib2
+import urlparse
+
+from hchztests.parallel import run_parallel
+from hchztests.perf import summarize
+from hchztests.webprobe import _ssl_context
+
+
+# the hub login form, and a page that redirects anonymous users to it
+LOGIN_PATH = '/login'
+CHECK_PATH = '/members/myaccount'
+
+_form_re = re.compile(r'<form\b[^>]*>.*?</form>',re.I|re.S)
+_input_re = re.compile(r'<input\b[^>]*>',re.I)
+_attr_re = re.compile(r'''(\w+)\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)''')
+
+
+def _attributes(tag):
+
+    return dict([(name.lower(),value.strip('"\''))
+                 for name,value in _attr_re.findall(tag)])
+
+
+def login_form_fields(html):
+    """
+    return the hidden fields of the login form in html, the form
+    holding the password field, as a dictionary. this picks up the
+    form's csrf token and the task and return fields.
+    """
+
+    for form in _form_re.findall(html):
+        inputs = [_attributes(tag) for tag in _input_re.findall(form)]
+        if 'password' not in [i.get('type','').lower() for i in inputs]:
+            continue
+        return dict([(i['name'],i.get('value',''))
+                     for i in inputs
+                     if i.get('type','').lower() == 'hidden'
+                     and 'name' in i])
+
+    return {}
+
+
+def http_login(authority,username,password,timeout=30,verify=True,
+               login_path=LOGIN_PATH,check_path=CHECK_PATH):
+    """
+    log username into the website at authority with plain http
+    requests, returning a record with the seconds the login took,
+    the status of the session check and the error, if the login
+    failed.
+    """
+
+    jar = cookielib.CookieJar()
+    handlers = [urllib2.HTTPCookieProcessor(jar)]
+    if authority.startswith('https'):
+        handlers.append(urllib2.HTTPSHandler(context=_ssl_context(verify)))
+    opener = urllib2.build_opener(*handlers)
+
+    login_url = authority + login_path
+    record = {'username' : username,
+              'latency'  : None,
+              'status'   : None,
+              'error'    : None}
+
+    start = time.time()
+    try:
+        html = opener.open(login_url,timeout=timeout).read()
+
+        fields = login_form_fields(html)
+        fields.update({'username' : username,
+                       'passwd'   : password})
+        opener.open(login_url,urllib.urlencode(fields),timeout=timeout).read()
+
+        # anonymous users are sent back to the login page
+        response = opener.open(authority + check_path,timeout=timeout)
+        response.read()
+        record['status'] = response.getcode()
+        record['latency'] = time.time() - start
+
+        path = urlparse.urlsplit(response.geturl()).path
+        if path.rstrip('/') == login_path.rstrip('/'):
+            raise RuntimeError('session for %s is not logged in' % (username))
+    except (urllib2.URLError,httplib.HTTPException,socket.error,
+            ssl.SSLError,RuntimeError) as e:
+        if isinstance(e,urllib2.HTTPError):
+            record['status'] = e.code
+        record['error'] = e
+
+    return record
+
+
+class LoginLoad(object):
+    """
+    log in many times, several logins at a time, and measure how the
+    website holds up.
+
+    login is a callable taking a username and password and returning
+    a record like http_login() does. accounts is a list of
+    (username,password) tuples that logins take turns using.
+    """
+
+    def __init__(self,login,accounts):
+
+        if len(accounts) == 0:
+            raise ValueError('no accounts to log in with')
+
+        self.login = login
+        self.accounts = accounts
+
+
+    def run(self,count,concurrency=1):
+        """
+        perform count logins, concurrency at a time, returning
+        the login records and the seconds the logins took.
+        """
+
+        def login(i):
+            username,password = self.accounts[i % len(self.accounts)]
+            return self.login(username,password)
+
+        start = time.time()
+        outcomes = run_parallel(login,range(count),concurrency)
+        elapsed = time.time() - start
+
+        records = []
+        for i,(record,exc_info) in enumerate(outcomes):
+            if exc_info is not None:
+                username,password = self.accounts[i % len(self.accounts)]
+                record = {'username' : username,
+                          'latency'  : None,
+                          'status'   : None,
+                          'error'    : exc_info[1]}
+            records.append(record)
+
+        return records,elapsed
+
+
+    def summary(self,records,elapsed,concurrency=1):
+        """
+        return a dictionary describing a run of logins,
+        suitable for the performance report.
+        """
+
+        errors = [r for r in records if r['error'] is not None]
+        ok = len(records) - len(errors)
+
+        throughput = None
+        if elapsed > 0:
+            throughput = ok / elapsed
+
+        return {'concurrency' : concurrency,
+                'logins'      : len(records),
+                'errors'      : len(errors),
+                'error_rate'  : len(errors) / float(max(len(records),1)),
+                'throughput'  : throughput,
+                'latency'     : summarize([r['latency'] for r in records
+                                           if r['error'] is None]),
+                'first_error' : str(errors[0]['error']) if errors else None}
+
+
+    def ramp(self,levels,count):
+        """
+        perform count logins at each concurrency in levels,
+        returning a list of summary() dictionaries, one per level.
+        """
+
+        steps = []
+        for concurrency in levels:
+            records,elapsed = self.run(count,concurrency)
+            steps.append(self.summary(records,elapsed,concurrency))
+        return steps
+
+
+def format_ramp(steps):
+    """
+    format the summaries of a login ramp as a table, one level per line
+    """
+
+    def ms(value):
+        if value is None:
+            return '-'
+        return '%.0f' % (value*1000)
+
+    lines = ['%11s %6s %6s %10s %10s %8s %8s'
+             % ('concurrency','logins','errors','logins/s',
+                'median ms','p95 ms','max ms')]
+    for s in steps:
+        lat = s['latency']
+        lines.append('%11d %6d %6d %10s %10s %8s %8s'
+            % (s['concurrency'],s['logins'],s['errors'],
+               '%.2f' % s['throughput'] if s['throughput'] else '-',
+               ms(lat.get('median')),ms(lat.get('p95')),ms(lat.get('max'))))
+    return '\n'.join(lines)
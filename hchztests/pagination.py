@@ -0,0 +1,153 @@
+"""
+walk the pages of a paginated listing forward, one page link at a time.
+
+instead of clicking a page link, checking the page and going back to
+the first page for the next link, the walk clicks the next page's link
+on the page it is on, so each page is loaded once and the browser never
+goes back.
+"""
+
+
+def page_snapshot(po):
+    """
+    describe the page po is on: its url, current page number, the
+    page numbers it links to, its pagination counts and the number of
+    rows it shows.
+    """
+
+    return {'url'     : po.current_url(),
+            'current' : po.get_current_page_number(),
+            'links'   : po.get_link_page_numbers(),
+            'counts'  : po.get_pagination_counts(),
+            'rows'    : po.form.search_results.num_rows()}
+
+
+def walk_pages(po,snapshot=page_snapshot,max_pages=None):
+    """
+    a generator of snapshots of each page of po's listing, starting
+    with the page po is on.
+
+    after a snapshot is taken, the walk clicks the link of the lowest
+    page number after the current one. generally only a few page
+    numbers around the current page are linked, more become available
+    as the walk moves forward. the walk ends on a page without later
+    page links, or after max_pages pages.
+
+    the next page is only loaded when the next snapshot is asked for,
+    so a caller that stops iterating stops the walk.
+    """
+
+    page = 1
+    current = po.get_current_page_number()
+    if current is not None and str(current).isdigit():
+        page = int(current)
+
+    count = 0
+
+    while True:
+        snap = snapshot(po)
+        snap['page'] = page
+        count += 1
+
+        yield snap
+
+        if max_pages is not None and count >= max_pages:
+            return
+
+        later = sorted([int(p) for p in snap['links'] if int(p) > page])
+        if len(later) == 0:
+            return
+
+        page = later[0]
+        po.goto_page_number(page)
+
+
+def check_page_changed(prev,snap):
+
+    if prev is not None and prev['url'] == snap['url']:
+        return ['clicking the page link for page %s' % (snap['page'])
+                + ' did not change pages: url = %s' % (snap['url'])]
+    return []
+
+
+def check_current_page(prev,snap):
+
+    if str(snap['current']) != str(snap['page']):
+        return ['after clicking the page link for page %s' % (snap['page'])
+                + ' on %s, the current page number is %s'
+                % (snap['url'],snap['current'])]
+    return []
+
+
+def check_rows_match_counts(prev,snap):
+
+    (start,end,total) = snap['counts']
+    expected = end - start + 1
+    if total == 0:
+        expected = 0
+
+    if snap['rows'] != expected:
+        return ['on page %s (%s),' % (snap['page'],snap['url'])
+                + ' the number of items displayed does not match the'
+                + ' number of items listed in the pagination counts:'
+                + ' displayed = %s, start = %s,' % (snap['rows'],start)
+                + ' end = %s, end-start+1 (what should be displayed) = %s'
+                % (end,expected)]
+    return []
+
+
+def check_counts_continue(prev,snap):
+
+    if prev is None:
+        return []
+
+    (start,end,total) = snap['counts']
+    (prev_start,prev_end,prev_total) = prev['counts']
+
+    problems = []
+    if start != prev_end + 1:
+        problems.append('page %s (%s) starts at item %s,'
+                        % (snap['page'],snap['url'],start)
+                        + ' page %s ended at item %s'
+                        % (prev['page'],prev_end))
+    if total != prev_total:
+        problems.append('page %s (%s) has %s items in total,'
+                        % (snap['page'],snap['url'],total)
+                        + ' page %s had %s' % (prev['page'],prev_total))
+    return problems
+
+
+PAGE_CHECKS = [check_page_changed,
+               check_current_page,
+               check_rows_match_counts,
+               check_counts_continue]
+
+
+def validate_pages(pages,checks=PAGE_CHECKS,fail_fast=False):
+    """
+    run each check on the snapshots from pages, a walk_pages()
+    generator, as they arrive. a check takes the previous snapshot,
+    or None for the first page, and the current snapshot and returns
+    a list of problems.
+
+    with fail_fast, the walk stops at the first page with a problem,
+    skipping the page loads after it.
+
+    returns the number of pages checked and the list of problems.
+    """
+
+    problems = []
+    prev = None
+    count = 0
+
+    for snap in pages:
+        count += 1
+        for check in checks:
+            problems.extend(check(prev,snap))
+
+        if fail_fast and len(problems) > 0:
+            break
+
+        prev = snap
+
+    return count,problems
@@ -0,0 +1,79 @@
+import Queue
+import sys
+import threading
+
+
+class ParallelError(Exception):
+    """
+    raised by results() when one or more calls failed
+    """
+
+    def __init__(self,errors):
+
+        self.errors = errors
+
+        msg = '%s call(s) failed:' % (len(errors))
+        for item,exc_info in errors:
+            msg += '\n%s: %s: %s' % (item,exc_info[0].__name__,exc_info[1])
+
+        Exception.__init__(self,msg)
+
+
+def run_parallel(func,items,max_workers=8):
+    """
+    call func(item) for each item in items, using up to
+    max_workers threads.
+
+    returns a list of (result,exc_info) tuples in the same order as
+    items. exc_info is None if the call succeeded, otherwise it is the
+    sys.exc_info() tuple of the exception raised by the call.
+    """
+
+    items = list(items)
+    outcomes = [None] * len(items)
+
+    if len(items) == 0:
+        return outcomes
+
+    work = Queue.Queue()
+    for idx,item in enumerate(items):
+        work.put((idx,item))
+
+    def worker():
+        while True:
+            try:
+                idx,item = work.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                outcomes[idx] = (func(item),None)
+            except Exception:
+                outcomes[idx] = (None,sys.exc_info())
+
+    nthreads = max(1,min(max_workers,len(items)))
+    threads = [threading.Thread(target=worker) for i in range(nthreads)]
+
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    return outcomes
+
+
+def results(items,outcomes):
+    """
+    return the results of a run_parallel() call,
+    raising ParallelError if any of the calls failed.
+    """
+
+    errors = [(item,exc_info)
+              for item,(result,exc_info) in zip(items,outcomes)
+              if exc_info is not None]
+
+    if len(errors) > 0:
+        raise ParallelError(errors)
+
+    return [result for (result,exc_info) in outcomes]
@@ -0,0 +1,380 @@
+import functools
+import json
+import math
+import os
+import re
+import threading
+import time
+
+
+def percentile(values,pct):
+    """
+    return the pct percentile of values, interpolating
+    between the closest ranks. returns None for an empty list.
+    """
+
+    if len(values) == 0:
+        return None
+
+    data = sorted(values)
+
+    if len(data) == 1:
+        return data[0]
+
+    k = (len(data)-1) * (pct/100.0)
+    f = int(math.floor(k))
+    c = int(math.ceil(k))
+
+    if f == c:
+        return data[f]
+
+    return data[f] + (data[c]-data[f]) * (k-f)
+
+
+def summarize(values):
+    """
+    return a dictionary describing the distribution of values
+    """
+
+    values = [v for v in values if v is not None]
+
+    if len(values) == 0:
+        return {'count' : 0}
+
+    return {'count'  : len(values),
+            'min'    : min(values),
+            'max'    : max(values),
+            'mean'   : sum(values)/float(len(values)),
+            'median' : percentile(values,50),
+            'p95'    : percentile(values,95),
+            'p99'    : percentile(values,99)}
+
+
+class Timer(object):
+    """A little timer class that we can use to time code in a with statement"""
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+
+    def __exit__(self,*args):
+        self.end = time.time()
+        self.elapsed = self.end - self.start
+
+
+class ActionTimer(object):
+    """
+    time the calls made to methods of other objects, like the search
+    and filter actions of a page object, without changing their classes.
+    """
+
+    def __init__(self):
+
+        self.timings = {}
+        self._lock = threading.Lock()
+
+
+    def instrument(self,obj,method,name=None):
+        """
+        replace obj's method with one that times each call under name,
+        which defaults to the method's name.
+        """
+
+        name = name or method
+        func = getattr(obj,method)
+
+        @functools.wraps(func)
+        def timed(*args,**kwargs):
+            start = time.time()
+            try:
+                return func(*args,**kwargs)
+            finally:
+                self.add(name,time.time()-start)
+
+        setattr(obj,method,timed)
+
+
+    def add(self,name,elapsed):
+
+        with self._lock:
+            self.timings.setdefault(name,[]).append(elapsed)
+
+
+    def summary(self):
+        """
+        return a dictionary of {name : summarize() of its call times}
+        """
+
+        with self._lock:
+            return dict([(name,summarize(times))
+                         for name,times in self.timings.items()])
+
+
+    def record(self,perf_report,metric,**labels):
+        """
+        record the timings of each action in perf_report under metric
+        """
+
+        for name,latency in sorted(self.summary().items()):
+            perf_report.record(metric,action=name,latency=latency,**labels)
+
+
+# two sided normal quantiles for the supported confidence levels
+Z_SCORES = {0.80 : 1.282,
+            0.90 : 1.645,
+            0.95 : 1.960,
+            0.98 : 2.326,
+            0.99 : 2.576}
+
+
+def wilson_interval(failures,runs,confidence=0.95):
+    """
+    return the (low,high) wilson score interval of the failure rate
+    failures/runs. returns (0.0,1.0) when there are no runs.
+    """
+
+    if confidence not in Z_SCORES:
+        raise ValueError('confidence must be one of %s, got %s'
+                         % (sorted(Z_SCORES.keys()),confidence))
+
+    if runs == 0:
+        return (0.0,1.0)
+
+    z = Z_SCORES[confidence]
+    p = failures/float(runs)
+
+    center = p + z*z/(2.0*runs)
+    spread = z * math.sqrt(p*(1-p)/runs + z*z/(4.0*runs*runs))
+    scale = 1 + z*z/float(runs)
+
+    return (max(0.0,(center-spread)/scale),min(1.0,(center+spread)/scale))
+
+
+def repeat_key(nodeid):
+    """
+    remove the repeat iteration from a test's node id, like
+    test_a.py::TestA::test_a[foo-repeat3] -> test_a.py::TestA::test_a[foo]
+    """
+
+    match = re.match(r'^(.*)\[(.*)\]$',nodeid)
+    if match is None:
+        return nodeid
+
+    base,ids = match.groups()
+    ids = [i for i in ids.split('-') if re.match(r'^repeat\d+$',i) is None]
+
+    if len(ids) == 0:
+        return base
+
+    return '%s[%s]' % (base,'-'.join(ids))
+
+
+class RepeatStats(object):
+    """
+    collect the outcome and duration of each iteration of repeated
+    tests, to describe how often and how slowly they fail instead of
+    only whether they passed.
+
+    iterations are grouped by repeat_key(). once a test has run at
+    least min_runs times, it is done when the confidence interval of
+    its failure rate is no wider than ci_width. a ci_width of 0 never
+    stops early.
+    """
+
+    def __init__(self,ci_width=0,confidence=0.95,min_runs=10):
+
+        if confidence not in Z_SCORES:
+            raise ValueError('confidence must be one of %s, got %s'
+                             % (sorted(Z_SCORES.keys()),confidence))
+
+        self.ci_width = ci_width
+        self.confidence = confidence
+        self.min_runs = min_runs
+
+        self._runs = {}
+        self._stopped = {}
+        self._lock = threading.Lock()
+
+
+    def add(self,nodeid,outcome,duration):
+        """
+        store one iteration's outcome, 'passed' or 'failed', and
+        duration in seconds.
+        """
+
+        with self._lock:
+            self._runs.setdefault(repeat_key(nodeid),[]) \
+                .append((outcome,duration))
+
+
+    def add_stopped(self,nodeid):
+        """
+        count an iteration skipped because its test was done
+        """
+
+        key = repeat_key(nodeid)
+        with self._lock:
+            self._stopped[key] = self._stopped.get(key,0) + 1
+
+
+    def keys(self):
+
+        with self._lock:
+            return sorted(self._runs.keys())
+
+
+    def summary(self,nodeid):
+        """
+        return a dictionary describing the iterations of a test
+        """
+
+        key = repeat_key(nodeid)
+
+        with self._lock:
+            runs = list(self._runs.get(key,[]))
+            stopped = self._stopped.get(key,0)
+
+        failed = len([o for o,d in runs if o == 'failed'])
+
+        summary = {'runs'     : len(runs),
+                   'passed'   : len(runs) - failed,
+                   'failed'   : failed,
+                   'stopped'  : stopped,
+                   'duration' : summarize([d for o,d in runs])}
+
+        summary['flake_rate'] = None
+        if len(runs) > 0:
+            summary['flake_rate'] = failed/float(len(runs))
+
+        (summary['flake_rate_low'],summary['flake_rate_high']) = \
+            wilson_interval(failed,len(runs),self.confidence)
+
+        return summary
+
+
+    def done(self,nodeid):
+        """
+        check if a test has run enough to know its failure rate
+        within ci_width.
+        """
+
+        if self.ci_width <= 0:
+            return False
+
+        summary = self.summary(nodeid)
+
+        if summary['runs'] < self.min_runs:
+            return False
+
+        return summary['flake_rate_high'] - summary['flake_rate_low'] \
+            <= self.ci_width
+
+
+    def record(self,perf_report,metric='repeat'):
+        """
+        record the summary of each repeated test in perf_report
+        """
+
+        for key in self.keys():
+            perf_report.record(metric,test=key,
+                               confidence=self.confidence,
+                               **self.summary(key))
+
+
+class PerfReport(object):
+    """
+    collect named performance measurements made while the suite runs.
+
+    each call to record() stores one entry with a name and a dictionary
+    of metrics. entries are printed at the end of the test session and,
+    if a history file was provided, appended to it as json lines so
+    results can be compared across runs.
+    """
+
+    def __init__(self,history_fn=None):
+
+        self.history_fn = history_fn
+        self._entries = []
+        self._lock = threading.Lock()
+
+
+    def record(self,name,**metrics):
+        """
+        store the metrics under the provided name
+        """
+
+        entry = {'name'      : name,
+                 'timestamp' : time.time(),
+                 'metrics'   : metrics}
+
+        with self._lock:
+            self._entries.append(entry)
+
+        return entry
+
+
+    def entries(self,name=None):
+        """
+        return the recorded entries, optionally filtered by name
+        """
+
+        with self._lock:
+            entries = list(self._entries)
+
+        if name is not None:
+            entries = [e for e in entries if e['name'] == name]
+
+        return entries
+
+
+    def format_table(self):
+        """
+        return the recorded entries as printable text
+        """
+
+        lines = []
+        for entry in self.entries():
+            metrics = ' '.join(['%s=%s' % (k,_format_value(v))
+                                for k,v in sorted(entry['metrics'].items())])
+            lines.append('%s: %s' % (entry['name'],metrics))
+
+        return '\n'.join(lines)
+
+
+    def save(self):
+        """
+        append the recorded entries to the history file
+        """
+
+        if self.history_fn is None:
+            return
+
+        entries = self.entries()
+        if len(entries) == 0:
+            return
+
+        fn = os.path.abspath(
+                os.path.expanduser(
+                    os.path.expandvars(self.history_fn)))
+
+        dirname = os.path.dirname(fn)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        with open(fn,'a') as f:
+            for entry in entries:
+                f.write(json.dumps(entry,sort_keys=True,default=str))
+                f.write('\n')
+
+
+def _format_value(value):
+
+    if isinstance(value,float):
+        return '%0.3f' % (value)
+
+    if isinstance(value,dict):
+        return '{%s}' % (','.join(['%s:%s' % (k,_format_value(v))
+                                   for k,v in sorted(value.items())]))
+
+    return str(value)
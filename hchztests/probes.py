@@ -0,0 +1,192 @@
+"""
+probes that gather facts about a tool session container with a
+single remote command, instead of one command per fact.
+"""
+
+
+def _quote(s):
+
+    return "'%s'" % (s.replace("'","'\\''"))
+
+
+def path_audit_script(table):
+    """
+    build the command that audits the scripts in table.
+
+    table is a list of (script name, expected path, legacy paths)
+    tuples. for each script, the command prints where the script is
+    found in the search path, and each of its legacy paths that still
+    exists.
+    """
+
+    parts = []
+    for script_name,current_path,old_paths in table:
+        name = _quote(script_name)
+        parts.append('echo "=HCWHICH=> "%s" $(which %s 2> /dev/null)";'
+                     % (name,name))
+        for p in old_paths:
+            parts.append('[ -e %s ] && echo "=HCOLD=> "%s" "%s;'
+                         % (_quote(p),name,_quote(p)))
+
+    parts.append('true')
+
+    return ' '.join(parts)
+
+
+def parse_path_audit(table,output):
+    """
+    parse the output of a path_audit_script() command into a report,
+    a dictionary keyed by script name. each entry holds the expected
+    path, the path found in the search path, or '' if the script was
+    not found, and the list of legacy paths that exist.
+    """
+
+    report = {}
+    for script_name,current_path,old_paths in table:
+        report[script_name] = {'expected'  : current_path,
+                               'found'     : '',
+                               'old_found' : []}
+
+    for line in output.splitlines():
+        fields = line.strip().split(None,2)
+        if len(fields) < 2 or fields[1] not in report:
+            continue
+        if fields[0] == '=HCWHICH=>' and len(fields) == 3:
+            report[fields[1]]['found'] = fields[2]
+        elif fields[0] == '=HCOLD=>' and len(fields) == 3:
+            report[fields[1]]['old_found'].append(fields[2])
+
+    return report
+
+
+def audit_paths(ws,table):
+    """
+    audit the search path and legacy locations of every script in
+    table with one command in the workspace shell ws. see
+    path_audit_script() and parse_path_audit().
+    """
+
+    output,es = ws.execute(path_audit_script(table),fail_on_exit_code=False)
+    return parse_path_audit(table,output)
+
+
+def path_problems(script_name,entry):
+    """
+    return a list of problems found in one entry of a path audit report
+    """
+
+    problems = []
+
+    if entry['found'] == '':
+        problems.append("'%s' not in search path" % (script_name))
+    elif entry['found'] != entry['expected']:
+        problems.append("'%s' calls '%s' instead of '%s'"
+                        % (script_name,entry['found'],entry['expected']))
+
+    if len(entry['old_found']) > 0:
+        problems.append("old locations of %s found: %s"
+                        % (script_name,entry['old_found']))
+
+    return problems
+
+
+# environment variables, paths and shell functions of a tool session
+# container that tests check. paths may refer to environment
+# variables, like ${SESSIONDIR}.
+ENVIRONMENT_FACTS = {
+    'env' : ['SESSION','SESSIONDIR','RESULTSDIR'],
+    'paths' : [
+        '${SESSIONDIR}',
+        '/apps/environ/.setup.sh',
+        '/apps/environ/.setup.csh',
+        '/apps/share/debian6/environ.d',
+        '/apps/share64/debian6/environ.d',
+        '/apps/share/debian7/environ.d',
+        '/apps/share64/debian7/environ.d',
+        '/apps/share64/debian7/environ.d/rappture-dev',
+        '/apps/share64/debian7/rappture/dev/bin/rappture.use',
+        '/apps/share64/debian7/environ.d/rappture',
+        '/apps/share64/debian7/rappture/current/bin/rappture.use',
+    ],
+    'functions' : ['use','unuse'],
+}
+
+
+def environment_probe_script(env=(),paths=(),functions=()):
+    """
+    build the command that gathers the environment facts.
+
+    every fact is printed as a tab separated record. shell functions
+    are looked up in a subshell that has sourced /etc/profile, so the
+    probing shell is left as it was.
+    """
+
+    parts = []
+
+    for name in env:
+        parts.append("printf '=HCENV=>\\t%%s\\t%%s\\n' %s \"${%s}\";"
+                     % (_quote(name),name))
+
+    for path in paths:
+        parts.append('p="%s"; e=0; r=0; d=0;' % (path.replace('"','\\"'))
+                     + ' [ -e "${p}" ] && e=1;'
+                     + ' [ -r "${p}" ] && r=1;'
+                     + ' [ -d "${p}" ] && d=1;'
+                     + " printf '=HCPATH=>\\t%s\\t%s\\t%s\\t%s\\t%s\\n'"
+                     + ' %s "${e}" "${r}" "${d}"' % (_quote(path))
+                     + ' "$(readlink -f "${p}")";')
+
+    if len(functions) > 0:
+        parts.append('(. /etc/profile > /dev/null 2>&1;')
+        for name in functions:
+            parts.append("printf '=HCFUNC=>\\t%%s\\t%%s\\n' %s"
+                         % (_quote(name))
+                         + ' "$(type -t %s)";' % (name))
+        parts.append(');')
+
+    parts.append('true')
+
+    return ' '.join(parts)
+
+
+def parse_environment_probe(output):
+    """
+    parse the output of an environment_probe_script() command into a
+    dictionary of facts:
+
+        env       : {name : value}
+        paths     : {path : {exists,readable,directory,realpath}}
+        functions : {name : output of type -t, 'function' for functions}
+    """
+
+    facts = {'env' : {}, 'paths' : {}, 'functions' : {}}
+
+    for line in output.splitlines():
+        fields = line.rstrip('\r').split('\t')
+        # the shell may strip the trailing tab of an empty last field
+        fields += ['']*(6-len(fields))
+        if fields[0] == '=HCENV=>':
+            facts['env'][fields[1]] = fields[2]
+        elif fields[0] == '=HCPATH=>':
+            facts['paths'][fields[1]] = {'exists'    : fields[2] == '1',
+                                         'readable'  : fields[3] == '1',
+                                         'directory' : fields[4] == '1',
+                                         'realpath'  : fields[5]}
+        elif fields[0] == '=HCFUNC=>':
+            facts['functions'][fields[1]] = fields[2]
+
+    return facts
+
+
+def probe_environment(ws,facts=ENVIRONMENT_FACTS):
+    """
+    gather the environment facts described by facts, a dictionary
+    like ENVIRONMENT_FACTS, with one command in the workspace shell ws.
+    """
+
+    command = environment_probe_script(facts.get('env',()),
+                                       facts.get('paths',()),
+                                       facts.get('functions',()))
+    output,es = ws.execute(command,fail_on_exit_code=False)
+
+    return parse_environment_probe(output)
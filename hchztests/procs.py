@@ -0,0 +1,206 @@
+import base64
+import os
+import re
+
+
+# print one record per process we can read, followed by the uid to
+# user name map. cmdline and environ are nul separated, so they are
+# base64 encoded to keep each record on one line. '-' marks an empty
+# file, '?' marks one we are not allowed to read.
+SNAPSHOT_SCRIPT = \
+    'for d in /proc/[0-9]*; do' \
+    + ' s=$(awk \'/^Uid:/{u=$2} /^VmRSS:/{r=$2}' \
+    + ' END{print u, (r==""?0:r)}\' ${d}/status 2> /dev/null)' \
+    + ' || continue;' \
+    + ' [ -n "${s}" ] || continue;' \
+    + ' c=$(base64 -w0 < ${d}/cmdline 2> /dev/null) || c=\'?\';' \
+    + ' e=$(base64 -w0 < ${d}/environ 2> /dev/null) || e=\'?\';' \
+    + ' echo "=HCPROC=> ${d#/proc/} ${s} ${c:--} ${e:--}";' \
+    + ' done;' \
+    + ' getent passwd | awk -F: \'{print "=HCUSER=> " $3 " " $1}\''
+
+
+def _decode(field):
+
+    if field == '?':
+        return None
+    if field == '-':
+        return ''
+    return base64.b64decode(field)
+
+
+class Process(object):
+    """
+    one process from a ProcessSnapshot.
+
+    cmdline is the list of arguments the process was started with.
+    environ is a dictionary of the process's environment, or None if
+    the environment is not readable by the workspace user.
+    """
+
+    def __init__(self,pid,uid,user,rss,cmdline,environ):
+
+        self.pid = pid
+        self.uid = uid
+        self.user = user
+        self.rss = rss
+        self.cmdline = cmdline
+        self.environ = environ
+
+
+    @property
+    def command(self):
+        """
+        the base name of the program, like 'Xvnc' for /usr/bin/Xvnc
+        """
+
+        if len(self.cmdline) == 0:
+            return ''
+        return os.path.basename(self.cmdline[0])
+
+
+    @property
+    def args(self):
+
+        return self.cmdline[1:]
+
+
+    def option(self,flag):
+        """
+        return the argument following flag on the command line,
+        or None if flag was not given.
+        """
+
+        args = self.args
+        for i,arg in enumerate(args[:-1]):
+            if arg == flag:
+                return args[i+1]
+        return None
+
+
+    def __repr__(self):
+
+        return '<Process %s %s: %s>' \
+            % (self.pid,self.user,' '.join(self.cmdline))
+
+
+class ProcessSnapshot(object):
+    """
+    a snapshot of the processes visible in a tool session container.
+
+    the process table is read from /proc with a single command in the
+    workspace shell ws, then indexed by command name, argument and
+    full command line. call refresh() to take a new snapshot.
+    """
+
+    def __init__(self,ws):
+
+        self.ws = ws
+        self.processes = []
+        self.refresh()
+
+
+    def refresh(self):
+
+        output,es = self.ws.execute(SNAPSHOT_SCRIPT,fail_on_exit_code=False)
+        self.processes = self.parse(output)
+
+        self._by_pid = {}
+        self._by_command = {}
+        self._by_arg = {}
+        self._by_cmdline = {}
+
+        for p in self.processes:
+            self._by_pid[p.pid] = p
+            self._by_command.setdefault(p.command,[]).append(p)
+            for arg in set(p.args):
+                self._by_arg.setdefault(arg,[]).append(p)
+            self._by_cmdline.setdefault(' '.join(p.cmdline),[]).append(p)
+
+        return self
+
+
+    @staticmethod
+    def parse(output):
+        """
+        parse the output of SNAPSHOT_SCRIPT into a list of Process objects
+        """
+
+        users = {}
+        records = []
+
+        for line in output.splitlines():
+            fields = line.strip().split()
+            if len(fields) == 3 and fields[0] == '=HCUSER=>':
+                users[fields[1]] = fields[2]
+            elif len(fields) == 6 and fields[0] == '=HCPROC=>':
+                records.append(fields[1:])
+
+        processes = []
+        for pid,uid,rss,cmdline,environ in records:
+
+            cmdline = _decode(cmdline)
+            if cmdline is None:
+                cmdline = []
+            else:
+                cmdline = [a for a in cmdline.split('\0') if a != '']
+
+            environ = _decode(environ)
+            if environ is not None:
+                environ = dict([e.split('=',1)
+                                for e in environ.split('\0') if '=' in e])
+
+            processes.append(Process(int(pid),int(uid),users.get(uid,uid),
+                                     int(rss),cmdline,environ))
+
+        return processes
+
+
+    def get(self,pid):
+
+        return self._by_pid.get(pid)
+
+
+    def find(self,command,user=None):
+        """
+        return the processes running the program named command,
+        optionally limited to those owned by user.
+        """
+
+        procs = self._by_command.get(command,[])
+        if user is not None:
+            procs = [p for p in procs if p.user == user]
+        return list(procs)
+
+
+    def with_arg(self,arg):
+        """
+        return the processes that were given arg on the command line
+        """
+
+        return list(self._by_arg.get(arg,[]))
+
+
+    def find_cmdline(self,cmdline):
+        """
+        return the processes whose full command line, joined with
+        spaces, is cmdline.
+        """
+
+        return list(self._by_cmdline.get(cmdline,[]))
+
+
+    def search(self,pattern):
+        """
+        search the command lines of all processes for the regular
+        expression pattern, returning a list of (process,match) tuples.
+        """
+
+        pattern = re.compile(pattern)
+
+        matches = []
+        for p in self.processes:
+            m = pattern.search(' '.join(p.cmdline))
+            if m is not None:
+                matches.append((p,m))
+        return matches
@@ -0,0 +1,264 @@
+"""
+record the browser's X display into a ring buffer of recent frames,
+encoding a video only when asked to, usually after a failure.
+
+hubcheck.utils.WebRecordXvfb encodes an mp4 for the whole time it
+records. RingRecordXvfb instead grabs a few jpeg frames a second into
+a bounded buffer in memory and encodes the last seconds of them with
+save(), so passing runs spend little cpu on video next to the
+browser under test.
+"""
+
+import collections
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+
+JPEG_START = '\xff\xd8'
+JPEG_END = '\xff\xd9'
+
+
+def split_jpeg_stream(buf):
+    """
+    split the complete jpeg images off the start of buf, a stream of
+    concatenated jpegs like ffmpeg's image2pipe output. returns the
+    list of images and the rest of buf, the start of the next image.
+    """
+
+    frames = []
+
+    while True:
+        start = buf.find(JPEG_START)
+        if start < 0:
+            # keep half of a start marker split across reads
+            return frames,buf[-1:] if buf.endswith(JPEG_START[0]) else ''
+        end = buf.find(JPEG_END,start+2)
+        if end < 0:
+            return frames,buf[start:]
+        frames.append(buf[start:end+2])
+        buf = buf[end+2:]
+
+
+class FrameRing(object):
+    """
+    a bounded buffer of the most recent frames. adding a frame to a
+    full ring drops the oldest one.
+    """
+
+    def __init__(self,max_frames):
+
+        self._frames = collections.deque(maxlen=max_frames)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+
+    def __len__(self):
+
+        with self._lock:
+            return len(self._frames)
+
+
+    def add(self,frame):
+
+        with self._lock:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+
+
+    def frames(self):
+        """
+        return a list of the frames in the ring, oldest first
+        """
+
+        with self._lock:
+            return list(self._frames)
+
+
+    def clear(self):
+
+        with self._lock:
+            self._frames.clear()
+
+
+def _frame_dir():
+    """
+    pick a directory for frame files, preferring tmpfs
+    """
+
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm',os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+def encode_frames(frames,fn,fps,ffmpeg='ffmpeg'):
+    """
+    encode frames, a list of jpeg images, into the video file fn
+    at fps frames a second.
+    """
+
+    framedir = tempfile.mkdtemp(prefix='hcframes',dir=_frame_dir())
+
+    try:
+        for i,frame in enumerate(frames):
+            with open(os.path.join(framedir,'%06d.jpg' % (i)),'wb') as f:
+                f.write(frame)
+
+        dirname = os.path.dirname(os.path.abspath(fn))
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        command = [ffmpeg,'-y','-loglevel','error',
+                   '-framerate',str(fps),
+                   '-i',os.path.join(framedir,'%06d.jpg'),
+                   '-c:v','libx264','-pix_fmt','yuv420p',
+                   # libx264 needs even dimensions
+                   '-vf','scale=trunc(iw/2)*2:trunc(ih/2)*2',
+                   fn]
+
+        p = subprocess.Popen(command,stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT)
+        output = p.communicate()[0]
+        if p.returncode != 0:
+            raise RuntimeError('encoding %s failed: %s' % (fn,output))
+    finally:
+        shutil.rmtree(framedir,ignore_errors=True)
+
+    return fn
+
+
+class RingRecordXvfb(object):
+    """
+    start an Xvfb display for the browser, like
+    hubcheck.utils.WebRecordXvfb, and keep the last seconds of it
+    in a ring of jpeg frames.
+
+    call save() before stop() to encode the frames into videofn.
+    if videofn is None, only the display is started.
+    """
+
+    def __init__(self,videofn,seconds=30,fps=2,size=(1280,1024),
+                 ffmpeg='ffmpeg',xvfb='Xvfb'):
+
+        self.videofn = videofn
+        self.fps = fps
+        self.size = size
+        self.ffmpeg = ffmpeg
+        self.xvfb = xvfb
+
+        self.ring = FrameRing(max(1,int(seconds*fps)))
+
+        self.display = None
+        self._old_display = None
+        self._xvfb = None
+        self._grabber = None
+        self._reader = None
+
+
+    def _free_display(self,first=99):
+
+        n = first
+        while os.path.exists('/tmp/.X%d-lock' % (n)) \
+              or os.path.exists('/tmp/.X11-unix/X%d' % (n)):
+            n += 1
+        return ':%d' % (n)
+
+
+    def start(self):
+
+        self.display = self._free_display()
+        self._xvfb = subprocess.Popen(
+            [self.xvfb,self.display,'-screen','0',
+             '%dx%dx24' % (self.size[0],self.size[1]),'-nolisten','tcp'],
+            stdout=open(os.devnull,'w'),stderr=subprocess.STDOUT)
+
+        # wait for the display's socket
+        socketfn = '/tmp/.X11-unix/X%s' % (self.display[1:])
+        start = time.time()
+        while not os.path.exists(socketfn) and time.time() - start < 10:
+            if self._xvfb.poll() is not None:
+                raise RuntimeError('Xvfb exited with status %s'
+                                   % (self._xvfb.returncode))
+            time.sleep(0.1)
+
+        self._old_display = os.environ.get('DISPLAY')
+        os.environ['DISPLAY'] = self.display
+
+        if self.videofn is not None:
+            self._start_grabber()
+
+        return self
+
+
+    def _start_grabber(self):
+
+        command = [self.ffmpeg,'-loglevel','error',
+                   '-f','x11grab','-framerate',str(self.fps),
+                   '-video_size','%dx%d' % (self.size[0],self.size[1]),
+                   '-i',self.display,
+                   '-f','image2pipe','-c:v','mjpeg','-q:v','5','-']
+
+        self._grabber = subprocess.Popen(command,stdout=subprocess.PIPE,
+                                         stderr=open(os.devnull,'w'))
+
+        self._reader = threading.Thread(target=self._read_frames,
+                                        args=(self._grabber.stdout,))
+        self._reader.daemon = True
+        self._reader.start()
+
+
+    def _read_frames(self,stream):
+
+        buf = ''
+        while True:
+            data = os.read(stream.fileno(),65536)
+            if not data:
+                return
+            frames,buf = split_jpeg_stream(buf + data)
+            for frame in frames:
+                self.ring.add(frame)
+
+
+    def save(self,fn=None):
+        """
+        encode the frames in the ring into fn, or videofn. returns the
+        name of the video, or None if there were no frames to encode.
+        """
+
+        fn = fn or self.videofn
+        frames = self.ring.frames()
+
+        if fn is None or len(frames) == 0:
+            return None
+
+        return encode_frames(frames,fn,self.fps,self.ffmpeg)
+
+
+    def stop(self):
+        """
+        stop grabbing frames and the display, dropping unsaved frames
+        """
+
+        for p in [self._grabber,self._xvfb]:
+            if p is not None and p.poll() is None:
+                p.terminate()
+                p.wait()
+
+        if self._reader is not None:
+            self._reader.join(5)
+
+        self._grabber = None
+        self._xvfb = None
+        self._reader = None
+
+        if self._old_display is None:
+            os.environ.pop('DISPLAY',None)
+        else:
+            os.environ['DISPLAY'] = self._old_display
+
+        self.ring.clear()
+
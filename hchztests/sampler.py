@@ -0,0 +1,221 @@
+import bisect
+import threading
+import time
+
+
+# print the container's load, memory, cgroup and disk usage, one
+# "=HCSAMPLE=> name value" line per measurement. cgroup v2 files are
+# tried before cgroup v1 files. cpu usage is reported in nanoseconds.
+SAMPLE_SCRIPT = \
+    'echo "=HCSAMPLE=> loadavg $(cat /proc/loadavg)";' \
+    + ' awk \'/^(MemTotal|MemAvailable|SwapTotal|SwapFree):/' \
+    + '{sub(":","",$1); print "=HCSAMPLE=> " $1 " " $2}\' /proc/meminfo;' \
+    + ' m=$(cat /sys/fs/cgroup/memory.current 2> /dev/null' \
+    + ' || cat /sys/fs/cgroup/memory/memory.usage_in_bytes 2> /dev/null)' \
+    + ' && echo "=HCSAMPLE=> cgroup_memory ${m}";' \
+    + ' c=$(awk \'/^usage_usec/{printf "%%d", $2*1000}\'' \
+    + ' /sys/fs/cgroup/cpu.stat 2> /dev/null);' \
+    + ' [ -n "${c}" ] || c=$(cat /sys/fs/cgroup/cpuacct/cpuacct.usage' \
+    + ' 2> /dev/null);' \
+    + ' [ -n "${c}" ] && echo "=HCSAMPLE=> cgroup_cpu ${c}";' \
+    + ' %s'
+
+DISK_SCRIPT = 'echo "=HCSAMPLE=> disk $(du -sk %s 2> /dev/null | cut -f1)"'
+
+
+def parse_sample(output):
+    """
+    parse the output of SAMPLE_SCRIPT into a dictionary of measurements.
+    memory sizes are in kilobytes, cpu time is in seconds.
+    """
+
+    sample = {}
+
+    for line in output.splitlines():
+        fields = line.strip().split()
+        if len(fields) < 3 or fields[0] != '=HCSAMPLE=>':
+            continue
+
+        name,values = fields[1],fields[2:]
+        try:
+            if name == 'loadavg':
+                sample['load1'] = float(values[0])
+                sample['load5'] = float(values[1])
+                sample['load15'] = float(values[2])
+            elif name == 'MemTotal':
+                sample['mem_total'] = int(values[0])
+            elif name == 'MemAvailable':
+                sample['mem_available'] = int(values[0])
+            elif name == 'SwapTotal':
+                sample['swap_total'] = int(values[0])
+            elif name == 'SwapFree':
+                sample['swap_free'] = int(values[0])
+            elif name == 'cgroup_memory':
+                sample['cgroup_memory'] = int(values[0]) / 1024
+            elif name == 'cgroup_cpu':
+                sample['cgroup_cpu'] = int(values[0]) / 1e9
+            elif name == 'disk':
+                sample['disk'] = int(values[0])
+        except (ValueError,IndexError):
+            # skip measurements that could not be read
+            pass
+
+    return sample
+
+
+def format_samples(samples):
+    """
+    format a list of samples as a text table, with the cgroup cpu
+    usage of each interval as a percentage of one cpu.
+    """
+
+    if len(samples) == 0:
+        return 'no samples'
+
+    columns = ['time','load1','mem avail MB','cgroup mem MB',
+               'cgroup cpu %','disk MB']
+    rows = []
+
+    start = samples[0]['time']
+    previous = None
+    for s in samples:
+
+        cpu = ''
+        if previous is not None \
+           and 'cgroup_cpu' in s and 'cgroup_cpu' in previous \
+           and s['time'] > previous['time']:
+            cpu = '%.1f' % (100.0 * (s['cgroup_cpu']-previous['cgroup_cpu'])
+                            / (s['time']-previous['time']))
+
+        def mb(name):
+            if name not in s:
+                return ''
+            return '%.1f' % (s[name] / 1024.0)
+
+        rows.append(['%+.1f' % (s['time']-start),
+                     '%.2f' % (s['load1']) if 'load1' in s else '',
+                     mb('mem_available'),
+                     mb('cgroup_memory'),
+                     cpu,
+                     mb('disk')])
+        previous = s
+
+    widths = [max([len(columns[i])] + [len(r[i]) for r in rows])
+              for i in range(len(columns))]
+
+    lines = ['  '.join([c.rjust(w) for c,w in zip(columns,widths)])]
+    for r in rows:
+        lines.append('  '.join([c.rjust(w) for c,w in zip(r,widths)]))
+
+    return '\n'.join(lines)
+
+
+def item_resource_sampler(item):
+    """
+    return the resource sampler of a pytest item's test instance, or
+    None. unittest.TestCase items keep their instance in _testcase,
+    pytest style classes in instance.
+    """
+
+    instance = getattr(item,'instance',None) \
+               or getattr(item,'_testcase',None)
+
+    return getattr(instance,'resource_sampler',None)
+
+
+def attach_resource_usage(item,call,rep):
+    """
+    add the container resource usage sampled during a test's call
+    to its report, as a section of the report.
+    """
+
+    sampler = item_resource_sampler(item)
+    if rep.when != "call" or sampler is None:
+        return
+
+    samples = sampler.samples(getattr(call,'start',None),
+                              getattr(call,'stop',None))
+    rep.sections.append(('container resource usage',
+                         format_samples(samples)))
+
+
+class ResourceSampler(threading.Thread):
+    """
+    periodically sample the cpu, memory and disk usage of a tool
+    session container.
+
+    samples are taken every interval seconds through a workspace
+    shell of the sampler's own, opened by calling connect(), so the
+    test's shell is never blocked. if sessiondir is given, the disk
+    usage of that directory is sampled too.
+    """
+
+    def __init__(self,connect,sessiondir=None,interval=5):
+
+        super(ResourceSampler,self).__init__()
+        self.daemon = True
+
+        self.connect = connect
+        self.interval = interval
+        self.error = None
+
+        disk = ''
+        if sessiondir is not None:
+            disk = DISK_SCRIPT % (sessiondir)
+        self._command = SAMPLE_SCRIPT % (disk)
+
+        self._samples = []
+        self._times = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+
+    def run(self):
+
+        try:
+            ws = self.connect()
+        except Exception as e:
+            self.error = e
+            return
+
+        try:
+            while True:
+                output,es = ws.execute(self._command,fail_on_exit_code=False)
+                sample = parse_sample(output)
+                sample['time'] = time.time()
+                with self._lock:
+                    self._samples.append(sample)
+                    self._times.append(sample['time'])
+
+                if self._stopped.wait(self.interval):
+                    break
+        except Exception as e:
+            # the container went away, keep the samples we have
+            self.error = e
+        finally:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+
+    def stop(self,timeout=None):
+
+        self._stopped.set()
+        self.join(timeout)
+
+
+    def samples(self,start=None,end=None):
+        """
+        return the samples taken between start and end. the last
+        sample taken before start is included as a baseline.
+        """
+
+        with self._lock:
+            lo = 0
+            if start is not None:
+                lo = max(bisect.bisect_left(self._times,start)-1,0)
+            hi = len(self._samples)
+            if end is not None:
+                hi = bisect.bisect_right(self._times,end)
+            return list(self._samples[lo:hi])
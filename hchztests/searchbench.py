@@ -0,0 +1,73 @@
+"""
+benchmark searches of listings, like the tools pipeline, by alias.
+"""
+
+from hchztests.perf import Timer
+from hchztests.perf import summarize
+
+
+# an alias no hub should have a tool for
+NO_MATCH_QUERY = 'hubcheckxnosuchtool'
+
+QUERY_KINDS = ['exact','prefix','substring','no_match']
+
+
+def alias_queries(alias,prefix_length=3):
+    """
+    build the queries of each kind in QUERY_KINDS for alias, as a list
+    of (kind,query,expected) tuples. expected is the alias the results
+    should hold, or None if the query should match no tool.
+    """
+
+    prefix = alias[:prefix_length]
+
+    # the middle of the alias, so it is not also a prefix
+    substring = alias
+    if len(alias) > 2:
+        substring = alias[1:-1]
+
+    return [('exact',     alias,          alias),
+            ('prefix',    prefix,         alias),
+            ('substring', substring,      alias),
+            ('no_match',  NO_MATCH_QUERY, None)]
+
+
+def benchmark_queries(search,results,queries,repeat=5):
+    """
+    run each query repeat times, timing the searches.
+
+    search is a callable that performs a search for a query. results
+    is a callable returning the aliases shown after a search. queries
+    is a list of (kind,query,expected) tuples, like alias_queries()
+    returns.
+
+    returns a dictionary of {kind : summary}, where each summary holds
+    the query, the latency distribution of its searches, and the number
+    of searches whose results were wrong: missing the expected alias,
+    or holding results when none were expected.
+    """
+
+    report = {}
+
+    for kind,query,expected in queries:
+
+        latencies = []
+        wrong = 0
+
+        for i in range(repeat):
+            with Timer() as t:
+                search(query)
+            latencies.append(t.elapsed)
+
+            shown = results()
+            if expected is None:
+                if len(shown) > 0:
+                    wrong += 1
+            elif expected not in shown:
+                wrong += 1
+
+        report[kind] = {'query'   : query,
+                        'latency' : summarize(latencies),
+                        'wrong'   : wrong}
+
+    return report
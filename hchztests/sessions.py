@@ -0,0 +1,568 @@
+import os
+import re
+import threading
+import time
+
+from hubcheck.shell import ContainerManager
+from hubcheck.shell import ToolSession
+
+from hchztests.parallel import results
+from hchztests.parallel import run_parallel
+from hchztests.perf import summarize
+
+
+class SessionListWatcher(threading.Thread):
+    """
+    poll 'session list' for an account in the background,
+    remembering when each new session number first shows up.
+    """
+
+    def __init__(self,host,username,password,poll_interval=1.0):
+
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.session = ToolSession(host=host,username=username,
+                                   password=password)
+        self.poll_interval = poll_interval
+        self.first_seen = {}
+        self.errors = []
+
+        self._done = threading.Event()
+        self._existing = self._session_numbers()
+
+
+    def _session_numbers(self):
+
+        data = self.session.get_open_session_detail()
+        return set([int(row['session_number']) for row in data.values()])
+
+
+    def run(self):
+
+        while not self._done.is_set():
+            try:
+                numbers = self._session_numbers()
+            except Exception as e:
+                self.errors.append(e)
+                numbers = set()
+
+            now = time.time()
+            for n in numbers - self._existing:
+                if n not in self.first_seen:
+                    self.first_seen[n] = now
+
+            self._done.wait(self.poll_interval)
+
+
+    def wait_for(self,session_numbers,timeout):
+        """
+        wait until all of session_numbers have been seen
+        """
+
+        start = time.time()
+        while time.time() - start < timeout:
+            if len(set(session_numbers) - set(self.first_seen.keys())) == 0:
+                return True
+            time.sleep(self.poll_interval)
+        return False
+
+
+    def stop(self):
+
+        self._done.set()
+        self.join()
+
+
+class SessionLaunchStress(object):
+    """
+    launch many tool sessions at the same time across several
+    accounts and measure how long users wait for them.
+
+    for each session we measure:
+        time_to_shell: from asking for the session until a shell in
+                       the new container answers 'echo $SESSION'
+        time_to_list:  from asking for the session until it shows
+                       up in 'session list'
+
+    accounts is a list of (username,password) tuples. sessions are
+    spread across the accounts round robin and titled with title_prefix
+    so leftovers can be found and stopped later.
+    """
+
+    def __init__(self,host,accounts,title_prefix='hcstress',
+                 poll_interval=1.0,list_timeout=120,max_workers=None):
+
+        self.host = host
+        self.accounts = accounts
+        self.title_prefix = title_prefix
+        self.poll_interval = poll_interval
+        self.list_timeout = list_timeout
+        self.max_workers = max_workers
+
+        self.launches = []
+
+
+    def run(self,count):
+        """
+        launch count sessions concurrently.
+        returns a list of launch records.
+        """
+
+        launches = []
+        for i in range(count):
+            username,password = self.accounts[i % len(self.accounts)]
+            launches.append({'index'          : i,
+                             'username'       : username,
+                             'password'       : password,
+                             'title'          : '%s_%d' % (self.title_prefix,i),
+                             'session_number' : None,
+                             'time_to_shell'  : None,
+                             'time_to_list'   : None,
+                             'error'          : None})
+
+        watchers = {}
+        for username,password in self.accounts:
+            watchers[username] = SessionListWatcher(self.host,username,
+                                    password,self.poll_interval)
+
+        for w in watchers.values():
+            w.start()
+
+        try:
+            max_workers = self.max_workers or len(launches)
+            outcomes = run_parallel(self._launch,launches,max_workers)
+
+            for launch,(result,exc_info) in zip(launches,outcomes):
+                if exc_info is not None:
+                    launch['error'] = exc_info[1]
+
+            for username,w in watchers.items():
+                numbers = [l['session_number'] for l in launches
+                           if l['username'] == username
+                           and l['session_number'] is not None]
+                w.wait_for(numbers,self.list_timeout)
+
+        finally:
+            for w in watchers.values():
+                w.stop()
+
+        for launch in launches:
+            n = launch['session_number']
+            seen = watchers[launch['username']].first_seen.get(n)
+            if seen is not None:
+                launch['time_to_list'] = seen - launch['start']
+
+        self.launches.extend(launches)
+
+        return launches
+
+
+    def _launch(self,launch):
+
+        session = ToolSession(host=self.host,
+                              username=launch['username'],
+                              password=launch['password'])
+
+        launch['start'] = time.time()
+
+        i,o,e = session.create(launch['title'])
+        output = o.read(1024)
+        launch['session_number'] = _parse_session_number(output)
+
+        shell = session.access(session_number=launch['session_number'])
+        try:
+            shell.execute('echo $SESSION')
+            launch['time_to_shell'] = time.time() - launch['start']
+        finally:
+            shell.close()
+
+
+    def summary(self,launches=None):
+        """
+        return a dictionary describing the launches,
+        suitable for the performance report.
+        """
+
+        if launches is None:
+            launches = self.launches
+
+        return {'sessions'      : len(launches),
+                'errors'        : len([l for l in launches
+                                       if l['error'] is not None]),
+                'not_listed'    : len([l for l in launches
+                                       if l['session_number'] is not None
+                                       and l['time_to_list'] is None]),
+                'time_to_shell' : summarize([l['time_to_shell']
+                                             for l in launches]),
+                'time_to_list'  : summarize([l['time_to_list']
+                                             for l in launches])}
+
+
+    def teardown(self):
+        """
+        stop all of the launched sessions in parallel,
+        then sync each account's list of open sessions.
+        """
+
+        pattern = '^%s_' % (re.escape(self.title_prefix))
+
+        reapers = []
+        for username,password in self.accounts:
+            reaper = SessionReaper(self.host,username,password,pattern)
+            for l in self.launches:
+                if l['username'] == username \
+                   and l['session_number'] is not None:
+                    reaper.add(l['session_number'])
+            reapers.append(reaper)
+
+        outcomes = run_parallel(lambda r: r.reap(),reapers,len(reapers))
+
+        cm = ContainerManager()
+        for username,password in self.accounts:
+            cm.sync_open_sessions(self.host,username)
+
+        self.launches = []
+
+        results(reapers,outcomes)
+
+
+def _parse_session_number(output):
+
+    match = re.search(r'(\d+)',output)
+    if match is None:
+        raise RuntimeError('could not find session number in: %s' % (output))
+
+    return int(match.group(1))
+
+
+class SessionReaper(object):
+    """
+    find and stop tool sessions left open by tests.
+
+    call snapshot() before the test to remember which sessions were
+    already open. after the test, reap() stops the sessions that
+    were explicitly added with add() and any new session whose name
+    or title matches pattern. sessions are stopped concurrently,
+    using up to max_workers connections at a time.
+
+    without a snapshot, every session matching pattern is reaped,
+    which is how leftovers from crashed runs are cleaned up.
+    """
+
+    def __init__(self,host,username,password,pattern=None,max_workers=4):
+
+        self.host = host
+        self.username = username
+        self.password = password
+        self.max_workers = max_workers
+
+        self.pattern = None
+        if pattern is not None:
+            self.pattern = re.compile(pattern)
+
+        self.session = ToolSession(host=host,username=username,
+                                   password=password)
+
+        self.existing = set()
+        self.tracked = set()
+
+
+    def snapshot(self):
+        """
+        remember the sessions that are currently open
+        """
+
+        self.existing = set(self.open_sessions().keys())
+        return self.existing
+
+
+    def add(self,session_number):
+        """
+        stop session_number during the next reap()
+        """
+
+        self.tracked.add(int(session_number))
+
+
+    def open_sessions(self):
+        """
+        return a dictionary of open session rows keyed by session number
+        """
+
+        data = self.session.get_open_session_detail()
+        return dict([(int(row['session_number']),row) for row in data.values()])
+
+
+    def find_orphans(self,open_sessions=None):
+        """
+        return the sorted session numbers that should be stopped
+        """
+
+        if open_sessions is None:
+            open_sessions = self.open_sessions()
+
+        orphans = self.tracked & set(open_sessions.keys())
+
+        if self.pattern is not None:
+            for n,row in open_sessions.items():
+                if n in self.existing:
+                    continue
+                tags = [row.get('name',''),row.get('title','')]
+                if any([self.pattern.search(t or '') for t in tags]):
+                    orphans.add(n)
+
+        return sorted(orphans)
+
+
+    def reap(self):
+        """
+        stop the orphaned sessions in parallel.
+        returns the list of session numbers that were stopped.
+        """
+
+        orphans = self.find_orphans()
+
+        outcomes = run_parallel(self._stop,orphans,self.max_workers)
+
+        self.tracked = set()
+
+        results(orphans,outcomes)
+
+        return orphans
+
+
+    def _stop(self,session_number):
+
+        session = ToolSession(host=self.host,username=self.username,
+                              password=self.password)
+        session.stop(session_number=session_number)
+
+
+def reap_sessions(host,accounts,pattern,max_workers=4):
+    """
+    stop every session whose name or title matches pattern, for each
+    of the (username,password) accounts. accounts are handled in
+    parallel. returns a dictionary of stopped session numbers keyed
+    by username.
+    """
+
+    reapers = [SessionReaper(host,username,password,pattern,max_workers)
+               for username,password in accounts]
+
+    outcomes = run_parallel(lambda r: r.reap(),reapers,len(reapers) or 1)
+
+    stopped = {}
+    for reaper,(result,exc_info) in zip(reapers,outcomes):
+        if exc_info is None:
+            stopped[reaper.username] = result
+
+    results([r.username for r in reapers],outcomes)
+
+    return stopped
+
+
+class PtyWatcher(threading.Thread):
+    """
+    poll the set of allocated ptys in the background,
+    keeping a time stamped history of what was seen.
+
+    list_ptys is a callable returning the set of pty names,
+    like '3' for /dev/pts/3.
+    """
+
+    def __init__(self,list_ptys,poll_interval=0.5):
+
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.list_ptys = list_ptys
+        self.poll_interval = poll_interval
+        self.history = []
+        self.errors = []
+
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+
+
+    def run(self):
+
+        while not self._done.is_set():
+            self.poll()
+            self._done.wait(self.poll_interval)
+
+
+    def poll(self):
+
+        # list_ptys may share a shell with other callers
+        with self._poll_lock:
+            try:
+                ptys = set(self.list_ptys())
+            except Exception as e:
+                self.errors.append(e)
+                return None
+
+        with self._lock:
+            self.history.append((time.time(),ptys))
+
+        return ptys
+
+
+    def released_at(self,pty,closed):
+        """
+        return the time of the first poll after closed
+        that did not see pty, or None if it was always seen.
+        """
+
+        with self._lock:
+            history = list(self.history)
+
+        for t,ptys in history:
+            if t >= closed and pty not in ptys:
+                return t
+
+        return None
+
+
+    def stop(self):
+
+        self._done.set()
+        self.join()
+
+
+def list_container_ptys(ws):
+    """
+    return a callable that lists the ptys of a tool session
+    container through the workspace shell ws.
+    """
+
+    def list_ptys():
+        output,es = ws.execute('ls /dev/pts',fail_on_exit_code=False)
+        return set([p for p in output.split() if p != 'ptmx'])
+
+    return list_ptys
+
+
+class ConnectionChurn(object):
+    """
+    open and close many shell connections, possibly at the same
+    time, and measure how the server hands out and releases ptys.
+
+    connect is a callable returning a shell with execute(), send()
+    and close() methods, like ContainerManager.access() or
+    standins.StandInShell. list_ptys is a callable returning the set
+    of ptys currently allocated on the server.
+
+    for each connection we record:
+        connect_latency: seconds until the shell answered 'tty'
+        pty:             name of the pty the shell was given
+        time_to_release: seconds from closing the connection until
+                         the pty disappeared from list_ptys()
+        error:           the exception raised while connecting,
+                         usually a pty allocation failure
+    """
+
+    def __init__(self,connect,list_ptys,poll_interval=0.5,
+                 release_timeout=30):
+
+        self.connect = connect
+        self.poll_interval = poll_interval
+        self.release_timeout = release_timeout
+
+        self.watcher = PtyWatcher(list_ptys,poll_interval)
+
+
+    def run(self,count,concurrency=1):
+        """
+        open and close count connections, concurrency at a time.
+        returns a list of connection records.
+        """
+
+        records = [{'index'           : i,
+                    'connect_latency' : None,
+                    'pty'             : None,
+                    'closed'          : None,
+                    'time_to_release' : None,
+                    'error'           : None}
+                   for i in range(count)]
+
+        self.baseline = self.watcher.poll()
+        self.watcher.start()
+
+        try:
+            outcomes = run_parallel(self._churn,records,concurrency)
+            for record,(result,exc_info) in zip(records,outcomes):
+                if exc_info is not None:
+                    record['error'] = exc_info[1]
+
+            self._wait_for_release(records)
+        finally:
+            self.watcher.stop()
+
+        self.final = self.watcher.poll()
+
+        for record in records:
+            if record['pty'] is None or record['closed'] is None:
+                continue
+            released = self.watcher.released_at(record['pty'],
+                                                record['closed'])
+            if released is not None:
+                record['time_to_release'] = released - record['closed']
+
+        return records
+
+
+    def _churn(self,record):
+
+        start = time.time()
+        ws = self.connect()
+
+        try:
+            output,es = ws.execute('tty')
+            record['connect_latency'] = time.time() - start
+
+            if not output.startswith('/dev/'):
+                raise RuntimeError('no pty allocated: %s' % (output))
+            record['pty'] = os.path.basename(output.strip())
+
+            # start up a new bash shell manually
+            ws.send('/bin/bash')
+        finally:
+            ws.close()
+            record['closed'] = time.time()
+
+
+    def _wait_for_release(self,records):
+
+        ptys = set([r['pty'] for r in records if r['pty'] is not None])
+
+        start = time.time()
+        while time.time() - start < self.release_timeout:
+            held = self.watcher.poll()
+            if held is not None and len(ptys & (held - self.baseline)) == 0:
+                return
+            time.sleep(self.poll_interval)
+
+
+    def summary(self,records):
+        """
+        return a dictionary describing the connections,
+        suitable for the performance report.
+        """
+
+        leaked = None
+        if self.baseline is not None and self.final is not None:
+            leaked = len(self.final - self.baseline)
+
+        return {'connections'     : len(records),
+                'pty_failures'    : len([r for r in records
+                                         if r['error'] is not None]),
+                'unreleased'      : len([r for r in records
+                                         if r['pty'] is not None
+                                         and r['time_to_release'] is None]),
+                'leaked_ptys'     : leaked,
+                'connect_latency' : summarize([r['connect_latency']
+                                               for r in records]),
+                'time_to_release' : summarize([r['time_to_release']
+                                               for r in records])}
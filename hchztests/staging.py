@@ -0,0 +1,142 @@
+import base64
+import os
+import tarfile
+import time
+import uuid
+
+from StringIO import StringIO
+
+
+def make_tarball(files):
+    """
+    return a gzip'd tar archive, as a string, holding files.
+
+    files is a dictionary of {path : (contents,mode)}, where path is
+    relative to the root of the archive. parent directories are added
+    with mode 0700.
+    """
+
+    buf = StringIO()
+    tar = tarfile.open(fileobj=buf,mode='w:gz')
+    now = time.time()
+
+    dirs = set()
+    for path in files.keys():
+        parent = os.path.dirname(path)
+        while parent != '' and parent not in dirs:
+            dirs.add(parent)
+            parent = os.path.dirname(parent)
+
+    for path in sorted(dirs):
+        info = tarfile.TarInfo(path)
+        info.type = tarfile.DIRTYPE
+        info.mode = 0700
+        info.mtime = now
+        tar.addfile(info)
+
+    for path,(contents,mode) in sorted(files.items()):
+        if isinstance(contents,unicode):
+            contents = contents.encode('utf8')
+        info = tarfile.TarInfo(path)
+        info.size = len(contents)
+        info.mode = mode
+        info.mtime = now
+        tar.addfile(info,StringIO(contents))
+
+    tar.close()
+
+    return buf.getvalue()
+
+
+class Stager(object):
+    """
+    stage test fixture files in a tool session container.
+
+    files are written under a new directory inside of basedir. each
+    call to stage() packs the files, with their modes, into a single
+    tar stream that is uploaded and unpacked in one pass. cleanup()
+    removes the whole directory with one command, instead of removing
+    each file.
+
+    the tar stream is uploaded with sftp, an hubcheck SFTPClient, if
+    one is provided. otherwise it is base64 encoded and written
+    through the workspace shell ws.
+    """
+
+    def __init__(self,ws,basedir,sftp=None,prefix='hcstage'):
+
+        self.ws = ws
+        self.sftp = sftp
+        self.directory = os.path.join(basedir,
+                            '%s.%s' % (prefix,uuid.uuid4().hex[:8]))
+        self.staged = []
+        self._created = False
+
+
+    def path(self,name):
+        """
+        return the absolute path of a staged file
+        """
+
+        return os.path.join(self.directory,name)
+
+
+    def stage(self,files):
+        """
+        write files into the staging directory.
+
+        files is a dictionary of {path : (contents,mode)}, where path
+        is relative to the staging directory. returns the list of
+        absolute paths that were written.
+        """
+
+        if len(files) == 0:
+            return []
+
+        for path in files.keys():
+            if os.path.isabs(path) or path.startswith('..'):
+                raise ValueError('staged paths must be relative: %s' % (path))
+
+        data = make_tarball(files)
+        tarfn = '%s.%s.tgz' % (self.directory,uuid.uuid4().hex[:8])
+
+        if self.sftp is not None:
+            with self.sftp.open(tarfn,mode='w') as f:
+                f.write(data)
+            unpack = 'tar -xpzf %s -C %s' % (tarfn,self.directory)
+        else:
+            self.ws.write_file(tarfn,base64.encodestring(data))
+            unpack = 'base64 -d %s | tar -xpzf - -C %s' \
+                % (tarfn,self.directory)
+
+        self._created = True
+
+        command = 'mkdir -p %s && %s; es=$?; rm -f %s; (exit $es)' \
+            % (self.directory,unpack,tarfn)
+        self.ws.execute(command)
+
+        paths = [self.path(p) for p in sorted(files.keys())]
+        self.staged.extend(paths)
+
+        return paths
+
+
+    def cleanup(self):
+        """
+        remove the staging directory and everything in it
+        """
+
+        if self._created is False:
+            return
+
+        self.ws.execute('rm -rf %s' % (self.directory))
+        self._created = False
+        self.staged = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self,*args):
+        self.cleanup()
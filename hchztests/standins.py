@@ -0,0 +1,759 @@
+"""
+local stand-ins for hub services.
+
+the stand-ins run in a background thread on localhost so benchmarks
+can be run without a hub, to tell the behavior of the test harness
+apart from the behavior of the hub.
+"""
+
+import BaseHTTPServer
+import Cookie
+import SocketServer
+import datetime
+import os
+import re
+import select
+import shutil
+import signal
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import urlparse
+import uuid
+
+from hchztests.tagscale import synthetic_tags
+from hchztests.tagscale import tag_table_html
+
+try:
+    import paramiko
+except ImportError:
+    paramiko = None
+
+try:
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+except ImportError:
+    x509 = None
+
+
+class SSHStandIn(object):
+    """
+    a small password authenticated ssh server that gives each
+    connection a bash shell on its own pty.
+
+    max_ptys limits the number of ptys handed out at once, like the
+    15 ptys of a tool session container. when they run out, pty
+    requests are refused.
+
+    release_delay is the number of seconds a pty is held after its
+    connection closes. None means ptys are never released, which
+    simulates a pty leak.
+
+    connect_delay is the number of seconds to wait before answering
+    a shell request, which simulates a slow hub.
+    """
+
+    def __init__(self,username='hcuser',password='hcpass',max_ptys=15,
+                 release_delay=0,connect_delay=0):
+
+        if paramiko is None:
+            raise RuntimeError('SSHStandIn requires paramiko')
+
+        self.username = username
+        self.password = password
+        self.max_ptys = max_ptys
+        self.release_delay = release_delay
+        self.connect_delay = connect_delay
+
+        self.host = '127.0.0.1'
+        self.port = None
+
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._lock = threading.Lock()
+        self._ptys = {}
+        self._transports = []
+        self._sock = None
+        self._thread = None
+        self._running = False
+
+
+    def start(self):
+
+        self._sock = socket.socket(socket.AF_INET,socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR,1)
+        self._sock.bind((self.host,0))
+        self._sock.listen(100)
+        self.port = self._sock.getsockname()[1]
+
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+
+    def stop(self):
+
+        self._running = False
+
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+        for t in self._transports:
+            t.close()
+        self._transports = []
+
+        with self._lock:
+            ptys = self._ptys.values()
+            self._ptys = {}
+
+        for pty in ptys:
+            pty.release()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self,*args):
+        self.stop()
+
+
+    def ptys(self):
+        """
+        return the set of pty names, like '3' for /dev/pts/3,
+        currently held by the server.
+        """
+
+        with self._lock:
+            return set([p.name for p in self._ptys.values()])
+
+
+    def _accept_loop(self):
+
+        while self._running:
+            try:
+                conn,addr = self._sock.accept()
+            except (socket.error,AttributeError):
+                return
+
+            t = paramiko.Transport(conn)
+            t.add_server_key(self._host_key)
+            self._transports.append(t)
+
+            try:
+                t.start_server(server=_SSHServerInterface(self))
+            except (paramiko.SSHException,EOFError,socket.error):
+                t.close()
+
+
+    def _allocate_pty(self,channel):
+
+        with self._lock:
+            if len(self._ptys) >= self.max_ptys:
+                return False
+            self._ptys[channel] = _Pty()
+
+        return True
+
+
+    def _start_shell(self,channel):
+
+        with self._lock:
+            pty = self._ptys.get(channel)
+
+        if pty is None:
+            return False
+
+        t = threading.Thread(target=self._run_shell,args=(channel,pty))
+        t.daemon = True
+        t.start()
+
+        return True
+
+
+    def _run_shell(self,channel,pty):
+
+        if self.connect_delay > 0:
+            time.sleep(self.connect_delay)
+
+        env = {'PATH' : os.environ.get('PATH','/usr/bin:/bin'),
+               'HOME' : os.environ.get('HOME','/tmp'),
+               'TERM' : 'dumb',
+               'PS1'  : '$ '}
+
+        proc = subprocess.Popen(['/bin/bash','--norc','--noprofile','-i'],
+                                stdin=pty.slave,stdout=pty.slave,
+                                stderr=pty.slave,env=env,
+                                preexec_fn=os.setsid,close_fds=True)
+
+        try:
+            while proc.poll() is None and not channel.closed:
+                r,w,x = select.select([pty.master,channel],[],[],0.5)
+                if pty.master in r:
+                    try:
+                        data = os.read(pty.master,4096)
+                    except OSError:
+                        break
+                    if not data:
+                        break
+                    channel.sendall(data)
+                if channel in r:
+                    data = channel.recv(4096)
+                    if not data:
+                        break
+                    os.write(pty.master,data)
+        except (socket.error,EOFError,paramiko.SSHException):
+            pass
+        finally:
+            try:
+                channel.close()
+            except (socket.error,EOFError,paramiko.SSHException):
+                # the client already hung up
+                pass
+            if proc.poll() is None:
+                try:
+                    os.killpg(proc.pid,signal.SIGKILL)
+                except OSError:
+                    pass
+            proc.wait()
+            self._release_pty(channel,pty)
+
+
+    def _release_pty(self,channel,pty):
+
+        if self.release_delay is None:
+            # leak the pty
+            return
+
+        if self.release_delay > 0:
+            time.sleep(self.release_delay)
+
+        with self._lock:
+            self._ptys.pop(channel,None)
+
+        pty.release()
+
+
+class _Pty(object):
+
+    def __init__(self):
+
+        self.master,self.slave = os.openpty()
+        self.name = os.path.basename(os.ttyname(self.slave))
+
+
+    def release(self):
+
+        for fd in [self.master,self.slave]:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+if paramiko is not None:
+
+    class _SSHServerInterface(paramiko.ServerInterface):
+
+        def __init__(self,server):
+
+            self.server = server
+
+
+        def check_channel_request(self,kind,chanid):
+
+            if kind == 'session':
+                return paramiko.OPEN_SUCCEEDED
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+        def get_allowed_auths(self,username):
+
+            return 'password'
+
+
+        def check_auth_password(self,username,password):
+
+            if username == self.server.username \
+               and password == self.server.password:
+                return paramiko.AUTH_SUCCESSFUL
+            return paramiko.AUTH_FAILED
+
+
+        def check_channel_pty_request(self,channel,term,width,height,
+                                      pixelwidth,pixelheight,modes):
+
+            return self.server._allocate_pty(channel)
+
+
+        def check_channel_shell_request(self,channel):
+
+            return self.server._start_shell(channel)
+
+
+class StandInShell(object):
+    """
+    a minimal interactive shell on an ssh server, with the
+    execute(), send() and close() methods the benchmarks use
+    from hubcheck workspace shells.
+    """
+
+    _done_re = re.compile(r'=HCDONE=> (\d+)\r?\n')
+
+    def __init__(self,host,port,username,password,timeout=30):
+
+        if paramiko is None:
+            raise RuntimeError('StandInShell requires paramiko')
+
+        self.timeout = timeout
+
+        self._client = paramiko.SSHClient()
+        self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self._client.connect(host,port=port,username=username,
+                             password=password,look_for_keys=False,
+                             allow_agent=False,timeout=timeout)
+
+        try:
+            self._chan = self._client.invoke_shell(term='dumb')
+            self._chan.settimeout(timeout)
+            self.execute('stty -echo; PS1=')
+        except Exception:
+            self._client.close()
+            raise
+
+
+    def send(self,data):
+
+        self._chan.sendall(data + '\n')
+
+
+    def execute(self,command):
+        """
+        run command in the shell, returning its output and exit status
+        """
+
+        self.send('%s; echo "=HCDONE=> $?"' % (command))
+
+        buf = ''
+        start = time.time()
+        while True:
+            match = self._done_re.search(buf)
+            if match is not None:
+                break
+            if time.time() - start > self.timeout:
+                raise socket.timeout('waiting for: %s' % (command))
+            data = self._chan.recv(4096)
+            if not data:
+                raise EOFError('shell closed while running: %s' % (command))
+            buf += data
+
+        # drop any prompt and echoed input before the output
+        output = buf[:match.start()]
+        lines = [l for l in output.replace('\r','').split('\n')
+                 if '=HCDONE=>' not in l]
+
+        return '\n'.join(lines).strip(),int(match.group(1))
+
+
+    def close(self):
+
+        self._chan.close()
+        self._client.close()
+
+
+def self_signed_certificate(directory,hostname='localhost'):
+    """
+    write a self signed certificate and its key for hostname into
+    directory, returning the (certfile,keyfile) paths.
+    """
+
+    if x509 is None:
+        raise RuntimeError('self signed certificates require cryptography')
+
+    key = rsa.generate_private_key(public_exponent=65537,key_size=2048,
+                                   backend=default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME,
+                                         unicode(hostname))])
+    now = datetime.datetime.utcnow()
+
+    cert = x509.CertificateBuilder() \
+        .subject_name(name) \
+        .issuer_name(name) \
+        .public_key(key.public_key()) \
+        .serial_number(x509.random_serial_number()) \
+        .not_valid_before(now - datetime.timedelta(days=1)) \
+        .not_valid_after(now + datetime.timedelta(days=1)) \
+        .add_extension(x509.SubjectAlternativeName(
+                           [x509.DNSName(unicode(hostname))]),
+                       critical=False) \
+        .sign(key,hashes.SHA256(),default_backend())
+
+    certfile = os.path.join(directory,'cert.pem')
+    keyfile = os.path.join(directory,'key.pem')
+
+    with open(certfile,'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+
+    with open(keyfile,'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM,
+                    serialization.PrivateFormat.TraditionalOpenSSL,
+                    serialization.NoEncryption()))
+
+    return (certfile,keyfile)
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+    ssl_context = None
+
+
+    def finish_request(self,request,client_address):
+
+        # do the tls handshake in the request's thread,
+        # not in the thread accepting connections
+        if self.ssl_context is not None:
+            try:
+                request = self.ssl_context.wrap_socket(request,
+                                                       server_side=True)
+            except (ssl.SSLError,socket.error):
+                return
+
+        BaseHTTPServer.HTTPServer.finish_request(self,request,client_address)
+
+
+class HTTPStandIn(object):
+    """
+    a small web server that answers requests from a table of routes.
+
+    routes is a dictionary of {path : (status,headers,body)}, where
+    headers is a dictionary. paths that are not in routes get a 404.
+    each request is recorded in requests as a (method,path,headers)
+    tuple, and each new connection is counted in connections.
+
+    with tls, the server speaks https with a self signed certificate
+    and resumes tls sessions. alpn is the list of protocols offered
+    during the handshake. the server only speaks http/1.1, but it may
+    offer 'h2' to test alpn checks. with keepalive set to False, every
+    response closes its connection.
+    """
+
+    def __init__(self,routes=None,tls=False,alpn=None,keepalive=True):
+
+        self.routes = routes or {}
+        self.tls = tls
+        self.alpn = alpn
+        self.keepalive = keepalive
+        self.requests = []
+        self.connections = 0
+
+        self.host = '127.0.0.1'
+        self.port = None
+
+        self._server = None
+        self._thread = None
+        self._certdir = None
+        self._lock = threading.Lock()
+
+
+    @property
+    def authority(self):
+
+        if self.tls:
+            return 'https://%s:%s' % (self.host,self.port)
+        return 'http://%s:%s' % (self.host,self.port)
+
+
+    def start(self):
+
+        self._server = _ThreadingHTTPServer((self.host,0),
+                                            self._handler_class())
+        self.port = self._server.server_address[1]
+
+        if self.tls:
+            self._certdir = tempfile.mkdtemp()
+            certfile,keyfile = self_signed_certificate(self._certdir)
+            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            context.load_cert_chain(certfile,keyfile)
+            if self.alpn is not None:
+                context.set_alpn_protocols(self.alpn)
+            self._server.ssl_context = context
+
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+
+    def stop(self):
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+        if self._certdir is not None:
+            shutil.rmtree(self._certdir)
+            self._certdir = None
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self,*args):
+        self.stop()
+
+
+    def _respond(self,handler):
+
+        with self._lock:
+            self.requests.append((handler.command,handler.path,
+                                  dict(handler.headers.items())))
+
+        status,headers,body = self.routes.get(handler.path,
+                                              (404,{},'not found'))
+
+        handler.send_response(status)
+        for name,value in headers.items():
+            handler.send_header(name,value)
+        handler.send_header('Content-Length',str(len(body)))
+        if not self.keepalive:
+            handler.send_header('Connection','close')
+            handler.close_connection = 1
+        handler.end_headers()
+        if handler.command != 'HEAD':
+            handler.wfile.write(body)
+
+
+    def _handler_class(self):
+
+        standin = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                with standin._lock:
+                    standin.connections += 1
+                BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+            def do_GET(self):
+                standin._respond(self)
+
+            do_HEAD = do_GET
+
+            def log_message(self,*args):
+                pass
+
+        return Handler
+
+
+class LoginStandIn(HTTPStandIn):
+    """
+    a web server with a hub like login form.
+
+    GET /login hands out a session cookie and a form with a csrf
+    token, POST /login checks the token and the credentials and logs
+    the session in, and /members/myaccount redirects sessions that
+    are not logged in back to /login.
+
+    accounts is a dictionary of {username : password}. auth_delay is
+    the number of seconds each credential check takes and workers
+    limits the number of checks running at once, so logins slow down
+    as they pile up, like on a hub with few web server workers.
+    """
+
+    cookie_name = 'hcsession'
+
+    def __init__(self,accounts,auth_delay=0,workers=None,tls=False):
+
+        HTTPStandIn.__init__(self,tls=tls)
+
+        self.accounts = accounts
+        self.auth_delay = auth_delay
+        self.logins = 0
+        self.failed_logins = 0
+
+        # session id : [csrf token, logged in username or None]
+        self._sessions = {}
+        self._workers = None
+        if workers is not None:
+            self._workers = threading.Semaphore(workers)
+
+
+    def _session(self,handler):
+
+        cookie = Cookie.SimpleCookie(handler.headers.getheader('cookie',''))
+        if self.cookie_name not in cookie:
+            return None,None
+
+        sid = cookie[self.cookie_name].value
+        with self._lock:
+            return sid,self._sessions.get(sid)
+
+
+    def _check_credentials(self,username,password):
+
+        if self._workers is not None:
+            self._workers.acquire()
+        try:
+            if self.auth_delay > 0:
+                time.sleep(self.auth_delay)
+            return username in self.accounts \
+                and self.accounts[username] == password
+        finally:
+            if self._workers is not None:
+                self._workers.release()
+
+
+    def _send(self,handler,status,body='',headers=None):
+
+        handler.send_response(status)
+        for name,value in (headers or {}).items():
+            handler.send_header(name,value)
+        handler.send_header('Content-Length',str(len(body)))
+        handler.end_headers()
+        if handler.command != 'HEAD':
+            handler.wfile.write(body)
+
+
+    def _respond(self,handler):
+
+        with self._lock:
+            self.requests.append((handler.command,handler.path,
+                                  dict(handler.headers.items())))
+
+        path = urlparse.urlsplit(handler.path).path.rstrip('/')
+        sid,session = self._session(handler)
+
+        if path == '/login' and handler.command == 'POST':
+            length = int(handler.headers.getheader('content-length',0))
+            fields = dict(urlparse.parse_qsl(handler.rfile.read(length)))
+
+            ok = session is not None \
+                and fields.get(session[0]) == '1' \
+                and self._check_credentials(fields.get('username'),
+                                            fields.get('passwd'))
+
+            with self._lock:
+                if ok:
+                    session[1] = fields['username']
+                    self.logins += 1
+                else:
+                    self.failed_logins += 1
+
+            location = '/members/myaccount' if ok else '/login'
+            self._send(handler,303,headers={'Location' : location})
+
+        elif path == '/login':
+            headers = {'Content-Type' : 'text/html'}
+            if session is None:
+                sid = uuid.uuid4().hex
+                session = [uuid.uuid4().hex,None]
+                with self._lock:
+                    self._sessions[sid] = session
+                headers['Set-Cookie'] = '%s=%s; Path=/; HttpOnly' \
+                                        % (self.cookie_name,sid)
+
+            body = '<html><body><form action="/login" method="post">' \
+                 + '<input type="text" name="username" />' \
+                 + '<input type="password" name="passwd" />' \
+                 + '<input type="hidden" name="option" value="com_users" />' \
+                 + '<input type="hidden" name="task" value="user.login" />' \
+                 + '<input type="hidden" name="%s" value="1" />' \
+                   % (session[0]) \
+                 + '</form></body></html>'
+            self._send(handler,200,body,headers)
+
+        elif path == '/members/myaccount':
+            if session is None or session[1] is None:
+                self._send(handler,302,headers={'Location' : '/login'})
+            else:
+                self._send(handler,200,
+                           '<html><body>%s</body></html>' % (session[1]),
+                           {'Content-Type' : 'text/html'})
+
+        else:
+            self._send(handler,404,'not found')
+
+
+    def _handler_class(self):
+
+        standin = self
+
+        class Handler(HTTPStandIn._handler_class(self)):
+
+            def do_POST(self):
+                standin._respond(self)
+
+        return Handler
+
+
+class TagsStandIn(HTTPStandIn):
+    """
+    a web server with hub like tag listings of synthetic tags.
+
+    /tags/browse lists count tags and /tags/<name> lists the items
+    tagged with a tag, here the same synthetic rows. both take the
+    limit and limitstart query parameters, where a limit of 0 shows
+    all rows. pages are rendered for each request, so the time to
+    answer grows with the rows shown, like on a hub.
+    """
+
+    def __init__(self,count,seed=0):
+
+        HTTPStandIn.__init__(self)
+
+        self.tags = synthetic_tags(count,seed)
+
+
+    def _respond(self,handler):
+
+        with self._lock:
+            self.requests.append((handler.command,handler.path,
+                                  dict(handler.headers.items())))
+
+        parts = urlparse.urlsplit(handler.path)
+        query = dict(urlparse.parse_qsl(parts.query))
+        path = parts.path.rstrip('/')
+
+        if path == '/tags/browse':
+            title = 'Tags'
+        elif path.startswith('/tags/'):
+            title = 'Items tagged %s' % (path[len('/tags/'):])
+        else:
+            handler.send_error(404)
+            return
+
+        try:
+            limit = int(query.get('limit','20'))
+            start = int(query.get('limitstart','0'))
+        except ValueError:
+            handler.send_error(400)
+            return
+
+        end = len(self.tags) if limit == 0 else start + limit
+        body = tag_table_html(title,self.tags[start:end],
+                              len(self.tags),start)
+
+        handler.send_response(200)
+        handler.send_header('Content-Type','text/html')
+        handler.send_header('Content-Length',str(len(body)))
+        handler.end_headers()
+        if handler.command != 'HEAD':
+            handler.wfile.write(body)
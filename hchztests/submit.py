@@ -0,0 +1,586 @@
+import collections
+import re
+import time
+
+from hchztests.parallel import results
+from hchztests.parallel import run_parallel
+from hchztests.perf import summarize
+
+
+METRICS_MARKER = '=SUBMIT-METRICS=>'
+
+_metrics_re = re.compile(re.escape(METRICS_MARKER) + r'\s*(.*)$')
+_keyvalue_re = re.compile(r'(\w+)=([^\s]+)')
+_stream_header = '=HCSTREAM<='
+_stream_trailer_re = re.compile(r'=HCSTREAM=> (\d+) (\d)')
+
+
+class SubmitMetricsParser(object):
+    """
+    incrementally parse the output of submit, pulling out the
+    =SUBMIT-METRICS=> stanzas as they arrive.
+
+    data is passed to feed() in arbitrary chunks. only the current
+    partial line and the last max_output_lines lines of non-metrics
+    output are held in memory, so very chatty jobs do not grow the
+    parser without bound.
+
+    a job starts with a stanza holding only the job id:
+        =SUBMIT-METRICS=> job=4461
+    and finishes with a stanza holding the job's details:
+        =SUBMIT-METRICS=> job=4461 venue=local status=0 cputime=0.0 realtime=10.0
+
+    if timestamped is True, each line is expected to start with the
+    time (in seconds since the epoch) it was printed, and that time is
+    used for the job's started and finished values instead of the
+    time the line was parsed.
+    """
+
+    def __init__(self,max_output_lines=100,max_line_length=4096,
+                 callback=None,timestamped=False):
+
+        self.max_line_length = max_line_length
+        self.callback = callback
+        self.timestamped = timestamped
+
+        self.jobs = collections.OrderedDict()
+        self.output = collections.deque(maxlen=max_output_lines)
+        self.bytes_seen = 0
+        self.lines_seen = 0
+
+        self._partial = ''
+
+
+    def feed(self,data):
+        """
+        parse a chunk of output
+        """
+
+        self.bytes_seen += len(data)
+
+        data = self._partial + data.replace('\r','')
+        lines = data.split('\n')
+
+        # the last item is whatever followed the final newline
+        self._partial = lines.pop()[:self.max_line_length]
+
+        for line in lines:
+            self._parse_line(line[:self.max_line_length])
+
+
+    def close(self):
+        """
+        parse anything left over from the last chunk
+        """
+
+        if self._partial != '':
+            self._parse_line(self._partial)
+            self._partial = ''
+
+
+    def _parse_line(self,line):
+
+        self.lines_seen += 1
+
+        now = time.time()
+        if self.timestamped:
+            stamp,sep,rest = line.partition(' ')
+            try:
+                now = float(stamp)
+                line = rest
+            except ValueError:
+                pass
+
+        match = _metrics_re.search(line)
+        if match is None:
+            self.output.append(line)
+            return
+
+        # anything printed on the line before the stanza is tool output
+        before = line[:match.start()]
+        if before.strip() != '':
+            self.output.append(before)
+
+        values = dict(_keyvalue_re.findall(match.group(1)))
+        if 'job' not in values:
+            return
+
+        job = self.jobs.get(values['job'])
+        if job is None:
+            job = {'job' : values['job'], 'started' : now, 'finished' : None}
+            self.jobs[values['job']] = job
+
+        for key,value in values.items():
+            if key in ('cputime','realtime','waittime'):
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            elif key == 'status':
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass
+            job[key] = value
+
+        if 'status' in values:
+            job['finished'] = now
+
+        if self.callback is not None:
+            self.callback(job)
+
+
+    def finished_jobs(self):
+        """
+        return the jobs that have reported their final metrics
+        """
+
+        return [j for j in self.jobs.values() if j['finished'] is not None]
+
+
+    def table(self):
+        """
+        return a SubmitMetricsTable holding the parsed jobs
+        """
+
+        table = SubmitMetricsTable()
+        for job in self.jobs.values():
+            table.add(job)
+        return table
+
+
+class SubmitMetricsTable(object):
+    """
+    aggregate the metrics of many submit jobs
+    """
+
+    columns = ['job','venue','status','cputime','realtime']
+
+    def __init__(self):
+
+        self.rows = []
+
+
+    def add(self,job):
+
+        self.rows.append(job)
+
+
+    def extend(self,jobs):
+
+        for job in jobs:
+            self.add(job)
+
+
+    def summary(self):
+        """
+        return a dictionary of aggregate statistics for the jobs
+        """
+
+        finished = [r for r in self.rows if r.get('finished') is not None]
+
+        venues = collections.defaultdict(int)
+        statuses = collections.defaultdict(int)
+        for row in finished:
+            venues[row.get('venue','unknown')] += 1
+            statuses[str(row.get('status'))] += 1
+
+        return {'jobs'     : len(self.rows),
+                'finished' : len(finished),
+                'failed'   : len([r for r in finished
+                                  if r.get('status') != 0]),
+                'venues'   : dict(venues),
+                'statuses' : dict(statuses),
+                'cputime'  : summarize([_number(r.get('cputime'))
+                                        for r in finished]),
+                'realtime' : summarize([_number(r.get('realtime'))
+                                        for r in finished])}
+
+
+    def format(self):
+        """
+        return the jobs as a printable table
+        """
+
+        lines = ['  '.join(['%-10s' % c for c in self.columns])]
+        for row in self.rows:
+            lines.append('  '.join(['%-10s' % row.get(c,'-')
+                                    for c in self.columns]))
+
+        return '\n'.join(lines)
+
+
+def _number(value):
+
+    if isinstance(value,(int,float)):
+        return value
+    return None
+
+
+def stream_command(ws,command,parser,logfn,poll_interval=1.0,
+                   timeout=300,chunk_size=65536):
+    """
+    run command in the background of the workspace shell ws, feeding
+    its output to parser while it runs. the output is written to logfn
+    in the container and read back chunk_size bytes at a time.
+
+    returns the exit status of the command.
+
+    stdin is redirected from /dev/null so submit's ncurses window
+    doesn't interfere with our expect like terminal parsing.
+    """
+
+    statusfn = logfn + '.status'
+
+    ws.execute('rm -f %s %s' % (logfn,statusfn))
+
+    # background the command from inside of a subshell so the
+    # interactive shell doesn't print job control messages
+    pid,es = ws.execute(
+                '( ( ( %s ) ; echo $? > %s ) > %s 2>&1 0</dev/null & echo $! )'
+                % (command,statusfn,logfn))
+    pid = pid.strip().split()[-1]
+
+    offset = 0
+    start = time.time()
+
+    while True:
+
+        # check if the command is still running and read the next
+        # chunk of output, all in one round trip. we check if the
+        # command is running first so no output is missed when the
+        # command exits between reading the chunk and the check.
+        script = 'alive=$(kill -0 %(pid)s 2>/dev/null && echo 1 || echo 0);' \
+                 ' size=$(stat -c %%s %(logfn)s 2>/dev/null || echo 0);' \
+                 ' printf "%(header)s";' \
+                 ' tail -c +%(start)d %(logfn)s 2>/dev/null' \
+                 ' | head -c $((size > %(end)d ? %(count)d : size - %(offset)d));' \
+                 ' echo; echo "=HCSTREAM=> $((size > %(end)d ? %(end)d : size)) $alive"' \
+                 % {'logfn'  : logfn,
+                    'start'  : offset+1,
+                    'offset' : offset,
+                    'count'  : chunk_size,
+                    'end'    : offset+chunk_size,
+                    'pid'    : pid,
+                    'header' : _stream_header}
+
+        output,es = ws.execute(script,fail_on_exit_code=False)
+        output = output.replace('\r','')
+
+        matches = list(_stream_trailer_re.finditer(output))
+        if len(matches) == 0:
+            raise RuntimeError('unexpected output while reading %s: %s'
+                               % (logfn,output))
+
+        match = matches[-1]
+        new_offset = int(match.group(1))
+        running = (match.group(2) == '1')
+
+        if new_offset > offset:
+            # strip the header, the trailer and the newline
+            # we echoed before the trailer. the header protects
+            # leading whitespace in the chunk.
+            chunk = output[:match.start()]
+            chunk = chunk[chunk.rfind(_stream_header)+len(_stream_header):]
+            if chunk.endswith('\n'):
+                chunk = chunk[:-1]
+            parser.feed(chunk)
+            offset = new_offset
+
+            # there may be more data waiting for us
+            continue
+
+        if not running:
+            break
+
+        if time.time() - start > timeout:
+            ws.execute('kill %s' % (pid),fail_on_exit_code=False)
+            raise RuntimeError('command timed out after %s seconds: %s'
+                               % (timeout,command))
+
+        time.sleep(poll_interval)
+
+    parser.close()
+
+    status,es = ws.execute('cat %s' % (statusfn),fail_on_exit_code=False)
+    ws.execute('rm -f %s %s' % (logfn,statusfn))
+
+    try:
+        return int(status.strip())
+    except ValueError:
+        return None
+
+
+_launch_template = \
+    '( echo "=HCSTART=> $(date +%%s.%%N)" > %(log)s ;' \
+    ' ( ( %(command)s ) ; echo $? > %(rc)s ) 2>&1 0</dev/null' \
+    ' | grep --line-buffered -F "%(marker)s"' \
+    ' | while IFS= read -r l ; do echo "$(date +%%s.%%N) $l" ; done >> %(log)s ;' \
+    ' mv %(rc)s %(status)s ) > /dev/null 2>&1 0</dev/null &'
+
+_job_header_re = re.compile(r'^=HCJOB=> (\d+) ?(-?\d*)$')
+_job_start_re = re.compile(r'^=HCSTART=> ([0-9.]+)$')
+
+
+class SubmitLoadGenerator(object):
+    """
+    launch many submit commands at the same time from one or more
+    workspace shells and measure how the submit server keeps up.
+
+    each command runs in the background of its shell. the container
+    stamps the launch time and every =SUBMIT-METRICS=> line with its
+    own clock, so queue latency (launch until submit assigns a job id)
+    and turnaround (launch until the job reports its final metrics)
+    don't depend on how often we poll. run latency is the realtime
+    reported by submit.
+
+    workdir is a directory in the container used to hold the launch
+    script and logs. it is removed when the run is finished.
+    """
+
+    def __init__(self,shells,workdir,poll_interval=2.0,timeout=600):
+
+        self.shells = shells
+        self.workdir = workdir
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+
+    def run(self,commands):
+        """
+        launch all of the commands concurrently, spreading them
+        across the shells. returns a SubmitLoadResult.
+        """
+
+        # assign commands to shells round robin
+        assignments = [[] for ws in self.shells]
+        for idx,command in enumerate(commands):
+            assignments[idx % len(self.shells)].append((idx,command))
+
+        work = [(i,ws,assignments[i]) for i,ws in enumerate(self.shells)
+                if len(assignments[i]) > 0]
+
+        try:
+            results(work,run_parallel(self._launch,work,len(work)))
+            self._wait(work)
+            jobs = []
+            for shell_jobs in results(work,run_parallel(self._collect,work,len(work))):
+                jobs.extend(shell_jobs)
+        finally:
+            run_parallel(self._cleanup,work,len(work))
+
+        jobs.sort(key=lambda j: j['index'])
+
+        return SubmitLoadResult(len(commands),jobs)
+
+
+    def ramp(self,levels,command_for):
+        """
+        run the load generator once for each concurrency level in
+        levels. command_for(i) returns the command for the i'th job.
+        returns a list of SubmitLoadResult objects.
+        """
+
+        ramp_results = []
+        for n in levels:
+            commands = [command_for(i) for i in range(n)]
+            ramp_results.append(self.run(commands))
+
+        return ramp_results
+
+
+    def _shell_dir(self,i):
+
+        return '%s/shell%d' % (self.workdir,i)
+
+
+    def _launch(self,work):
+
+        (i,ws,jobs) = work
+        d = self._shell_dir(i)
+
+        lines = []
+        for idx,command in jobs:
+            lines.append(_launch_template
+                % {'command' : command,
+                   'log'     : '%s/%d.log' % (d,idx),
+                   'rc'      : '%s/%d.rc' % (d,idx),
+                   'status'  : '%s/%d.status' % (d,idx),
+                   'marker'  : METRICS_MARKER})
+
+        ws.execute('rm -rf %s; mkdir -p %s' % (d,d))
+        ws.write_file('%s/launch.sh' % (d),'\n'.join(lines) + '\n')
+
+        # the script exits as soon as all of the jobs are backgrounded
+        ws.execute('bash %s/launch.sh' % (d))
+
+
+    def _wait(self,work):
+
+        start = time.time()
+        pending = list(work)
+
+        while len(pending) > 0:
+
+            still_pending = []
+            for (i,ws,jobs) in pending:
+                count,es = ws.execute(
+                            'ls %s/*.status 2>/dev/null | wc -l'
+                            % (self._shell_dir(i)),fail_on_exit_code=False)
+                if int(count.strip() or 0) < len(jobs):
+                    still_pending.append((i,ws,jobs))
+
+            pending = still_pending
+            if len(pending) == 0:
+                break
+
+            if time.time() - start > self.timeout:
+                raise RuntimeError(
+                    'submit load did not finish within %s seconds'
+                    % (self.timeout))
+
+            time.sleep(self.poll_interval)
+
+
+    def _collect(self,work):
+
+        (i,ws,jobs) = work
+        d = self._shell_dir(i)
+
+        commands = dict(jobs)
+
+        output,es = ws.execute(
+            'for f in %(d)s/*.log; do n=$(basename $f .log);'
+            ' echo "=HCJOB=> $n $(cat %(d)s/$n.status 2>/dev/null)";'
+            ' cat $f; done' % {'d' : d},
+            fail_on_exit_code=False)
+
+        records = []
+        record = None
+        parser = None
+
+        for line in output.replace('\r','').split('\n'):
+
+            match = _job_header_re.match(line)
+            if match is not None:
+                if record is not None:
+                    records.append(_load_record(record,parser))
+                idx = int(match.group(1))
+                status = match.group(2)
+                record = {'index'       : idx,
+                          'shell'       : i,
+                          'command'     : commands.get(idx),
+                          'launched'    : None,
+                          'exit_status' : int(status) if status else None}
+                parser = SubmitMetricsParser(timestamped=True)
+                continue
+
+            if record is None:
+                continue
+
+            match = _job_start_re.match(line)
+            if match is not None:
+                record['launched'] = float(match.group(1))
+                continue
+
+            parser.feed(line + '\n')
+
+        if record is not None:
+            records.append(_load_record(record,parser))
+
+        return records
+
+
+    def _cleanup(self,work):
+
+        (i,ws,jobs) = work
+        ws.execute('rm -rf %s' % (self._shell_dir(i)),fail_on_exit_code=False)
+
+
+def _load_record(record,parser):
+    """
+    combine a launched command with the metrics parsed from its output.
+    commands that start several jobs (parameter sweeps) report the
+    first job to start and the last job to finish.
+    """
+
+    parser.close()
+    jobs = parser.jobs.values()
+    finished = parser.finished_jobs()
+
+    record['jobs'] = len(jobs)
+    record['venue'] = None
+    record['queued'] = None
+    record['run'] = None
+    record['turnaround'] = None
+    record['complete'] = (len(jobs) > 0 and len(finished) == len(jobs))
+
+    if record['launched'] is not None and len(jobs) > 0:
+        record['queued'] = min([j['started'] for j in jobs]) \
+                           - record['launched']
+
+    if record['complete']:
+        record['venue'] = finished[-1].get('venue')
+        record['run'] = max([_number(j.get('realtime')) for j in finished])
+        record['finished'] = max([j['finished'] for j in finished])
+        if record['launched'] is not None:
+            record['turnaround'] = record['finished'] - record['launched']
+
+    return record
+
+
+class SubmitLoadResult(object):
+    """
+    the per job measurements from one run of the SubmitLoadGenerator
+    """
+
+    def __init__(self,concurrency,jobs):
+
+        self.concurrency = concurrency
+        self.jobs = jobs
+
+
+    def errors(self):
+        """
+        return the jobs that failed or did not report metrics
+        """
+
+        return [j for j in self.jobs
+                if j['exit_status'] != 0 or not j['complete']]
+
+
+    def throughput(self):
+        """
+        completed jobs per second, from the first launch
+        until the last job finished.
+        """
+
+        done = [j for j in self.jobs
+                if j['complete'] and j['launched'] is not None]
+
+        if len(done) == 0:
+            return 0.0
+
+        elapsed = max([j['finished'] for j in done]) \
+                  - min([j['launched'] for j in done])
+
+        if elapsed <= 0:
+            return None
+
+        return len(done)/elapsed
+
+
+    def summary(self):
+        """
+        return a dictionary describing the run, suitable
+        for the performance report.
+        """
+
+        return {'concurrency' : self.concurrency,
+                'launched'    : len(self.jobs),
+                'errors'      : len(self.errors()),
+                'throughput'  : self.throughput(),
+                'queued'      : summarize([j['queued'] for j in self.jobs]),
+                'run'         : summarize([j['run'] for j in self.jobs]),
+                'turnaround'  : summarize([j['turnaround']
+                                           for j in self.jobs])}
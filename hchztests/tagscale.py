@@ -0,0 +1,185 @@
+"""
+measure how tag listings scale with the number of rows shown.
+
+pages are loaded at each display limit and the rows are extracted
+from them, timing the load, mostly the server rendering the page, and
+the extraction separately. on a hub, the rows are extracted through
+the tags page objects, so extraction measures the harness parsing the
+rows. against TagsStandIn, rows are extracted with parse_tag_table(),
+a regular expression, which only shows how the stand-in's pages grow.
+"""
+
+import cgi
+import math
+import random
+import re
+
+from hchztests.perf import Timer
+
+
+DISPLAY_LIMITS = ['5','20','100','All']
+
+
+def limit_rows(display_limit,total):
+    """
+    return the number of rows a page shows at display_limit
+    """
+
+    if display_limit == 'All':
+        return total
+    return min(int(display_limit),total)
+
+
+def display_limit_url(url,display_limit):
+    """
+    add the query that sets display_limit to url.
+    like the hub, a limit of 0 shows all rows.
+    """
+
+    limit = '0' if display_limit == 'All' else display_limit
+    sep = '&' if '?' in url else '?'
+    return '%s%slimit=%s&limitstart=0' % (url,sep,limit)
+
+
+def synthetic_tags(count,seed=0):
+    """
+    generate count tags, as (name,text,count) tuples, sorted by name
+    """
+
+    rng = random.Random(seed)
+
+    tags = []
+    for i in range(count):
+        name = 'hctag%06d' % (i)
+        text = 'hc tag %d %s' % (i,rng.choice(['alpha','beta','gamma']))
+        tags.append((name,text,rng.randint(0,500)))
+
+    return tags
+
+
+def tag_table_html(title,tags,total,start=0):
+    """
+    render a page with a hub like table of tags and its caption and
+    pagination counts. tags are the rows on the page, the start'th
+    to the start+len(tags)'th of total tags.
+    """
+
+    end = start + len(tags)
+    first = start + 1 if end > 0 else 0
+
+    parts = ['<html><body><form method="get">',
+             '<table class="entries">',
+             '<caption>%s (%d - %d of %d)</caption>'
+             % (cgi.escape(title),first,end,total),
+             '<tbody>']
+
+    for name,text,count in tags:
+        parts.append('<tr><td><a class="tag" href="/tags/%s">%s</a></td>'
+                     % (name,cgi.escape(text))
+                     + '<td class="count">%d</td></tr>' % (count))
+
+    parts.extend(['</tbody></table>',
+                  '<ul class="pagination">',
+                  '<li class="counter">Results %d - %d of %d</li>'
+                  % (first,end,total),
+                  '</ul></form></body></html>'])
+
+    return '\n'.join(parts)
+
+
+_row_re = re.compile(r'<tr>\s*<td>\s*<a class="tag" href="/tags/([^"]+)">'
+                     + r'(.*?)</a>\s*</td>\s*<td class="count">(\d+)</td>',
+                     re.S)
+_caption_re = re.compile(r'<caption>.*?\((\d+) - (\d+) of (\d+)\)</caption>')
+
+
+def parse_tag_table(html):
+    """
+    parse the rows of a tag_table_html() page into a list of
+    (name,text,count) tuples
+    """
+
+    return [(name,text,int(count))
+            for name,text,count in _row_re.findall(html)]
+
+
+def parse_caption_counts(html):
+    """
+    return the (start,end,total) caption counts of a tag_table_html()
+    page, or None if the page has no caption.
+    """
+
+    m = _caption_re.search(html)
+    if m is None:
+        return None
+    return tuple([int(c) for c in m.groups()])
+
+
+def time_display_limits(load,extract,limits=DISPLAY_LIMITS):
+    """
+    time loading a page and extracting its rows at each display limit.
+
+    load is a callable taking a display limit that loads the page.
+    extract is a callable that returns the list of rows on the loaded
+    page. returns a list of dictionaries, one per display limit.
+    """
+
+    results = []
+
+    for display_limit in limits:
+
+        with Timer() as loading:
+            load(display_limit)
+
+        with Timer() as extracting:
+            rows = extract()
+
+        per_row = None
+        if len(rows) > 0:
+            per_row = extracting.elapsed / len(rows)
+
+        results.append({'display_limit'   : display_limit,
+                        'rows'            : len(rows),
+                        'load_time'       : loading.elapsed,
+                        'extract_time'    : extracting.elapsed,
+                        'extract_per_row' : per_row})
+
+    return results
+
+
+def scaling_exponent(results,key):
+    """
+    estimate how the time in key grows with the number of rows,
+    as the exponent k of time ~ rows**k between the display limits
+    with the fewest and the most rows. 1 means the time grows
+    linearly with the rows, 0 means it does not depend on them.
+    returns None if the rows or times do not differ.
+    """
+
+    points = [(r['rows'],r[key]) for r in results
+              if r['rows'] > 0 and r[key] > 0]
+    if len(points) < 2:
+        return None
+
+    points.sort()
+    (n1,t1),(n2,t2) = points[0],points[-1]
+    if n1 == n2:
+        return None
+
+    return math.log(t2/t1) / math.log(float(n2)/n1)
+
+
+def format_scaling(results):
+    """
+    format display limit timings as a table, one display limit per line
+    """
+
+    lines = ['%7s %7s %10s %12s %12s'
+             % ('limit','rows','load ms','extract ms','us/row')]
+    for r in results:
+        lines.append('%7s %7d %10.1f %12.1f %12s'
+            % (r['display_limit'],r['rows'],r['load_time']*1000,
+               r['extract_time']*1000,
+               '%.1f' % (r['extract_per_row']*1e6)
+               if r['extract_per_row'] is not None else '-'))
+    return '\n'.join(lines)
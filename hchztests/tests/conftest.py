@@ -2,9 +2,25 @@ import pytest
 import time
 import re
 import os
+import sys
+import warnings
 
 import hubcheck
 
+from hubcheck.shell import ContainerManager
+
+from hchztests.artifacts import ArtifactWriter
+from hchztests.artifacts import capture_browser_artifacts
+from hchztests.har import PageWeightGuard
+from hchztests.invariants import counts_record
+from hchztests.perf import PerfReport
+from hchztests.perf import RepeatStats
+from hchztests.perf import Z_SCORES
+from hchztests.probes import probe_environment
+from hchztests.recording import RingRecordXvfb
+from hchztests.sampler import attach_resource_usage
+from hchztests.sessions import reap_sessions
+
 def pytest_addoption(parser):
     parser.addoption(
         "--rappture_version",
@@ -24,17 +40,280 @@ def pytest_addoption(parser):
         action="store",
         default=1,
         type=int,
-        help="number of times to repeat each test")
+        help="number of times to repeat each test. repeated tests are"
+             + " summarized by failure rate and duration percentiles"
+             + " in the performance report")
+
+    parser.addoption(
+        "--repeat_ci_width",
+        action="store",
+        default=0,
+        type=float,
+        help="stop repeating a test once the --repeat_confidence interval"
+             + " of its failure rate is no wider than this, like 0.2."
+             + " 0 runs every repeat")
+
+    parser.addoption(
+        "--repeat_confidence",
+        action="store",
+        default=0.95,
+        type=float,
+        choices=sorted(Z_SCORES.keys()),
+        help="confidence level of the failure rate intervals of"
+             + " repeated tests")
+
+    parser.addoption(
+        "--repeat_min",
+        action="store",
+        default=10,
+        type=int,
+        help="number of times to run a test before --repeat_ci_width"
+             + " can stop it")
+
+    parser.addoption(
+        "--perf_history",
+        action="store",
+        default=None,
+        help="file to append performance measurements to, as json lines")
+
+    parser.addoption(
+        "--keepalive_requests",
+        action="store",
+        default=5,
+        type=int,
+        help="number of requests made on each connection in keep-alive tests")
+
+    parser.addoption(
+        "--require_http2",
+        action="store_true",
+        default=False,
+        help="fail connection tests if the hub does not offer http/2")
+
+    parser.addoption(
+        "--max_redirects",
+        action="store",
+        default=2,
+        type=int,
+        help="longest redirect chain allowed for entry urls")
+
+    parser.addoption(
+        "--page_budget",
+        action="store",
+        default=None,
+        help="json file of page weight budgets, keyed by page type")
+
+    parser.addoption(
+        "--submit_load_levels",
+        action="store",
+        default="1,5,10",
+        help="comma separated numbers of concurrent submit jobs to launch")
+
+    parser.addoption(
+        "--submit_load_shells",
+        action="store",
+        default=1,
+        type=int,
+        help="number of workspace shells to launch submit jobs from")
+
+    parser.addoption(
+        "--submit_load_venue",
+        action="store",
+        default='',
+        help="submit venue for load tests, defaults to --local")
+
+    parser.addoption(
+        "--session_stress_count",
+        action="store",
+        default=6,
+        type=int,
+        help="number of tool sessions to launch concurrently in stress tests")
+
+    parser.addoption(
+        "--groups_benchmark_count",
+        action="store",
+        default=20,
+        type=int,
+        help="number of times to run each user and group lookup in"
+             + " groups benchmarks")
+
+    parser.addoption(
+        "--login_load_levels",
+        action="store",
+        default="1,2,4,8",
+        help="comma separated numbers of concurrent logins to ramp"
+             + " through in login load tests")
+
+    parser.addoption(
+        "--login_load_count",
+        action="store",
+        default=20,
+        type=int,
+        help="number of logins at each concurrency in login load tests")
+
+    parser.addoption(
+        "--pagination_fail_fast",
+        action="store_true",
+        default=False,
+        help="stop walking the pages of a listing at the first page"
+             + " with a problem, instead of checking every page")
+
+    parser.addoption(
+        "--pipeline_search_repeat",
+        action="store",
+        default=5,
+        type=int,
+        help="number of times to run each query in tools pipeline"
+             + " search benchmarks")
+
+    parser.addoption(
+        "--tty_churn_count",
+        action="store",
+        default=31,
+        type=int,
+        help="number of connections to open and close in tty churn tests")
+
+    parser.addoption(
+        "--tty_churn_concurrency",
+        action="store",
+        default=1,
+        type=int,
+        help="number of connections open at the same time in tty churn tests")
+
+    parser.addoption(
+        "--parampass_window",
+        action="store",
+        default=3,
+        type=int,
+        help="number of parameter passing tool sessions open at the same"
+             + " time, at least 1")
+
+    parser.addoption(
+        "--resource_sample_interval",
+        action="store",
+        default=0,
+        type=float,
+        help="seconds between samples of tool session container resource"
+             + " usage, attached to the reports of tests that sample."
+             + " 0 disables sampling")
+
+    parser.addoption(
+        "--artifact_dir",
+        action="store",
+        default=None,
+        help="directory for the screenshots, page source, HAR files and"
+             + " console logs of failed tests. defaults to hubcheck's"
+             + " screenshot_dir")
+
+    parser.addoption(
+        "--artifact_compresslevel",
+        action="store",
+        default=6,
+        type=int,
+        help="gzip compression level of failed test artifacts,"
+             + " 0 writes them uncompressed")
+
+    parser.addoption(
+        "--video_mode",
+        action="store",
+        default="on_failure",
+        choices=["always","on_failure"],
+        help="'always' encodes a video of every recorded browser session,"
+             + " 'on_failure' keeps the last --video_ring_seconds of frames"
+             + " in memory and only encodes them when the session fails")
+
+    parser.addoption(
+        "--video_ring_seconds",
+        action="store",
+        default=30,
+        type=float,
+        help="seconds of frames kept for --video_mode=on_failure")
+
+    parser.addoption(
+        "--reap_sessions",
+        action="store",
+        default=None,
+        help="at the end of the run, stop the test accounts' tool sessions"
+             + " whose name or title matches this regular expression")
+
+
+def pytest_configure(config):
+
+    config._perf_report = PerfReport(config.getoption("--perf_history"))
+
+    config._repeat_stats = None
+    if config.getoption("--repeat") > 1:
+        config._repeat_stats = RepeatStats(
+                                config.getoption("--repeat_ci_width"),
+                                config.getoption("--repeat_confidence"),
+                                config.getoption("--repeat_min"))
+
+
+def pytest_sessionfinish(session):
+
+    stats = getattr(session.config,'_repeat_stats',None)
+    if stats is not None:
+        stats.record(session.config._perf_report)
+
+
+def pytest_unconfigure(config):
+
+    report = getattr(config,'_perf_report',None)
+    if report is not None:
+        report.save()
+
+    # finish writing the artifacts of failed tests
+    writer = getattr(config,'_artifact_writer',None)
+    if writer is not None:
+        writer.close()
+        for error in writer.errors:
+            warnings.warn('saving artifact %s failed' % (error))
+        if writer.dropped > 0:
+            warnings.warn('dropped %d artifact(s), the writer fell behind'
+                          % (writer.dropped))
+
+
+def pytest_terminal_summary(terminalreporter):
+
+    report = getattr(terminalreporter.config,'_perf_report',None)
+    if report is None or len(report.entries()) == 0:
+        return
+
+    terminalreporter.write_sep('=','performance report')
+    terminalreporter.write_line(report.format_table())
 
 
 def pytest_generate_tests(metafunc):
 
-    if metafunc.config.option.repeat > 1:
-        for i in range(metafunc.config.option.repeat):
-            metafunc.addcall()
+    repeat = metafunc.config.option.repeat
+    if repeat > 1:
+        metafunc.parametrize('repeat_iteration',range(1,repeat+1),
+                             indirect=True,
+                             ids=['repeat%d' % (i) for i in range(1,repeat+1)])
+
+
+@pytest.fixture(autouse=True)
+def repeat_iteration(request):
+    """
+    the iteration number of a test run with --repeat, or None. tests
+    of classes can read it from self.repeat_iteration.
+    """
+
+    iteration = getattr(request,'param',None)
+
+    if request.instance is not None:
+        request.instance.repeat_iteration = iteration
+
+    return iteration
 
 
 def pytest_runtest_setup(item):
+
+    # skip the remaining iterations of tests whose failure rate is known
+    stats = item.config._repeat_stats
+    if stats is not None and stats.done(item.nodeid):
+        stats.add_stopped(item.nodeid)
+        pytest.skip('failure rate known within --repeat_ci_width')
+
     delay = pytest.config.getoption("--delay")
     if delay > 0:
         time.sleep(delay)
@@ -50,13 +329,48 @@ def pytest_runtest_makereport(item, call, __multicall__):
     else:
         setattr(item,'rep_take_screenshot',False)
 
+    # collect the outcome and duration of each iteration of --repeat
+    stats = item.config._repeat_stats
+    if stats is not None and not rep.skipped \
+       and (rep.when == "call" or (rep.when == "setup" and rep.failed)):
+        stats.add(item.nodeid,rep.outcome,
+                  getattr(call,'stop',0) - getattr(call,'start',0))
+
+    # attach the container resource usage sampled during the test
+    attach_resource_usage(item,call,rep)
+
     return rep
 
 
+def _artifact_writer(config):
+    """
+    return the run's writer for the artifacts of failed tests, created
+    on the first failure, or None if there is no directory to write
+    them to.
+    """
+
+    if not hasattr(config,'_artifact_writer'):
+
+        directory = config.getoption("--artifact_dir") \
+                    or hubcheck.conf.settings.screenshot_dir
+
+        config._artifact_writer = None
+        if directory is not None:
+            config._artifact_writer = ArtifactWriter(
+                os.path.abspath(
+                    os.path.expanduser(
+                        os.path.expandvars(directory))),
+                config.getoption("--artifact_compresslevel"))
+
+    return config._artifact_writer
+
+
 @pytest.fixture(autouse=True)
-def finalize_take_screenshot_on_error(request):
+def finalize_save_artifacts_on_error(request):
     """
-    if the test case failed, take a screenshot of the browser
+    if the test case failed, capture a screenshot, the page source,
+    the HAR and the console log of the browser. the artifacts are
+    written in the background, under names unique to this failure.
     """
 
     def fin():
@@ -65,17 +379,19 @@ def finalize_take_screenshot_on_error(request):
             return
 
         self = request.instance
-        if self.screenshotfn is not None:
-            if hasattr(self,'browser') and self.browser is not None:
-                try:
-                    self.browser.take_screenshot(self.screenshotfn)
-                except Exception:
-                    self.logger.debug('Exception ignored: %s %s'
-                        % (sys.exc_info()[1],sys.exc_info()[2]))
+        if getattr(self,'browser',None) is None:
+            return
+
+        writer = _artifact_writer(request.config)
+        if writer is None:
+            return
 
+        basename = writer.basename(request.node.nodeid)
+        for ext,data in capture_browser_artifacts(self.browser):
+            writer.submit(basename,ext,data)
 
-    request.addfinalizer(fin)
 
+    request.addfinalizer(fin)
 
 
 @pytest.fixture(scope="class")
@@ -92,6 +408,72 @@ def rappture_version(request):
     request.cls.rappture_version = rpversion
 
 
+@pytest.fixture(scope="class")
+def perf_report(request):
+    """
+    the suite's performance report. measurements recorded here are
+    printed at the end of the run and saved to the --perf_history file.
+    """
+
+    report = request.config._perf_report
+
+    if request.cls is not None:
+        request.cls.perf_report = report
+
+    return report
+
+
+@pytest.fixture(scope="class")
+def page_weight_guard(request,perf_report):
+    """
+    records the weight of pages into the performance report and checks
+    them against the --page_budget file.
+    """
+
+    guard = getattr(request.config,'_page_weight_guard',None)
+
+    if guard is None:
+        guard = PageWeightGuard(request.config.getoption("--page_budget"),
+                                perf_report)
+        request.config._page_weight_guard = guard
+
+    if request.cls is not None:
+        request.cls.page_weight_guard = guard
+
+    return guard
+
+
+@pytest.fixture(scope="class")
+def container_facts(request):
+    """
+    facts about the environment of a registeredworkspace user's tool
+    session container, see hchztests.probes.ENVIRONMENT_FACTS. the
+    facts are gathered once per run, with a single command.
+    """
+
+    facts = getattr(request.config,'_container_facts',None)
+
+    if facts is None:
+        testdata = request.getfuncargvalue('testdata')
+        hubname = testdata.find_url_for('https')
+        username,userpass = testdata.find_account_for('registeredworkspace')
+
+        ws = ContainerManager().access(host=hubname,
+                                       username=username,
+                                       password=userpass)
+        try:
+            facts = probe_environment(ws)
+        finally:
+            ws.close()
+
+        request.config._container_facts = facts
+
+    if request.cls is not None:
+        request.cls.container_facts = facts
+
+    return facts
+
+
 @pytest.fixture(scope="session")
 def testdata():
 
@@ -102,6 +484,34 @@ def testdata():
     return testdata
 
 
+@pytest.fixture(scope="session",autouse=True)
+def reap_leaked_sessions(request):
+    """
+    stop tool sessions leaked by this and earlier, crashed, runs
+    so they don't pile up against the per-user session limits.
+    enabled with --reap_sessions.
+    """
+
+    pattern = request.config.getoption("--reap_sessions")
+    if pattern is None:
+        return
+
+    testdata = request.getfuncargvalue('testdata')
+
+    hubname = testdata.find_url_for('https')
+
+    accounts = []
+    for username in testdata.get_usernames():
+        userdata = testdata.get_userdata_for(username)
+        if 'mw-login' in userdata.admin_properties.groups:
+            accounts.append((userdata.username,userdata.password))
+
+    def fin():
+        reap_sessions(hubname,accounts,pattern)
+
+    request.addfinalizer(fin)
+
+
 @pytest.fixture(scope="session")
 def locators(testdata):
 
@@ -233,11 +643,18 @@ def _setup_tool_state_x(request,hc,testdata,urls,videofn,state_name,
     toolname = request.module.TOOLNAME
 
     # start recording, start browser, login
-    recording = hubcheck.utils.WebRecordXvfb(videofn)
+    video_mode = request.config.getoption("--video_mode")
+    if video_mode == 'always':
+        recording = hubcheck.utils.WebRecordXvfb(videofn)
+    else:
+        recording = RingRecordXvfb(videofn,
+                        request.config.getoption("--video_ring_seconds"))
     recording.start()
 
     hc.browser.get(urls['https_authority'])
 
+    failed = True
+
     try:
         username,password = testdata.find_account_for('toolmanager')
         hc.utils.account.login_as(username,password)
@@ -273,9 +690,20 @@ def _setup_tool_state_x(request,hc,testdata,urls,videofn,state_name,
         # logout, close browser, stop recording
         po.goto_logout()
 
+        failed = False
+
     finally:
         hc.browser.close()
 
+        # only encode the last seconds of the recording on failure
+        if failed and video_mode == 'on_failure':
+            try:
+                recording.save()
+            except Exception:
+                # don't hide the error that failed the setup
+                warnings.warn('saving video %s failed: %s'
+                              % (videofn,sys.exc_info()[1]))
+
         recording.stop()
 
 
@@ -564,9 +992,10 @@ def setup_populate_tool_repository(request):
 
 
 @pytest.fixture(scope='session')
-def tag_browse_pagination_counts(request,hc,urls):
+def tag_browse_counts(request,hc,urls):
     """
-    retrieve the pagination counts for a tag
+    retrieve the caption and pagination counts of /tags/browse
+    as a counts record
     """
 
     hc.browser.get(urls['https_authority'])
@@ -575,52 +1004,21 @@ def tag_browse_pagination_counts(request,hc,urls):
         po = hc.catalog.load_pageobject('TagsBrowsePage')
         po.goto_page()
 
-        counts = po.get_pagination_counts()
-
-        current_url = po.current_url()
+        record = counts_record(po.current_url(),
+                               po.get_caption_counts(),
+                               po.get_pagination_counts())
 
     finally:
         hc.browser.close()
 
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
+    return record
 
 
 @pytest.fixture(scope='session')
-def tag_browse_caption_counts(request,hc,urls):
+def tag_browse_counts_all(request,hc,urls):
     """
-    retrieve the caption counts for a tag
-    """
-
-    hc.browser.get(urls['https_authority'])
-
-    try:
-        po = hc.catalog.load_pageobject('TagsBrowsePage')
-        po.goto_page()
-
-        counts = po.get_caption_counts()
-
-        current_url = po.current_url()
-
-    finally:
-        hc.browser.close()
-
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
-
-
-@pytest.fixture(scope='session')
-def tag_browse_pagination_counts_all(request,hc,urls):
-    """
-    retrieve the pagination counts for a tag
+    retrieve the caption counts of /tags/browse after changing the
+    display limit to 'All'. pagination under 'All' is not checked.
     """
 
     hc.browser.get(urls['https_authority'])
@@ -633,50 +1031,13 @@ def tag_browse_pagination_counts_all(request,hc,urls):
         new_display_limit = 'All'
         po.form.footer.display_limit(new_display_limit)
 
-        counts = po.get_pagination_counts()
-
-        current_url = po.current_url()
+        record = counts_record(po.current_url(),
+                               po.get_caption_counts())
 
     finally:
         hc.browser.close()
 
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
-
-
-@pytest.fixture(scope='session')
-def tag_browse_caption_counts_all(request,hc,urls):
-    """
-    retrieve the caption counts for a tag
-    """
-
-    hc.browser.get(urls['https_authority'])
-
-    try:
-        po = hc.catalog.load_pageobject('TagsBrowsePage')
-        po.goto_page()
-
-        # change the display limit to 'All'
-        new_display_limit = 'All'
-        po.form.footer.display_limit(new_display_limit)
-
-        counts = po.get_caption_counts()
-
-        current_url = po.current_url()
-
-    finally:
-        hc.browser.close()
-
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
+    return record
 
 
 @pytest.fixture(scope='session')
@@ -698,41 +1059,10 @@ def tag_with_items(request,hc,urls):
 
 
 @pytest.fixture(scope='session')
-def tag_view_pagination_counts(request,hc,urls,tag_with_items):
-    """
-    retrieve the pagination counts for a tag
-    """
-
-    hc.browser.get(urls['https_authority'])
-
-    try:
-        po = hc.catalog.load_pageobject('TagsPage')
-        po.goto_page()
-        po.search_for_content([tag_with_items])
-
-        po = hc.catalog.load_pageobject('TagsViewPage')
-
-        # counts has (pagination_start, pagination_end, pagination_total)
-
-        counts = po.get_pagination_counts()
-
-        current_url = po.current_url()
-
-    finally:
-        hc.browser.close()
-
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
-
-
-@pytest.fixture(scope='session')
-def tag_view_caption_counts(request,hc,urls,tag_with_items):
+def tag_view_counts(request,hc,urls,tag_with_items):
     """
-    retrieve the caption counts for a tag
+    retrieve the caption and pagination counts of the /tags/view
+    page of a tag with items as a counts record
     """
 
     hc.browser.get(urls['https_authority'])
@@ -744,27 +1074,22 @@ def tag_view_caption_counts(request,hc,urls,tag_with_items):
 
         po = hc.catalog.load_pageobject('TagsViewPage')
 
-        # counts has (caption_start, caption_end, caption_total)
-
-        counts = po.get_caption_counts()
-
-        current_url = po.current_url()
+        record = counts_record(po.current_url(),
+                               po.get_caption_counts(),
+                               po.get_pagination_counts())
 
     finally:
         hc.browser.close()
 
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
+    return record
 
 
 @pytest.fixture(scope='session')
-def tag_view_pagination_counts_all(request,hc,urls,tag_with_items):
+def tag_view_counts_all(request,hc,urls,tag_with_items):
     """
-    retrieve the pagination counts for a tag
+    retrieve the caption counts of the /tags/view page of a tag with
+    items after changing the display limit to 'All'. pagination under
+    'All' is not checked.
     """
 
     hc.browser.get(urls['https_authority'])
@@ -776,56 +1101,13 @@ def tag_view_pagination_counts_all(request,hc,urls,tag_with_items):
 
         po = hc.catalog.load_pageobject('TagsViewPage')
 
-        # counts has (pagination_start, pagination_end, pagination_total)
-
         new_display_limit = 'All'
         po.form.footer.display_limit(new_display_limit)
 
-        counts = po.get_pagination_counts()
-
-        current_url = po.current_url()
+        record = counts_record(po.current_url(),
+                               po.get_caption_counts())
 
     finally:
         hc.browser.close()
 
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
-
-
-@pytest.fixture(scope='session')
-def tag_view_caption_counts_all(request,hc,urls,tag_with_items):
-    """
-    retrieve the caption counts for a tag
-    """
-
-    hc.browser.get(urls['https_authority'])
-
-    try:
-        po = hc.catalog.load_pageobject('TagsPage')
-        po.goto_page()
-        po.search_for_content([tag_with_items])
-
-        po = hc.catalog.load_pageobject('TagsViewPage')
-
-        # counts has (caption_start, caption_end, caption_total)
-
-        new_display_limit = 'All'
-        po.form.footer.display_limit(new_display_limit)
-
-        counts = po.get_caption_counts()
-
-        current_url = po.current_url()
-
-    finally:
-        hc.browser.close()
-
-    r = {'start'    : counts[0],
-         'end'      : counts[1],
-         'total'    : counts[2],
-         'url'      : current_url}
-
-    return r
+    return record
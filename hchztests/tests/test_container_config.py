@@ -8,6 +8,11 @@ from hubcheck.testcase import TestCase
 from hubcheck.testcase import TestCase2
 from hubcheck.shell import ContainerManager
 
+from hchztests.idlookup import benchmark_lookups
+from hchztests.probes import audit_paths
+from hchztests.probes import path_problems
+from hchztests.procs import ProcessSnapshot
+
 
 pytestmark = [ pytest.mark.container,
                pytest.mark.config,
@@ -44,252 +49,97 @@ ICEWM_CONF_FILE_SPEC = [
 #    submit      submit          /usr/bin/submit         {""}
 #}
 
+# script name, expected path, legacy paths
+SCRIPT_PATHS = [
+    ('filexfer',          '/usr/bin/filexfer',
+        ['/apps/bin/filexfer','/apps/filexfer/bin/filexfer']),
+    ('importfile',        '/usr/bin/importfile',
+        ['/apps/bin/importfile','/apps/filexfer/bin/importfile']),
+    ('exportfile',        '/usr/bin/exportfile',
+        ['/apps/bin/exportfile','/apps/filexfer/bin/exportfile']),
+    ('clientaction',      '/usr/bin/clientaction',
+        ['/apps/xvnc/bin/clientaction','/usr/lib/mw/bin/clientaction']),
+    ('pixelflip',         '/usr/bin/pixelflip',
+        ['/apps/xvnc/bin/pixelflip','/usr/lib/mw/bin/pixelflip']),
+    ('mergeauth',         '/usr/bin/mergeauth',
+        ['/apps/xvnc/mergeauth','/usr/lib/mw/bin/mergeauth']),
+    ('startxvnc',         '/usr/bin/startxvnc',
+        ['/apps/xvnc/start','/usr/lib/mw/bin/startxvnc']),
+    ('xsetroot',          '/usr/bin/xsetroot',          []),
+    ('icewm',             '/usr/bin/icewm',             []),
+    ('icewm-captive',     '/usr/bin/icewm-captive',     []),
+    ('ratpoison',         '/usr/bin/ratpoison',         []),
+    ('ratpoison-captive', '/usr/bin/ratpoison-captive', []),
+    ('invoke_app',        '/usr/bin/invoke_app',        []),
+    ('submit',            '/usr/bin/submit',            []),
+]
+
+
 @pytest.mark.container_exes
-class container_config(TestCase):
+class TestContainerConfigPaths(TestCase2):
 
+    # the audit of all scripts, run once for the class in each
+    # --repeat iteration
+    path_reports = {}
 
-    def setUp(self):
+
+    def setup_method(self,method):
 
         # get user account info
-        hubname = self.testdata.find_url_for('https')
+        self.hubname = self.testdata.find_url_for('https')
         self.username,self.userpass = \
             self.testdata.find_account_for('registeredworkspace')
 
-        cm = ContainerManager()
-        self.ws = cm.access(host=hubname,
-                            username=self.username,
-                            password=self.userpass)
-
-
-    def _check_script_details(self,script_name,current_path,old_paths):
-
-        # check for script in search path
-        command = 'which %s' % (script_name)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output != '',"'%s' not in search path" % (script_name))
-
-        # check for the current path of the script
-        self.assertTrue(output == current_path,
-            "'%s' calls '%s' instead of '%s'" \
-            % (script_name,output,current_path))
-
-        # check for old versions of the script
-        old_found = []
-        for p in old_paths:
-            command = '[[ -e %s ]] && echo 1 || echo 0' % (p)
-            output,es = self.ws.execute(command)
-            if output == '1':
-                old_found.append(p)
-        self.assertTrue(len(old_found) == 0,
-            "old locations of %s found: %s" % (script_name,old_found))
-
-
-    def test_paths_filexfer(self):
-        """
-        check if 'filexfer' is in the search path
-        """
-
-        script_name = 'filexfer'
-        current_path = '/usr/bin/filexfer'
-        old_paths = ['/apps/bin/filexfer','/apps/filexfer/bin/filexfer']
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_importfile(self):
-        """
-        check if 'importfile' is in the search path
-        """
-
-        script_name = 'importfile'
-        current_path = '/usr/bin/importfile'
-        old_paths = ['/apps/bin/importfile','/apps/filexfer/bin/importfile']
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_exportfile(self):
-        """
-        check if 'exportfile' is in the search path
-        """
-
-        script_name = 'exportfile'
-        current_path = '/usr/bin/exportfile'
-        old_paths = ['/apps/bin/exportfile','/apps/filexfer/bin/exportfile']
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_clientaction(self):
-        """
-        check if 'clientaction' is in the search path
-        """
-
-        script_name = 'clientaction'
-        current_path = '/usr/bin/clientaction'
-        old_paths = ['/apps/xvnc/bin/clientaction','/usr/lib/mw/bin/clientaction']
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_pixelflip(self):
-        """
-        check if 'pixelflip' is in the search path
-        """
-
-        script_name = 'pixelflip'
-        current_path = '/usr/bin/pixelflip'
-        old_paths = ['/apps/xvnc/bin/pixelflip','/usr/lib/mw/bin/pixelflip']
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_mergeauth(self):
-        """
-        check if 'mergeauth' is in the search path
-        """
-
-        script_name = 'mergeauth'
-        current_path = '/usr/bin/mergeauth'
-        old_paths = ['/apps/xvnc/mergeauth','/usr/lib/mw/bin/mergeauth']
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_startxvnc(self):
-        """
-        check if 'startxvnc' is in the search path
-        """
-
-        script_name = 'startxvnc'
-        current_path = '/usr/bin/startxvnc'
-        old_paths = ['/apps/xvnc/start','/usr/lib/mw/bin/startxvnc']
-
-        self._check_script_details(script_name,current_path,old_paths)
 
-
-    def test_paths_xsetroot(self):
-        """
-        check if 'xsetroot' is in the search path
-        """
-
-        script_name = 'xsetroot'
-        current_path = '/usr/bin/xsetroot'
-        old_paths = []
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_icewm(self):
-        """
-        check if 'icewm' is in the search path
+    def _path_report(self):
         """
-
-        script_name = 'icewm'
-        current_path = '/usr/bin/icewm'
-        old_paths = []
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_icewm_captive(self):
+        return the path audit of SCRIPT_PATHS. the first call of each
+        --repeat iteration audits every script with one command in one
+        workspace.
         """
-        check if 'icewm-captive' is in the search path
-        """
-
-        script_name = 'icewm-captive'
-        current_path = '/usr/bin/icewm-captive'
-        old_paths = []
 
-        self._check_script_details(script_name,current_path,old_paths)
+        cls = self.__class__
+        iteration = getattr(self,'repeat_iteration',None)
 
+        if iteration not in cls.path_reports:
 
-    def test_paths_ratpoison(self):
-        """
-        check if 'ratpoison' is in the search path
-        """
-
-        script_name = 'ratpoison'
-        current_path = '/usr/bin/ratpoison'
-        old_paths = []
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_ratpoison_captive(self):
-        """
-        check if 'ratpoison-captive' is in the search path
-        """
-
-        script_name = 'ratpoison-captive'
-        current_path = '/usr/bin/ratpoison-captive'
-        old_paths = []
-
-        self._check_script_details(script_name,current_path,old_paths)
-
-
-    def test_paths_invoke_app(self):
-        """
-        check if 'invoke_app' is in the search path
-        """
-
-        script_name = 'invoke_app'
-        current_path = '/usr/bin/invoke_app'
-        old_paths = []
+            cm = ContainerManager()
+            ws = cm.access(host=self.hubname,
+                           username=self.username,
+                           password=self.userpass)
+            try:
+                cls.path_reports[iteration] = audit_paths(ws,SCRIPT_PATHS)
+            finally:
+                # get out of the workspace
+                # shut down the ssh connection
+                ws.close()
 
-        self._check_script_details(script_name,current_path,old_paths)
+        return cls.path_reports[iteration]
 
 
-    def test_paths_submit(self):
+    @pytest.mark.parametrize("script_name",[s[0] for s in SCRIPT_PATHS])
+    def test_paths(self,script_name):
         """
-        check if 'submit' is in the search path
+        check if the script is in the search path at its current
+        location, and not at any of its old locations
         """
 
-        script_name = 'submit'
-        current_path = '/usr/bin/submit'
-        old_paths = []
-
-        self._check_script_details(script_name,current_path,old_paths)
+        problems = path_problems(script_name,self._path_report()[script_name])
 
-
-    def tearDown(self):
-
-        # get out of the workspace
-        # shut down the ssh connection
-        self.ws.close()
+        assert len(problems) == 0, '\n'.join(problems)
 
 
 @pytest.mark.session_number
+@pytest.mark.usefixtures('container_facts')
 class container_session_number_config(TestCase):
 
 
-    def setUp(self):
-
-        # get user account info
-        hubname = self.testdata.find_url_for('https')
-        self.username,self.userpass = \
-            self.testdata.find_account_for('registeredworkspace')
-
-        cm = ContainerManager()
-        self.ws = cm.access(host=hubname,
-                            username=self.username,
-                            password=self.userpass)
-
-
-    def tearDown(self):
-
-        # get out of the workspace
-        # shut down the ssh connection
-        self.ws.close()
-
-
     def test_environment_session_number(self):
         """
         check if $SESSION exists and is an integer
         """
 
-        command = 'echo $SESSION'
-        session_number,es = self.ws.execute(command)
+        session_number = self.container_facts['env']['SESSION']
 
         try:
             int_session_number = int(session_number)
@@ -306,12 +156,11 @@ class container_session_number_config(TestCase):
         check if $SESSIONDIR exists and is a path that exists
         """
 
-        command = 'echo $SESSIONDIR'
-        session_dir,es = self.ws.execute(command)
+        session_dir = self.container_facts['env']['SESSIONDIR']
 
         self.assertTrue(session_dir != '',"$SESSIONDIR is empty")
 
-        exists = self.ws.bash_test('-d %s' % (session_dir))
+        exists = self.container_facts['paths']['${SESSIONDIR}']['directory']
 
         self.assertTrue(exists,"$SESSIONDIR is not a directory: %s"
             % (session_dir))
@@ -325,27 +174,55 @@ class container_session_number_config(TestCase):
         is run. So we only test that the variable is populated.
         """
 
-        command = 'echo $RESULTSDIR'
-        results_dir,es = self.ws.execute(command)
+        results_dir = self.container_facts['env']['RESULTSDIR']
 
         self.assertTrue(results_dir != '',"$RESULTSDIR is empty")
 
 
 @pytest.mark.use
+@pytest.mark.usefixtures('container_facts')
 class container_use_config(TestCase):
 
 
     def setUp(self):
 
-        # get user account info
-        hubname = self.testdata.find_url_for('https')
-        self.username,self.userpass = \
-            self.testdata.find_account_for('registeredworkspace')
+        self.ws = None
 
-        cm = ContainerManager()
-        self.ws = cm.access(host=hubname,
-                            username=self.username,
-                            password=self.userpass)
+
+    def _check_does_not_exist(self,fname):
+
+        path = self.container_facts['paths'][fname]
+        self.assertTrue(path['exists'] is False,
+            "%s exists and should not." % (fname))
+
+
+    def _check_readable_directory(self,fname):
+
+        path = self.container_facts['paths'][fname]
+
+        # check that file exists
+        self.assertTrue(path['readable'],"%s is not readable" % (fname))
+
+        # check that file is a directory
+        self.assertTrue(path['directory'],"%s is not a directory" % (fname))
+
+
+    def _check_link(self,fname,points_to):
+
+        # see where fname points
+        output = self.container_facts['paths'][fname]['realpath']
+        self.assertTrue(output != fname,"%s does not exist" % (fname))
+
+        # see where points_to points
+        output = self.container_facts['paths'][points_to]['realpath']
+        self.assertTrue(output != points_to,"%s does not exist" % (points_to))
+
+
+    def _check_shell_function(self,name):
+
+        output = self.container_facts['functions'][name]
+        self.assertTrue(output == 'function',
+            "%s does not appear to be a function: %s" % (name,output))
 
 
     def test_apps_environ_setup_sh_does_not_exist(self):
@@ -353,12 +230,7 @@ class container_use_config(TestCase):
         check that /apps/environ/.setup.sh does not exist
         """
 
-        fname = '/apps/environ/.setup.sh'
-
-        # check the file exists
-        command = '[[ -e %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '0',"%s exists and should not." % (fname))
+        self._check_does_not_exist('/apps/environ/.setup.sh')
 
 
     def test_apps_environ_setup_csh_does_not_exist(self):
@@ -366,12 +238,7 @@ class container_use_config(TestCase):
         check that /apps/environ/.setup.csh does not exist
         """
 
-        fname = '/apps/environ/.setup.csh'
-
-        # check the file is readable
-        command = '[[ -e %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '0',"%s exists and should not." % (fname))
+        self._check_does_not_exist('/apps/environ/.setup.csh')
 
 
     @hubcheck.utils.tool_container_version('debian6')
@@ -380,17 +247,7 @@ class container_use_config(TestCase):
         check that /apps/share/debian6/environ.d is a readable directory
         """
 
-        fname = '/apps/share/debian6/environ.d'
-
-        # check that file exists
-        command = '[[ -r %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not readable" % (fname))
-
-        # check that file is a directory
-        command = '[[ -d %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not a directory" % (fname))
+        self._check_readable_directory('/apps/share/debian6/environ.d')
 
 
     @hubcheck.utils.tool_container_version('debian6')
@@ -399,17 +256,7 @@ class container_use_config(TestCase):
         check that /apps/share64/debian6/environ.d is a readable directory
         """
 
-        fname = '/apps/share64/debian6/environ.d'
-
-        # check that file exists
-        command = '[[ -r %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not readable" % (fname))
-
-        # check that file is a directory
-        command = '[[ -d %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not a directory" % (fname))
+        self._check_readable_directory('/apps/share64/debian6/environ.d')
 
 
     @hubcheck.utils.tool_container_version('debian7')
@@ -418,17 +265,7 @@ class container_use_config(TestCase):
         check that /apps/share/debian7/environ.d is a readable directory
         """
 
-        fname = '/apps/share/debian7/environ.d'
-
-        # check that file exists
-        command = '[[ -r %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not readable" % (fname))
-
-        # check that file is a directory
-        command = '[[ -d %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not a directory" % (fname))
+        self._check_readable_directory('/apps/share/debian7/environ.d')
 
 
     @hubcheck.utils.tool_container_version('debian7')
@@ -437,17 +274,7 @@ class container_use_config(TestCase):
         check that /apps/share64/debian7/environ.d is a readable directory
         """
 
-        fname = '/apps/share64/debian7/environ.d'
-
-        # check that file exists
-        command = '[[ -r %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not readable" % (fname))
-
-        # check that file is a directory
-        command = '[[ -d %s ]] && echo 1 || echo 0' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output == '1',"%s is not a directory" % (fname))
+        self._check_readable_directory('/apps/share64/debian7/environ.d')
 
 
     @hubcheck.utils.tool_container_version('debian7')
@@ -457,18 +284,8 @@ class container_use_config(TestCase):
         /apps/share64/debian7/rappture/dev/bin/rappture.use
         """
 
-        fname = '/apps/share64/debian7/environ.d/rappture-dev'
-        points_to = '/apps/share64/debian7/rappture/dev/bin/rappture.use'
-
-        # see where fname points
-        command = 'readlink -f %s' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output != fname,"%s does not exist" % (fname))
-
-        # see where points_to points
-        command = 'readlink -f %s' % (points_to)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output != points_to,"%s does not exist" % (points_to))
+        self._check_link('/apps/share64/debian7/environ.d/rappture-dev',
+                         '/apps/share64/debian7/rappture/dev/bin/rappture.use')
 
 
     @hubcheck.utils.tool_container_version('debian7')
@@ -478,18 +295,8 @@ class container_use_config(TestCase):
         /apps/share64/debian7/rappture/current/bin/rappture.use
         """
 
-        fname = '/apps/share64/debian7/environ.d/rappture'
-        points_to = '/apps/share64/debian7/rappture/current/bin/rappture.use'
-
-        # see where fname points
-        command = 'readlink -f %s' % (fname)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output != fname,"%s does not exist" % (fname))
-
-        # see where points_to points
-        command = 'readlink -f %s' % (points_to)
-        output,es = self.ws.execute(command)
-        self.assertTrue(output != points_to,"%s does not exist" % (points_to))
+        self._check_link('/apps/share64/debian7/environ.d/rappture',
+                         '/apps/share64/debian7/rappture/current/bin/rappture.use')
 
 
     def test_use_shell_function_available(self):
@@ -497,12 +304,7 @@ class container_use_config(TestCase):
         see if use is available as a shell function
         """
 
-        # get all the login shell profile stuff
-        self.ws.source('/etc/profile')
-
-        output,es = self.ws.execute('type use')
-        self.assertTrue(re.search(r'use is a function',output) is not None,
-            "use does not appear to be a function: %s" % (output))
+        self._check_shell_function('use')
 
 
     def test_unuse_shell_function_available(self):
@@ -510,12 +312,7 @@ class container_use_config(TestCase):
         see if unuse is available as a shell function
         """
 
-        # get all the login shell profile stuff
-        self.ws.source('/etc/profile')
-
-        output,es = self.ws.execute('type unuse')
-        self.assertTrue(re.search(r'unuse is a function',output) is not None,
-            "unuse does not appear to be a function: %s" % (output))
+        self._check_shell_function('unuse')
 
 
     def test_use_recognizes_tags(self):
@@ -523,6 +320,16 @@ class container_use_config(TestCase):
         check that the use program recognizes the tags command
         """
 
+        # get user account info
+        hubname = self.testdata.find_url_for('https')
+        username,userpass = \
+            self.testdata.find_account_for('registeredworkspace')
+
+        cm = ContainerManager()
+        self.ws = cm.access(host=hubname,
+                            username=username,
+                            password=userpass)
+
         # get all the login shell profile stuff
         self.ws.source('/etc/profile')
 
@@ -546,7 +353,8 @@ class container_use_config(TestCase):
 
         # get out of the workspace
         # shut down the ssh connection
-        self.ws.close()
+        if self.ws is not None:
+            self.ws.close()
 
 
 @pytest.mark.groups_time
@@ -629,6 +437,66 @@ class container_groups_config(TestCase):
         self._time_groups_for('appsworkspace')
 
 
+@pytest.mark.groups_benchmark
+class TestGroupsLookupBenchmark(TestCase2):
+
+
+    def setup_method(self,method):
+
+        self.ws = None
+        self.count = pytest.config.getoption("--groups_benchmark_count")
+
+
+    def teardown_method(self,method):
+
+        # get out of the workspace
+        # shut down the ssh connection
+        if self.ws is not None:
+            self.ws.close()
+
+
+    @pytest.mark.parametrize("usertype",
+        ['registeredworkspace','networkworkspace','appsworkspace'])
+    def test_groups_lookup_benchmark(self,usertype,perf_report):
+        """
+        time repeated groups, id and getent group lookups for a user,
+        reporting the first lookup, the warm lookup percentiles and
+        warm lookups that spike like cache misses.
+        """
+
+        # get user account info
+        hubname = self.testdata.find_url_for('https')
+        username,userpass = \
+            self.testdata.find_account_for(usertype)
+
+        cm = ContainerManager()
+        self.ws = cm.access(host=hubname,
+                            username=username,
+                            password=userpass)
+
+        results = benchmark_lookups(self.ws,username,self.count)
+
+        for command,summary in sorted(results.items()):
+            perf_report.record('groups_lookup',usertype=usertype,
+                command=command,**summary)
+
+        missing = [c for c,summary in results.items()
+                   if summary['count'] != self.count]
+
+        assert len(missing) == 0, \
+            "lookups did not finish %s times for %s: %s" \
+            % (self.count,usertype,missing)
+
+        slow = ['%s median %0.3fs' % (c,summary['median'])
+                for c,summary in results.items()
+                if summary['median'] is not None
+                and summary['median'] >= 1.0]
+
+        assert len(slow) == 0, \
+            "warm lookups took longer than 1 second for %s: %s" \
+            % (usertype,', '.join(slow))
+
+
 @pytest.mark.xfonts
 class container_fonts_config(TestCase):
 
@@ -652,18 +520,18 @@ class container_fonts_config(TestCase):
         """
 
         # get the running Xvnc command
-        command = 'ps auxww | grep -e Xvnc -e Xtigervnc | grep nobody'
-        output,es = self.ws.execute(command)
-        self.assertTrue(output != '',"Xvnc (or Xtigervnc) doesn't appear to be running")
+        snapshot = ProcessSnapshot(self.ws)
+        procs = snapshot.find('Xvnc',user='nobody') \
+                + snapshot.find('Xtigervnc',user='nobody')
+        self.assertTrue(len(procs) > 0,"Xvnc (or Xtigervnc) doesn't appear to be running")
 
         # search for the fontpath
-        font_re = re.compile('-fp ([^\s]+)')
-        match = font_re.search(output)
+        fontpaths = procs[0].option('-fp')
 
-        self.assertTrue(match is not None,
-            "failed to find fontpath in Xvnc (or Xtigervnc) command: %s" % (output))
+        self.assertTrue(fontpaths is not None,
+            "failed to find fontpath in Xvnc (or Xtigervnc) command: %s" \
+            % (' '.join(procs[0].cmdline)))
 
-        fontpaths = match.groups()[0]
         fontdirlist = fontpaths.split(',')
 
         checked_dirs = []
@@ -9,6 +9,12 @@ from hubcheck.testcase import TestCase
 from hubcheck.shell import ContainerManager
 from hubcheck.shell import SFTPClient
 
+from hchztests.invokeapp import InvokeAppRunner
+from hchztests.invokeapp import XvfbServer
+from hchztests.procs import ProcessSnapshot
+from hchztests.sampler import ResourceSampler
+from hchztests.staging import Stager
+
 pytestmark = [ pytest.mark.container,
                pytest.mark.invokeapp,
                pytest.mark.weekly,
@@ -48,10 +54,12 @@ TOOLXML = """<?xml version="1.0"?>
 @pytest.mark.registereduser
 class container_invokeapp(TestCase):
 
+    # one X server is shared by all of the tests in the class
+    xvfb = None
+    xvfb_account = None
 
-    def setUp(self):
 
-        self.remove_files = []
+    def setUp(self):
 
         # get user account info
         self.username,self.userpass = self.testdata.find_account_for('registeredworkspace')
@@ -69,92 +77,79 @@ class container_invokeapp(TestCase):
 
         self.ws.execute('cd $SESSIONDIR')
         self.sessiondir,es = self.ws.execute('pwd')
-        self.sftp.chdir(self.sessiondir)
 
-
-        # write data and script files to disk in the container.
-        for fname,fprop in FILES.items():
-            with self.sftp.open(fname,mode='w') as f:
-                f.write(fprop['contents'])
-            self.remove_files.append(os.path.join(self.sessiondir,fname))
-            self.sftp.chmod(fname,fprop['mode'])
+        # write data and script files to disk in the container,
+        # then work from the directory they were staged in.
+        self.stager = Stager(self.ws,self.sessiondir,sftp=self.sftp)
+        self.stager.stage(dict([(fname,(fprop['contents'],fprop['mode']))
+                                for fname,fprop in FILES.items()]))
+        self.stagedir = self.stager.directory
+        self.ws.execute('cd %s' % (self.stagedir))
+
+        # point the shell at the shared X server, to handle toolparams
+        # popup windows, starting the server if it is not running.
+        cls = self.__class__
+        if cls.xvfb is not None and cls.xvfb.alive(self.ws):
+            cls.xvfb.attach(self.ws)
+        else:
+            cls.xvfb = XvfbServer().start(self.ws)
+            cls.xvfb_account = (hubname,self.username,self.userpass)
+
+        self.runner = InvokeAppRunner(self.ws,timeout=30)
+
+        # sample the container's resource usage while the test runs
+        self.resource_sampler = None
+        interval = pytest.config.getoption("--resource_sample_interval")
+        if interval > 0:
+            self.resource_sampler = ResourceSampler(
+                lambda: cm.access(host=hubname,
+                                  username=self.username,
+                                  password=self.userpass),
+                sessiondir=self.sessiondir,interval=interval)
+            self.resource_sampler.start()
 
 
     def tearDown(self):
 
         # remove the executable and config files
-        for fname in self.remove_files:
-            self.sftp.remove(fname)
+        self.stager.cleanup()
         self.sftp.close()
 
+        if self.resource_sampler is not None:
+            self.resource_sampler.stop()
+
         # exit the workspace
         # shut down the ssh connection
         self.ws.close()
 
 
-    def _run_invoke_app(self,command,parameters_text=None):
-
-        if parameters_text is not None:
-            with self.sftp.open(PARAMETERS_PATH,'w') as f:
-                f.write(parameters_text)
-            self.remove_files.append(os.path.join(self.sessiondir,PARAMETERS_PATH))
-            cmd = 'export TOOL_PARAMETERS=%s' % (PARAMETERS_PATH)
-            self.ws.execute(cmd)
-
-        # allow up to 30 seconds for the command to run
-        oldtimeout = self.ws.timeout
-        self.ws.timeout = 30
+    @classmethod
+    def tearDownClass(cls):
 
-        # run the command in xvfb to handle toolparams popup windows
-        command = 'xvfb-run -s "-screen 0 800x600x24" ' + command
+        # stop the shared X server
+        if cls.xvfb is None:
+            return
 
-        # run the invoke_app command
-        result,err = self.ws.execute(command,fail_on_exit_code=False)
+        hubname,username,userpass = cls.xvfb_account
+        ws = ContainerManager().access(host=hubname,
+                                       username=username,
+                                       password=userpass)
+        try:
+            cls.xvfb.stop(ws)
+        finally:
+            ws.close()
+            cls.xvfb = None
 
-        # reset the command timeout
-        self.ws.timeout = oldtimeout
 
-        # check for error while running invoke_app command
-        toolout = None
-        matches = re.search("\nexec'ing[^\n]+\n(.*)",result,re.DOTALL)
-        if matches:
-            # grab the output
-            # strip off submit metrics from toolout
-            pattern = "=SUBMIT-METRICS=>.*$"
-            toolout = re.sub(pattern,'',matches.group(1),flags=re.MULTILINE)
-            toolout = toolout.strip()
-
-        return (result,err,toolout)
-
-
-    def _find_bg_command(self,command):
-
-        grep_cmd = 'ps aux | grep "' + command + '" | grep -v -e "bash\|grep"'
-        result,err = self.ws.execute(grep_cmd)
-
-        import re
-        rexp = '(?P<user>[^\s]+)\s+' + \
-               '(?P<pid>[^\s]+)\s+'  + \
-               '(?P<cpu>[^\s]+)\s+'  + \
-               '(?P<mem>[^\s]+)\s+'  + \
-               '(?P<vsz>[^\s]+)\s+'  + \
-               '(?P<rss>[^\s]+)\s+'  + \
-               '(?P<tty>[^\s]+)\s+'  + \
-               '(?P<stat>[^\s]+)\s+' + \
-               '(?P<start>[^\s]+)\s+' + \
-               '(?P<time>[^\s]+)\s+' + \
-               '(?P<command>[^\n]+)'
-
-        m = re.search(rexp,result)
-        if m is None:
-            return None
+    def _run_invoke_app(self,command,parameters_text=None):
 
-        # make sure we return the correct command
-        if m.group('command') != command:
-            # didn't find the correct command
-            return None
+        parameters_path = None
+        if parameters_text is not None:
+            self.stager.stage({PARAMETERS_PATH : (parameters_text,0600)})
+            parameters_path = PARAMETERS_PATH
 
-        return m.groupdict()
+        # run the invoke_app command against the shared X server
+        return self.runner.run(command,parameters_path)
 
 
     def test_1_command_no_templates(self):
@@ -219,7 +214,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -254,7 +249,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -324,7 +319,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -394,7 +389,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -430,7 +425,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile2):%s" % os.path.join(self.sessiondir,'datafile2'),
+            "file(datafile2):%s" % os.path.join(self.stagedir,'datafile2'),
         ])
 
         # build our invoke_app command
@@ -466,7 +461,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -503,7 +498,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile2):%s" % os.path.join(self.sessiondir,'datafile2'),
+            "file(datafile2):%s" % os.path.join(self.stagedir,'datafile2'),
         ])
 
         # build our invoke_app command
@@ -576,7 +571,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -614,7 +609,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile2):%s" % os.path.join(self.sessiondir,'datafile2'),
+            "file(datafile2):%s" % os.path.join(self.stagedir,'datafile2'),
         ])
 
         # build our invoke_app command
@@ -687,7 +682,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -724,7 +719,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile2):%s" % os.path.join(self.sessiondir,'datafile2'),
+            "file(datafile2):%s" % os.path.join(self.stagedir,'datafile2'),
         ])
 
         # build our invoke_app command
@@ -796,7 +791,7 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
         ])
 
         # build our invoke_app command
@@ -873,8 +868,8 @@ class container_invokeapp(TestCase):
 
         # create our parameters file
         parameters_text = '\n'.join([
-            "file(datafile1):%s" % os.path.join(self.sessiondir,'datafile1'),
-            "file(datafile2):%s" % os.path.join(self.sessiondir,'datafile2'),
+            "file(datafile1):%s" % os.path.join(self.stagedir,'datafile1'),
+            "file(datafile2):%s" % os.path.join(self.stagedir,'datafile2'),
         ])
 
         # build our invoke_app command
@@ -975,20 +970,22 @@ class container_invokeapp(TestCase):
 
 
         # check that the background job was started
-        result = self._find_bg_command(bg_cmd)
-        self.assertTrue(result is not None,)
+        procs = ProcessSnapshot(self.ws).find_cmdline(bg_cmd)
+        self.assertTrue(len(procs) > 0,
+            'background command "%s" is not running' % (bg_cmd))
 
 
     def test_working_directory_1(self):
         """launching invoke_app with a -d flag to change the working directory,
-           ex: invoke_app -C "sh \${SESSIONDIR}/slow_echo \${PWD}" -d ${HOME}
+           ex: invoke_app -C "sh <stagedir>/slow_echo \${PWD}" -d ${HOME}
+           where <stagedir> is the directory the test files were staged in
            should produce: ${HOME}
         """
 
         # build our invoke_app command
         homedir,err = self.ws.execute('sh ./slow_echo ${HOME}')
         command = INVOKE_APP_PATH \
-            + ' -C "sh \${SESSIONDIR}/slow_echo \${PWD}" -d ${HOME}'
+            + ' -C "sh %s/slow_echo \${PWD}" -d ${HOME}' % (self.stagedir)
 
         expected_out = homedir
 
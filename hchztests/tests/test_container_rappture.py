@@ -9,6 +9,8 @@ import hubcheck
 from hubcheck.testcase import TestCase2
 from hubcheck.shell import ContainerManager
 
+from hchztests.staging import Stager
+
 
 pytestmark = [ pytest.mark.container,
                pytest.mark.rappture,
@@ -49,7 +51,8 @@ class TestContainerRapptureCApi(TestCase2):
 
     def setup_method(self,method):
 
-        self.remove_files = []
+        # files to stage along with the program in run_code()
+        self.files = {}
 
         # get user account info
         self.username,self.userpass = self.testdata.find_account_for('registeredworkspace')
@@ -64,12 +67,13 @@ class TestContainerRapptureCApi(TestCase2):
         self.ws.execute('cd $SESSIONDIR')
         self.sessiondir,es = self.ws.execute('pwd')
 
+        self.stager = Stager(self.ws,self.sessiondir)
+
 
     def teardown_method(self,method):
 
         # remove the executable and config files
-        for fname in self.remove_files:
-            self.ws.execute('rm -f %s' % (fname))
+        self.stager.cleanup()
 
         # exit the workspace
         self.ws.close()
@@ -77,22 +81,21 @@ class TestContainerRapptureCApi(TestCase2):
 
     def write_xml_file(self):
 
-        # write xml file
-        xmlfn = os.path.join(self.sessiondir,"tool.xml")
-        self.ws.importfile(TOOL_XML,xmlfn,mode=0600,is_data=True)
-        self.remove_files.append(xmlfn)
+        # write xml file, it is staged along with the program
+        self.files["tool.xml"] = (TOOL_XML,0600)
 
 
     def run_code(self,program,xmlfn='tool.xml'):
 
-        # write program
-        programfn = os.path.join(self.sessiondir,"program.c")
-        self.ws.importfile(program,programfn,mode=0600,is_data=True)
-        self.remove_files.append(programfn)
+        # write program and xml file in one pass,
+        # then run from the directory they were staged in
+        self.files["program.c"] = (program,0600)
+        self.stager.stage(self.files)
+        programfn = self.stager.path("program.c")
+        self.ws.execute('cd %s' % (self.stager.directory))
 
         # generate path for compiled executable
-        compiledfn = os.path.join(self.sessiondir,'program')
-        self.remove_files.append(compiledfn)
+        compiledfn = self.stager.path('program')
 
         # setup rappture environment
         self.ws.execute('. /etc/environ.sh')
@@ -696,7 +699,8 @@ class TestContainerRappturePythonApi(TestCase2):
 
     def setup_method(self,method):
 
-        self.remove_files = []
+        # files to stage along with the program in run_code()
+        self.files = {}
 
         # get user account info
         self.username,self.userpass = self.testdata.find_account_for('registeredworkspace')
@@ -711,12 +715,13 @@ class TestContainerRappturePythonApi(TestCase2):
         self.ws.execute('cd $SESSIONDIR')
         self.sessiondir,es = self.ws.execute('pwd')
 
+        self.stager = Stager(self.ws,self.sessiondir)
+
 
     def teardown_method(self,method):
 
         # remove the executable and config files
-        for fname in self.remove_files:
-            self.ws.execute('rm -f %s' % (fname))
+        self.stager.cleanup()
 
         # exit the workspace
         self.ws.close()
@@ -724,18 +729,18 @@ class TestContainerRappturePythonApi(TestCase2):
 
     def write_xml_file(self):
 
-        # write xml file
-        xmlfn = os.path.join(self.sessiondir,"tool.xml")
-        self.ws.importfile(TOOL_XML,xmlfn,mode=0600,is_data=True)
-        self.remove_files.append(xmlfn)
+        # write xml file, it is staged along with the program
+        self.files["tool.xml"] = (TOOL_XML,0600)
 
 
     def run_code(self,program,xmlfn='tool.xml'):
 
-        # write program
-        programfn = os.path.join(self.sessiondir,"program.py")
-        self.ws.importfile(program,programfn,mode=0600,is_data=True)
-        self.remove_files.append(programfn)
+        # write program and xml file in one pass,
+        # then run from the directory they were staged in
+        self.files["program.py"] = (program,0600)
+        self.stager.stage(self.files)
+        programfn = self.stager.path("program.py")
+        self.ws.execute('cd %s' % (self.stager.directory))
 
         # setup rappture environment
         self.ws.execute('. /etc/environ.sh')
@@ -12,6 +12,12 @@ from hubcheck.testcase import TestCase2
 from hubcheck.shell import ContainerManager
 from hubcheck.shell import SFTPClient
 
+from hchztests.sampler import ResourceSampler
+from hchztests.staging import Stager
+from hchztests.submit import SubmitLoadGenerator
+from hchztests.submit import SubmitMetricsParser
+from hchztests.submit import stream_command
+
 
 pytestmark = [ pytest.mark.container,
                pytest.mark.submit,
@@ -35,6 +41,47 @@ print "hello %s" % (name)
 """
 
 
+def run_submit_metrics(ws,command,logfn,timeout=60):
+    """
+    run a "submit --metrics" command, parsing the metrics
+    from the output while the command runs.
+
+    returns the exit status and the parser.
+    """
+
+    parser = SubmitMetricsParser()
+    es = stream_command(ws,command,parser,logfn,timeout=timeout)
+
+    return es,parser
+
+
+def check_submit_local_metrics(command,es,parser):
+    """
+    check that a "submit --local --metrics" command of sayhi.py
+    printed hello world and the metrics for a single job
+    """
+
+    output = '\n'.join(parser.output)
+
+    assert es == 0,"While executing commands: %s\n%s" % (command,output)
+
+    expected = 'hello world'
+    assert expected in [line.strip() for line in parser.output], \
+        "issuing the command '%s' returned '%s', expected '%s'" \
+        % (command,output,expected)
+
+    jobs = parser.finished_jobs()
+    assert len(jobs) == 1, \
+        "issuing the command '%s' returned metrics for %s jobs: %s" \
+        % (command,len(jobs),parser.jobs.values())
+
+    missing = [key for key in ['venue','status','cputime','realtime']
+               if key not in jobs[0]]
+    assert len(missing) == 0, \
+        "issuing the command '%s' returned metrics missing %s: %s" \
+        % (command,missing,jobs[0])
+
+
 @pytest.mark.weekly
 @pytest.mark.submituser
 class TestContainerSubmitSubmituser(TestCase2):
@@ -104,39 +151,21 @@ class TestContainerSubmitSubmituser(TestCase2):
 
 
     @pytest.mark.submit_local
-    def test_submit_local_metrics_submituser(self):
+    def test_submit_local_metrics_submituser(self,perf_report):
         """
         as submituser, submit local using "submit --local --metrics"
         """
 
         command = 'submit --local --metrics python %s' % (self.exe_path)
+        logfn = os.path.join(os.path.dirname(self.exe_path),'metrics.log')
 
-        output,es = self.ws.execute(command,fail_on_exit_code=False)
+        es,parser = run_submit_metrics(self.ws,command,logfn)
 
-        assert es == 0,"While executing commands: %s\n%s" % (command,output)
+        check_submit_local_metrics(command,es,parser)
 
-        # output is embedded between SUBMIT-METRICS stanzas
-        metricsre1 = re.compile(r"""=SUBMIT-METRICS=>\sjob=(\d+)\s+
-                                   hello\ world\s+
-                                   =SUBMIT-METRICS=>\sjob=(\d+)\s
-                                                      venue=([^\s]+)\s
-                                                      status=([^\s]+)\s
-                                                      cputime=([^\s]+)\s
-                                                      realtime=([^\s]+)\s*""",
-                                re.VERBOSE)
-
-        # output is after SUBMIT-METRICS stanzas
-        metricsre2 = re.compile(r"""=SUBMIT-METRICS=>\sjob=(\d+)\s+
-                                    =SUBMIT-METRICS=>\sjob=(\d+)\s
-                                                       venue=([^\s]+)\s
-                                                       status=([^\s]+)\s
-                                                       cputime=([^\s]+)\s
-                                                       realtime=([^\s]+)\s+
-                                   hello\ world\s*""",
-                                re.VERBOSE)
-        assert (metricsre1.match(output) or metricsre2.match(output)) \
-            is not None, "issuing the command '%s' returned '%s'" \
-            % (command, output)
+        perf_report.record('submit_local_metrics',
+                           user='submituser',
+                           **parser.table().summary())
 
 
 @pytest.mark.nightly
@@ -211,41 +240,22 @@ class TestContainerSubmitRegisteredWorkspace(TestCase2):
 
 
     @pytest.mark.submit_local
-    def test_submit_local_metrics_registeredworkspace(self):
+    def test_submit_local_metrics_registeredworkspace(self,perf_report):
         """
         as a registeredworkspace user, submit local using
         "submit --local --metrics"
         """
 
         command = 'submit --local --metrics python %s' % (self.exe_path)
+        logfn = os.path.join(os.path.dirname(self.exe_path),'metrics.log')
 
-        output,es = self.ws.execute(command,fail_on_exit_code=False)
-
-        assert es == 0,"While executing commands: %s\n%s" % (command,output)
+        es,parser = run_submit_metrics(self.ws,command,logfn)
 
-        # output is embedded between SUBMIT-METRICS stanzas
-        metricsre1 = re.compile(r"""=SUBMIT-METRICS=>\sjob=(\d+)\s+
-                                   hello\ world\s+
-                                   =SUBMIT-METRICS=>\sjob=(\d+)\s
-                                                      venue=([^\s]+)\s
-                                                      status=([^\s]+)\s
-                                                      cputime=([^\s]+)\s
-                                                      realtime=([^\s]+)\s*""",
-                                re.VERBOSE)
-
-        # output is after SUBMIT-METRICS stanzas
-        metricsre2 = re.compile(r"""=SUBMIT-METRICS=>\sjob=(\d+)\s+
-                                    =SUBMIT-METRICS=>\sjob=(\d+)\s
-                                                       venue=([^\s]+)\s
-                                                       status=([^\s]+)\s
-                                                       cputime=([^\s]+)\s
-                                                       realtime=([^\s]+)\s+
-                                   hello\ world\s*""",
-                                re.VERBOSE)
+        check_submit_local_metrics(command,es,parser)
 
-        assert (metricsre1.match(output) or metricsre2.match(output)) \
-            is not None, "issuing the command '%s' returned '%s'" \
-            % (command, output)
+        perf_report.record('submit_local_metrics',
+                           user='registeredworkspace',
+                           **parser.table().summary())
 
 
     @pytest.mark.submit_local
@@ -355,6 +365,98 @@ class TestContainerSubmitRegisteredWorkspace(TestCase2):
             "command '%s' returned: %s" % (command,output)
 
 
+@pytest.mark.submituser
+@pytest.mark.submit_load
+class TestContainerSubmitLoad(TestCase2):
+    """
+    launch many submit jobs at the same time to see how the submit
+    server behaves when a whole class submits jobs at once.
+
+    the number of concurrent jobs, the number of workspace shells to
+    launch them from, and the venue are set with the
+    --submit_load_levels, --submit_load_shells and --submit_load_venue
+    command line options.
+    """
+
+    def setup_method(self,method):
+
+        self.shells = []
+
+        # get user account info
+        self.username,self.userpass = self.testdata.find_account_for('submituser')
+        hubname = self.testdata.find_url_for('https')
+
+        cm = ContainerManager()
+
+        for i in range(pytest.config.getoption('--submit_load_shells')):
+            ws = cm.access(host=hubname,
+                           username=self.username,
+                           password=self.userpass)
+            ws.timeout = 60
+            self.shells.append(ws)
+
+        ws = self.shells[0]
+        ws.execute('cd $SESSIONDIR')
+        sessiondir,es = ws.execute('pwd')
+        self.exe_path = os.path.join(sessiondir,sayhi_py_fn)
+        ws.importfile(sayhi_py_data,self.exe_path,mode=0o600,is_data=True)
+
+        self.workdir = os.path.join(sessiondir,'hcload')
+
+
+    def teardown_method(self,method):
+
+        try:
+            self.shells[0].execute('rm -f %s' % (self.exe_path))
+        finally:
+            # get out of the workspaces
+            # shut down the ssh connections
+            for ws in self.shells:
+                ws.close()
+
+
+    def test_submit_load(self,perf_report):
+        """
+        launch increasing numbers of concurrent submit jobs,
+        reporting throughput and latency at each level
+        """
+
+        levels = [int(n) for n in
+                  pytest.config.getoption('--submit_load_levels').split(',')]
+        venue = pytest.config.getoption('--submit_load_venue')
+
+        if venue != '':
+            command = 'submit -v %s --metrics python %s' % (venue,self.exe_path)
+        else:
+            venue = 'local'
+            command = 'submit --local --metrics python %s' % (self.exe_path)
+
+        # sayhi.py sleeps for 10 seconds, so allow plenty of
+        # time for the submit server to work through the queue
+        generator = SubmitLoadGenerator(self.shells,self.workdir,
+                                        timeout=600)
+
+        failed = []
+        for result in generator.ramp(levels,
+                                     lambda i: '%s hc%d' % (command,i)):
+
+            summary = result.summary()
+            perf_report.record('submit_load',venue=venue,**summary)
+
+            self.logger.info('submit load: %s concurrent jobs,'
+                % (result.concurrency)
+                + ' %s errors, throughput = %s jobs/s'
+                % (summary['errors'],summary['throughput']))
+
+            for job in result.errors():
+                failed.append((result.concurrency,job['command'],
+                               job['exit_status']))
+
+        assert len(failed) == 0, \
+            "the following submit jobs failed or did not report" \
+            + " metrics (concurrency,command,exit status): %s" % (failed)
+
+
 @pytest.mark.registereduser
 @pytest.mark.submit_examples
 @pytest.mark.weekly
@@ -363,8 +465,6 @@ class TestContainerSubmitParameterExamples(TestCase2):
 
     def setup_method(self,method):
 
-        self.remove_files = []
-
         # get user account info
         self.username,self.userpass = self.testdata.find_account_for('registeredworkspace')
         hubname = self.testdata.find_url_for('https')
@@ -385,26 +485,44 @@ class TestContainerSubmitParameterExamples(TestCase2):
         self.ws.execute('cd $SESSIONDIR')
         sessiondir,es = self.ws.execute('pwd')
 
+        with open(local_exe_path,'r') as f:
+            exe_data = f.read()
+
+        # stage the executable, then work from the staging directory
+        # so input decks and results are removed along with it.
+        self.stager = Stager(self.ws,sessiondir,sftp=self.sftp)
+
         self.exe_fn = 'sim1.py'
-        self.exe_path = os.path.join(sessiondir,self.exe_fn)
-        self.remove_files.append(self.exe_path)
+        self.stager.stage({self.exe_fn : (exe_data,0700)})
+        self.exe_path = self.stager.path(self.exe_fn)
 
-        self.sftp.chdir(sessiondir)
-        self.sftp.put(local_exe_path,self.exe_fn)
-        self.sftp.chmod(self.exe_path,0700)
+        self.ws.execute('cd %s' % (self.stager.directory))
 
         # shouldn't take more than 60 seconds
         # to run submit --local commands
         self.ws.timeout = 60
 
+        # sample the container's resource usage while the test runs
+        self.resource_sampler = None
+        interval = pytest.config.getoption("--resource_sample_interval")
+        if interval > 0:
+            self.resource_sampler = ResourceSampler(
+                lambda: cm.access(host=hubname,
+                                  username=self.username,
+                                  password=self.userpass),
+                sessiondir=sessiondir,interval=interval)
+            self.resource_sampler.start()
+
 
     def teardown_method(self,method):
 
-        # remove the executable and config files
-        for fname in self.remove_files:
-            self.sftp.remove(fname)
+        # remove the executable, config files and results
+        self.stager.cleanup()
         self.sftp.close()
 
+        if self.resource_sampler is not None:
+            self.resource_sampler.stop()
+
         # exit the workspace
         self.ws.close()
 
@@ -429,8 +547,7 @@ class TestContainerSubmitParameterExamples(TestCase2):
 
         # write the input deck to disk in the container.
         indeck_template = "[inputs]\nC = @@C\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
+        self.stager.stage({self.indeckfn : (indeck_template,0600)})
 
         # run the command
         output,es = self.ws.execute(command)
@@ -484,8 +601,7 @@ class TestContainerSubmitParameterExamples(TestCase2):
 
         # write the input deck to disk in the container.
         indeck_template = "[inputs]\nC = @@C\nVin = @@Vin\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
+        self.stager.stage({self.indeckfn : (indeck_template,0600)})
 
         # adjust the timeout to allow for 5 minutes to run the tests
         old_timeout = self.ws.timeout
@@ -542,16 +658,12 @@ class TestContainerSubmitParameterExamples(TestCase2):
         # interfere with our expect like terminal parsing.
         command += ' 0</dev/null'
 
-        # write the input deck to disk in the container.
+        # write the input deck and parameters file to disk in the container.
         indeck_template = "[inputs]\nC = @@C\nVin = @@Vin\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
-
-        # write the parameters file to disk in the container.
         params_data  = "parameter @@Vin=0:0.2:5\n" \
                        + "parameter @@C = 10e-12,100e-12,1e-6\n"
-        self.ws.write_file(self.paramsfn,params_data)
-        self.remove_files.append(self.paramsfn)
+        self.stager.stage({self.indeckfn : (indeck_template,0600),
+                           self.paramsfn : (params_data,0600)})
 
         # adjust the timeout to allow for 5 minutes to run the tests
         old_timeout = self.ws.timeout
@@ -612,15 +724,11 @@ class TestContainerSubmitParameterExamples(TestCase2):
         # interfere with our expect like terminal parsing.
         command += ' 0</dev/null'
 
-        # write the input deck to disk in the container.
+        # write the input deck and parameters file to disk in the container.
         indeck_template = "[inputs]\nC = @@C\nVin = @@Vin\nR = @@R\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
-
-        # write the parameters file to disk in the container.
         params_data = "parameter @@C = 10e-12,100e-12,1e-6\n"
-        self.ws.write_file(self.paramsfn,params_data)
-        self.remove_files.append(self.paramsfn)
+        self.stager.stage({self.indeckfn : (indeck_template,0600),
+                           self.paramsfn : (params_data,0600)})
 
         # run the command
         output,es = self.ws.execute(command)
@@ -672,15 +780,11 @@ class TestContainerSubmitParameterExamples(TestCase2):
         # interfere with our expect like terminal parsing.
         command += ' 0</dev/null'
 
-        # write the input deck to disk in the container.
+        # write the input deck and parameters file to disk in the container.
         indeck_template = "[inputs]\nC = @@C\nVin = @@Vin\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
-
-        # write the parameters file to disk in the container.
         params_data = "@@Vin, @@C\n1.1, 1e-12\n2.2, 1e-12\n1.1, 10e-12\n2.2, 10e-12"
-        self.ws.write_file(self.paramsfn,params_data)
-        self.remove_files.append(self.paramsfn)
+        self.stager.stage({self.indeckfn : (indeck_template,0600),
+                           self.paramsfn : (params_data,0600)})
 
         # run the command
         output,es = self.ws.execute(command)
@@ -734,15 +838,11 @@ class TestContainerSubmitParameterExamples(TestCase2):
         # interfere with our expect like terminal parsing.
         command += ' 0</dev/null'
 
-        # write the input deck to disk in the container.
+        # write the input deck and parameters file to disk in the container.
         indeck_template = "[inputs]\nC = @@C\nVin = @@Vin\nR = @@R\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
-
-        # write the parameters file to disk in the container.
         params_data = "@@Vin, @@C\n1.1, 1e-12\n2.2, 1e-12\n1.1, 10e-12\n2.2, 10e-12"
-        self.ws.write_file(self.paramsfn,params_data)
-        self.remove_files.append(self.paramsfn)
+        self.stager.stage({self.indeckfn : (indeck_template,0600),
+                           self.paramsfn : (params_data,0600)})
 
         # run the command
         output,es = self.ws.execute(command)
@@ -796,23 +896,16 @@ class TestContainerSubmitParameterExamples(TestCase2):
         # interfere with our expect like terminal parsing.
         command += ' 0</dev/null'
 
-        # write the input deck to disk in the container.
+        # write the input deck, extra templated data file and
+        # parameters file to disk in the container.
         indeck_template = "[inputs]\nC = @@C\nVin = @@Vin\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
-        self.ws.execute('ls {0}'.format(self.indeckfn))
-
-        # write the input deck to disk in the container.
         extra_template = "# extra templated data file\nVin = @@Vin\nC = @@C\n"
-        self.ws.write_file(self.extrafn,extra_template)
-        self.remove_files.append(self.extrafn)
-        self.ws.execute('ls {0}'.format(self.extrafn))
-
-        # write the parameters file to disk in the container.
         params_data = "@@Vin, @@C\n1.1, 1e-12\n2.2, 1e-12\n1.1, 10e-12\n2.2, 10e-12"
-        self.ws.write_file(self.paramsfn,params_data)
-        self.remove_files.append(self.paramsfn)
-        self.ws.execute('ls {0}'.format(self.paramsfn))
+        self.stager.stage({self.indeckfn : (indeck_template,0600),
+                           self.extrafn : (extra_template,0600),
+                           self.paramsfn : (params_data,0600)})
+        self.ws.execute('ls {0} {1} {2}'.format(
+            self.indeckfn,self.extrafn,self.paramsfn))
 
         # run the command
         output,es = self.ws.execute(command)
@@ -867,8 +960,7 @@ class TestContainerSubmitParameterExamples(TestCase2):
 
         # write the input deck to disk in the container.
         indeck_template = "[inputs]\nC = @@C\nVin = @@Vin\n"
-        self.ws.write_file(self.indeckfn,indeck_template)
-        self.remove_files.append(self.indeckfn)
+        self.stager.stage({self.indeckfn : (indeck_template,0600)})
 
         # run the command
         output,es = self.ws.execute(command)
@@ -965,14 +1057,14 @@ class TestContainerSubmitParameterExamples(TestCase2):
         command += ' 0</dev/null'
 
         # write the input decks to disk in the container.
+        indecks = {}
         counter = 0
         for (Vin,C) in [(1.1,1e-12),(2.2,1e-12),(1.1,10e-12),(2.2,10e-12)]:
             counter += 1
             indeck_template = "[inputs]\nC = %s\nVin = %s\n" % (C,Vin)
             fname = self.fbase + '.%s' % (counter)
-            self.ws.write_file(fname,indeck_template)
-            self.remove_files.append(fname)
-
+            indecks[fname] = (indeck_template,0600)
+        self.stager.stage(indecks)
 
         # run the command
         output,es = self.ws.execute(command)
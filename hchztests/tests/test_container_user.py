@@ -1,12 +1,12 @@
 import pytest
 import os
-import socket
-import sys
 
 import hubcheck
 from hubcheck.testcase import TestCase2
 from hubcheck.shell import ContainerManager
-from hubcheck.exceptions import ConnectionClosedError
+
+from hchztests.sessions import ConnectionChurn
+from hchztests.sessions import list_container_ptys
 
 
 pytestmark = [ pytest.mark.container,
@@ -162,7 +162,7 @@ class TestRegisteredUserTTYRecycle(TestCase2):
         pass
 
 
-    def test_tty_recycle(self):
+    def test_tty_recycle(self,perf_report):
         """
         check if ttys are being released after ssh connections are closed.
 
@@ -172,30 +172,47 @@ class TestRegisteredUserTTYRecycle(TestCase2):
         the pty.
 
         the failue occurs in the call to cm.access().
+
+        the number of connections and how many are open at the same time
+        are set by --tty_churn_count and --tty_churn_concurrency.
         """
 
-        session_number = 0
+        count = pytest.config.getoption("--tty_churn_count")
+        concurrency = pytest.config.getoption("--tty_churn_concurrency")
+
         cm = ContainerManager()
 
-        for i in range(31):
+        def connect():
+            # access a tool session container
+            return cm.access(host=self.hubname,
+                             username=self.username,
+                             password=self.userpass)
+
+        # keep one connection open to watch the container's ptys
+        monitor = connect()
+        session_number,es = monitor.execute('echo $SESSION')
+
+        churn = ConnectionChurn(connect,list_container_ptys(monitor))
+        try:
+            records = churn.run(count,concurrency)
+        finally:
+            monitor.close()
 
-            try:
-                # access a tool session container
-                ws = cm.access(host=self.hubname,
-                               username=self.username,
-                               password=self.userpass)
+        summary = churn.summary(records)
+        perf_report.record('tty_churn',target='hub',
+            concurrency=concurrency,**summary)
 
-                session_number,es = ws.execute('echo $SESSION')
+        failures = [(r['index'],r['error']) for r in records
+                    if r['error'] is not None]
 
-                # start up a new bash shell manually
-                ws.send('/bin/bash')
+        if len(failures) > 0 and int(session_number) > 0:
+            # container is hosed, shut it down.
+            cm.stop(self.hubname,self.username,int(session_number))
 
-                # exit the workspace
-                ws.close()
-            except (ConnectionClosedError,socket.timeout) as e:
-                if session_number > 0:
-                    # container is hosed, shut it down.
-                    cm.stop(self.hubname,self.username,int(session_number))
-                assert False, "After connecting %s time(s): %s" \
-                    % (i,sys.exc_info()[0])
+        assert len(failures) == 0, \
+            "%d of %d connections failed: %s" \
+            % (len(failures),count,failures)
 
+        assert summary['unreleased'] == 0, \
+            "%d ptys were not released within %s seconds: %s" \
+            % (summary['unreleased'],churn.release_timeout,summary)
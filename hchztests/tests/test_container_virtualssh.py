@@ -4,6 +4,8 @@ import pytest
 import re
 import sys
 
+from hchztests.sessions import SessionLaunchStress
+
 pytestmark = [ pytest.mark.container,
                pytest.mark.virtualssh,
                pytest.mark.reboot
@@ -305,3 +307,50 @@ class TestToolSession(hubcheck.testcase.TestCase2):
         assert test_sn == -1, "test_sn = '%s'" % (test_sn)
 
 
+@pytest.mark.session_stress
+class TestToolSessionLaunchStress(hubcheck.testcase.TestCase2):
+
+    def setup_method(self,method):
+
+        hubname = self.testdata.find_url_for('https')
+
+        # spread the sessions across several accounts so we
+        # don't run into per-user session limits
+        accounts = []
+        for role in ['registeredworkspace','purdueworkspace',
+                     'networkworkspace']:
+            accounts.append(self.testdata.find_account_for(role))
+
+        self.stress = SessionLaunchStress(hubname,accounts,
+                        title_prefix='hcstress')
+
+        self.count = pytest.config.getoption("--session_stress_count")
+
+
+    def teardown_method(self,method):
+
+        self.stress.teardown()
+
+
+    def test_concurrent_session_launch(self,perf_report):
+        """test launching many tool sessions at the same time,
+           measuring time to shell and time until listed by 'session list'
+        """
+
+        launches = self.stress.run(self.count)
+        summary = self.stress.summary(launches)
+
+        perf_report.record('session_launch_stress',**summary)
+
+        errors = [(l['title'],l['error']) for l in launches
+                  if l['error'] is not None]
+
+        assert len(errors) == 0, \
+            "%d of %d session launches failed: %s" \
+            % (len(errors),len(launches),errors)
+
+        assert summary['not_listed'] == 0, \
+            "%d sessions never showed up in 'session list': %s" \
+            % (summary['not_listed'],
+               [l['session_number'] for l in launches
+                if l['time_to_list'] is None])
@@ -0,0 +1,154 @@
+import gzip
+import json
+import os
+import pytest
+import threading
+
+from hchztests.artifacts import ArtifactWriter
+from hchztests.artifacts import artifact_basename
+from hchztests.artifacts import capture_browser_artifacts
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class FakeDriver(object):
+
+    page_source = u'<html>caf\xe9</html>'
+
+    def get_screenshot_as_png(self):
+        return '\x89PNG fake'
+
+    def get_log(self,logtype):
+        raise Exception('log type %s not supported' % (logtype))
+
+
+class FakeProxyClient(object):
+
+    har = {'log' : {'entries' : []}}
+
+
+class FakeBrowser(object):
+
+    def __init__(self):
+        self._browser = FakeDriver()
+        self.proxy_client = FakeProxyClient()
+
+
+class TestArtifactNames(object):
+
+    def test_basename_from_nodeid(self):
+        """
+        node ids become file name safe, unique names
+        """
+
+        name = artifact_basename(
+                'tests/test_website_tags.py::TestTags::test_x[a b/c]',7)
+
+        assert name.startswith('tests.test_website_tags.TestTags.test_x[a_b.c]-')
+        assert name.endswith('-%d-7' % (os.getpid()))
+        assert '/' not in name
+
+
+    def test_basenames_unique(self,tmpdir):
+        """
+        failures of the same test get different names
+        """
+
+        writer = ArtifactWriter(str(tmpdir))
+
+        names = [writer.basename('test_a.py::TestA::test_a')
+                 for i in range(3)]
+
+        assert len(set(names)) == 3
+
+
+class TestArtifactWriter(object):
+
+    def test_capture_browser_artifacts(self):
+        """
+        capture what the browser provides, skipping the rest
+        """
+
+        artifacts = dict(capture_browser_artifacts(FakeBrowser()))
+
+        assert sorted(artifacts.keys()) == ['har.json','html','png']
+
+
+    def test_write_compressed(self,tmpdir):
+        """
+        text artifacts are gzipped, images are written as is
+        """
+
+        writer = ArtifactWriter(str(tmpdir.join('artifacts')))
+
+        for ext,data in capture_browser_artifacts(FakeBrowser()):
+            writer.submit('test_a',ext,data)
+        writer.close()
+
+        assert writer.errors == []
+        assert sorted(os.listdir(str(tmpdir.join('artifacts')))) \
+            == ['test_a.har.json.gz','test_a.html.gz','test_a.png']
+
+        fn = str(tmpdir.join('artifacts','test_a.html.gz'))
+        assert gzip.open(fn).read().decode('utf-8') == FakeDriver.page_source
+
+        fn = str(tmpdir.join('artifacts','test_a.har.json.gz'))
+        assert json.loads(gzip.open(fn).read()) == FakeProxyClient.har
+
+
+    def test_write_uncompressed(self,tmpdir):
+        """
+        compresslevel 0 writes plain files
+        """
+
+        writer = ArtifactWriter(str(tmpdir),compresslevel=0)
+        writer.submit('test_a','html','<html></html>')
+        writer.flush()
+
+        assert tmpdir.join('test_a.html').read() == '<html></html>'
+
+        writer.close()
+
+
+    def test_submit_does_not_block(self,tmpdir):
+        """
+        artifacts are dropped, not waited on, when the writer falls behind
+        """
+
+        writer = ArtifactWriter(str(tmpdir),max_pending=2)
+
+        # hold up the writer thread
+        release = threading.Event()
+        write = writer._write
+
+        def slow_write(*args):
+            release.wait(5)
+            write(*args)
+
+        writer._write = slow_write
+
+        for i in range(5):
+            writer.submit('test_%d' % (i),'html','<html></html>')
+
+        assert writer.dropped >= 2
+
+        release.set()
+        writer.close()
+
+        assert len(writer.written) == 5 - writer.dropped
+
+
+    def test_write_errors_collected(self,tmpdir):
+        """
+        errors writing artifacts are kept, not raised
+        """
+
+        tmpdir.join('notadir').write('')
+        writer = ArtifactWriter(str(tmpdir.join('notadir')))
+        writer.submit('test_a','html','<html></html>')
+        writer.close()
+
+        assert len(writer.errors) == 1
+        assert writer.errors[0].startswith('test_a.html:')
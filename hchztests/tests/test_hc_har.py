@@ -0,0 +1,149 @@
+import json
+import pytest
+
+from hchztests.har import PageWeightGuard
+from hchztests.har import check_budget
+from hchztests.har import cold_page_har
+from hchztests.har import page_weight
+from hchztests.perf import PerfReport
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+def _entry(url,mimetype,size,body_size,headers,status=200):
+
+    return {'request'  : {'url' : url},
+            'response' : {'status'      : status,
+                          'headers'     : [{'name' : k, 'value' : v}
+                                           for k,v in headers.items()],
+                          'headersSize' : 100,
+                          'bodySize'    : body_size,
+                          'content'     : {'size'     : size,
+                                           'mimeType' : mimetype}}}
+
+
+HAR = {'log' : {'entries' : [
+    _entry('https://hub.org/','text/html; charset=utf-8',20000,5000,
+           {'Content-Encoding' : 'gzip','Cache-Control' : 'no-cache'}),
+    _entry('https://hub.org/css/site.css','text/css',30000,30000,
+           {'Cache-Control' : 'max-age=86400'}),
+    _entry('https://hub.org/js/site.js','application/javascript',40000,9000,
+           {'Content-Encoding' : 'gzip'}),
+    _entry('https://hub.org/img/logo.png','image/png',8000,8000,
+           {'Expires' : 'Thu, 01 Dec 2030 16:00:00 GMT'}),
+    _entry('https://hub.org/img/old.png','image/png',0,0,{},status=304),
+]}}
+
+
+class TestPageWeight(object):
+
+    def test_page_weight(self):
+        """
+        measure requests, bytes, compression and cacheability
+        """
+
+        weight = page_weight(HAR)
+
+        assert weight['requests'] == 5
+        assert weight['transferred'] == 5000+30000+9000+8000+5*100
+        assert weight['content_size'] == 98000
+        assert weight['compressed'] == 2
+        assert weight['uncompressed'] == ['https://hub.org/css/site.css']
+        assert weight['uncacheable'] == ['https://hub.org/js/site.js']
+
+
+    def test_check_budget(self):
+        """
+        flag pages over budget, using the default budget for unknown pages
+        """
+
+        weight = page_weight(HAR)
+
+        budget = {'home'    : {'max_transferred'  : 100000,
+                               'max_requests'     : 4,
+                               'max_uncompressed' : 0},
+                  'default' : {'max_uncacheable'  : 1}}
+
+        problems = check_budget('home',weight,budget)
+        assert len(problems) == 2
+        assert 'requests 5' in problems[0]
+        assert 'site.css' in problems[1]
+
+        assert check_budget('tags_view',weight,budget) == []
+        assert check_budget('tags_view',weight,{}) == []
+
+
+    def test_guard_records_weight(self,tmpdir):
+        """
+        the guard records each page into the performance report
+        """
+
+        budget_fn = tmpdir.join('budget.json')
+        budget_fn.write(json.dumps({'home' : {'max_uncacheable' : 0}}))
+
+        report = PerfReport()
+        guard = PageWeightGuard(str(budget_fn),report)
+
+        problems = guard.check('home',HAR)
+
+        assert len(problems) == 1
+        entries = report.entries('page_weight')
+        assert len(entries) == 1
+        assert entries[0]['metrics']['page'] == 'home'
+        assert entries[0]['metrics']['uncacheable'] == 1
+
+
+class FakeProxyClient(object):
+
+    def __init__(self,browser):
+        self.browser = browser
+        self.har = None
+
+    def new_har(self,title):
+        self.browser.calls.append(('new_har',title))
+        self.har = {'log' : {'entries' : []}}
+
+
+class FakeBrowser(object):
+    """
+    a hubcheck browser whose cache holds the pages it loaded since
+    it was started
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.cache = set()
+        self.proxy_client = FakeProxyClient(self)
+
+    def close(self):
+        self.calls.append(('close',))
+        self.cache = set()
+
+    def get(self,url):
+        self.calls.append(('get',url))
+        if self.proxy_client.har is not None and url not in self.cache:
+            self.proxy_client.har['log']['entries'].append(
+                _entry(url,'text/html',100,100,{}))
+        self.cache.add(url)
+
+
+class TestColdPageHar(object):
+
+    def test_cold_page_har(self):
+        """
+        the HAR of a page loaded before holds every request
+        """
+
+        browser = FakeBrowser()
+        browser.get('https://hub.org/')
+
+        har = cold_page_har(browser,'https://hub.org/')
+
+        assert browser.calls == [('get','https://hub.org/'),
+                                 ('close',),
+                                 ('get','about:blank'),
+                                 ('new_har','page'),
+                                 ('get','https://hub.org/')]
+        assert page_weight(har)['requests'] == 1
@@ -0,0 +1,61 @@
+import pytest
+
+from hchztests.idlookup import find_spikes
+from hchztests.idlookup import lookup_timing_script
+from hchztests.idlookup import parse_lookup_timings
+from hchztests.idlookup import summarize_lookups
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class TestLookupBenchmark(object):
+
+    def test_timing_script(self):
+        """
+        the username is filled in to each lookup command
+        """
+
+        script = lookup_timing_script('hcuser',
+                    [('groups','groups {username}'),('getent','getent group')],
+                    3)
+
+        assert 'time groups hcuser >' in script
+        assert 'time getent group >' in script
+        assert script.count('$(seq 3)') == 2
+
+
+    def test_parse_timings(self):
+        """
+        parse timings, keeping the runs of each command in order
+        """
+
+        output = '=HCTIME=> groups 2 0,010\n' \
+                 + '=HCTIME=> groups 1 0.750\n' \
+                 + '=HCTIME=> id 1 0.002\n' \
+                 + 'groups: cannot find name for group ID 1234\n'
+
+        timings = parse_lookup_timings(output)
+
+        assert timings == {'groups' : [0.75,0.01], 'id' : [0.002]}
+
+
+    def test_first_warm_and_spikes(self):
+        """
+        the first run is reported on its own, warm runs that spike
+        are counted
+        """
+
+        samples = [0.9,0.01,0.012,0.011,0.6,0.01,0.013]
+
+        summary = summarize_lookups(samples)
+
+        assert summary['count'] == 7
+        assert summary['first'] == 0.9
+        assert summary['min'] == 0.01
+        assert summary['spikes'] == 1
+        assert summary['spike_times'] == [0.6]
+
+        # fast lookups are never spikes
+        assert find_spikes([0.001,0.001,0.009]) == []
@@ -0,0 +1,105 @@
+import pytest
+
+from hchztests.invariants import COUNT_INVARIANTS
+from hchztests.invariants import DISPLAY_ALL_INVARIANTS
+from hchztests.invariants import counts_record
+from hchztests.invariants import evaluate
+from hchztests.invariants import format_violations
+from hchztests.invariants import invariant_names
+from hchztests.invariants import violations
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+GOOD = counts_record('/tags/browse',(1,20,45),(1,20,45))
+
+
+class TestCountInvariants(object):
+
+    def test_counts_record(self):
+        """
+        flatten caption and pagination counts into one record
+        """
+
+        assert GOOD == {'url'              : '/tags/browse',
+                        'caption_start'    : 1,
+                        'caption_end'      : 20,
+                        'caption_total'    : 45,
+                        'pagination_start' : 1,
+                        'pagination_end'   : 20,
+                        'pagination_total' : 45}
+
+        assert sorted(counts_record('/x',caption=(1,2,3)).keys()) \
+            == ['caption_end','caption_start','caption_total','url']
+
+
+    def test_invariant_names_are_unique(self):
+        """
+        names are used as test ids
+        """
+
+        for invariants in [COUNT_INVARIANTS,DISPLAY_ALL_INVARIANTS]:
+            names = invariant_names(invariants)
+            assert len(names) == len(set(names))
+
+        assert len(COUNT_INVARIANTS) == 15
+
+
+    def test_good_counts(self):
+        """
+        consistent counts hold every invariant
+        """
+
+        assert all(evaluate(GOOD,COUNT_INVARIANTS).values())
+        assert violations(GOOD,COUNT_INVARIANTS) == []
+
+
+    def test_all_violations_reported(self):
+        """
+        every violated invariant is reported in one pass
+        """
+
+        record = counts_record('/tags/browse',(21,20,45),(1,20,-1))
+
+        problems = violations(record,COUNT_INVARIANTS)
+        failed = [p.split(':')[0] for p in problems]
+
+        assert failed == ['compare_caption_pagination_start_counts',
+                          'compare_caption_pagination_total_counts',
+                          'caption_start_lte_caption_end',
+                          'pagination_start_lte_pagination_total',
+                          'pagination_end_lte_pagination_total',
+                          'pagination_total_gte_zero']
+
+        message = format_violations(record,problems)
+        assert '/tags/browse' in message
+        assert '6 invariant(s) failed' in message
+        assert 'caption_start = 21, caption_end = 20' in message
+
+
+    def test_violations_by_name(self):
+        """
+        limit the report to the named invariants
+        """
+
+        record = counts_record('/tags/browse',(21,20,45),(1,20,45))
+
+        assert violations(record,COUNT_INVARIANTS,
+                          ['caption_end_lte_caption_total']) == []
+        assert len(violations(record,COUNT_INVARIANTS,
+                              ['caption_start_lte_caption_end'])) == 1
+
+
+    def test_display_all(self):
+        """
+        with all items shown, the caption end equals the total
+        """
+
+        record = counts_record('/tags/browse',(1,20,45))
+
+        problems = violations(record,DISPLAY_ALL_INVARIANTS)
+
+        assert len(problems) == 1
+        assert problems[0].startswith('caption_end_equals_caption_total')
@@ -0,0 +1,31 @@
+import pytest
+
+from hchztests.invokeapp import parse_invoke_app_output
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class TestParseInvokeAppOutput(object):
+
+    def test_strip_submit_metrics(self):
+        """
+        tool output follows the exec'ing line, without submit metrics
+        """
+
+        result = "invoke_app -C 'sh ./slow_echo hi'\n" \
+                 + "exec'ing sh ./slow_echo hi\n" \
+                 + "=SUBMIT-METRICS=> job=1\n" \
+                 + "hi\n" \
+                 + "=SUBMIT-METRICS=> job=1 venue=local status=0\n"
+
+        assert parse_invoke_app_output(result) == 'hi'
+
+
+    def test_no_exec(self):
+        """
+        return None when invoke_app did not run the tool
+        """
+
+        assert parse_invoke_app_output('invoke_app: bad option -Q') is None
@@ -0,0 +1,128 @@
+import pytest
+
+from hchztests.loginload import LoginLoad
+from hchztests.loginload import format_ramp
+from hchztests.loginload import http_login
+from hchztests.loginload import login_form_fields
+from hchztests.standins import LoginStandIn
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+ACCOUNTS = {'hcuser1' : 'hcpass1',
+            'hcuser2' : 'hcpass2'}
+
+
+def load_for(server,accounts):
+
+    def login(username,password):
+        return http_login(server.authority,username,password,timeout=10)
+
+    return LoginLoad(login,accounts)
+
+
+class TestLoginForm(object):
+
+    def test_login_form_fields(self):
+        """
+        collect the hidden fields of the form holding the password field
+        """
+
+        html = '<form action="/search"><input type="hidden" name="q" />' \
+             + '</form>' \
+             + '<form method="post" action="/login">' \
+             + '<input type="text" name="username">' \
+             + '<input type="password" name="passwd">' \
+             + '<input type="hidden" name="task" value="user.login">' \
+             + "<input type='hidden' name='0123abcd' value='1'>" \
+             + '</form>'
+
+        assert login_form_fields(html) == {'task'     : 'user.login',
+                                           '0123abcd' : '1'}
+
+
+    def test_login_form_fields_no_form(self):
+        """
+        pages without a login form have no fields
+        """
+
+        assert login_form_fields('<html></html>') == {}
+
+
+class TestLoginLoadStandIn(object):
+
+    def test_http_login(self):
+        """
+        log in with the form's csrf token and check the session
+        """
+
+        with LoginStandIn(ACCOUNTS) as server:
+            record = http_login(server.authority,'hcuser1','hcpass1')
+
+        assert record['error'] is None, "record = %s" % (record)
+        assert record['status'] == 200
+        assert record['latency'] > 0
+        assert server.logins == 1
+
+
+    def test_http_login_bad_password(self):
+        """
+        a rejected login is reported as an error
+        """
+
+        with LoginStandIn(ACCOUNTS) as server:
+            record = http_login(server.authority,'hcuser1','wrong')
+
+        assert record['error'] is not None
+        assert 'not logged in' in str(record['error'])
+        assert server.failed_logins == 1
+
+
+    def test_ramp(self,perf_report):
+        """
+        ramp concurrent logins, measuring throughput and latency
+        """
+
+        with LoginStandIn(ACCOUNTS) as server:
+            load = load_for(server,sorted(ACCOUNTS.items()))
+            steps = load.ramp([1,4],8)
+
+        for step in steps:
+            perf_report.record('login_load',target='standin',**step)
+
+        assert [s['concurrency'] for s in steps] == [1,4]
+        assert [s['errors'] for s in steps] == [0,0], format_ramp(steps)
+        assert steps[1]['latency']['count'] == 8
+        assert server.logins == 16
+
+
+    def test_ramp_shows_degradation(self):
+        """
+        logins slow down when they wait on a busy login backend
+        """
+
+        with LoginStandIn(ACCOUNTS,auth_delay=0.1,workers=1) as server:
+            load = load_for(server,sorted(ACCOUNTS.items()))
+            steps = load.ramp([1,4],4)
+
+        assert steps[1]['latency']['median'] \
+            > 2 * steps[0]['latency']['median'], format_ramp(steps)
+
+
+    def test_error_rate(self):
+        """
+        failed logins are counted in the error rate
+        """
+
+        accounts = [('hcuser1','hcpass1'),('hcuser2','wrong')]
+
+        with LoginStandIn(ACCOUNTS) as server:
+            load = load_for(server,accounts)
+            records,elapsed = load.run(4,concurrency=2)
+            summary = load.summary(records,elapsed,2)
+
+        assert summary['errors'] == 2
+        assert summary['error_rate'] == 0.5
+        assert summary['latency']['count'] == 2
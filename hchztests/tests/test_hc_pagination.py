@@ -0,0 +1,214 @@
+import pytest
+
+from hchztests.pagination import PAGE_CHECKS
+from hchztests.pagination import check_rows_match_counts
+from hchztests.pagination import validate_pages
+from hchztests.pagination import walk_pages
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class FakeSearchResults(object):
+
+    def __init__(self,page):
+        self.page = page
+
+    def num_rows(self):
+        return self.page.rows_shown()
+
+
+class FakeForm(object):
+
+    def __init__(self,page):
+        self.search_results = FakeSearchResults(page)
+
+
+class FakePaginatedPage(object):
+    """
+    a listing of total items, limit items per page, that links to
+    the pages up to window page numbers before and after the
+    current page. loads counts the pages loaded.
+    """
+
+    def __init__(self,total,limit,window=2,short_page=None):
+
+        self.total = total
+        self.limit = limit
+        self.window = window
+        self.short_page = short_page
+        self.page = 1
+        self.loads = 1
+        self.form = FakeForm(self)
+
+
+    def pages(self):
+        return max(1,(self.total + self.limit - 1) // self.limit)
+
+
+    def current_url(self):
+        return '/listing?limitstart=%d' % ((self.page-1)*self.limit)
+
+
+    def get_current_page_number(self):
+        return str(self.page)
+
+
+    def get_link_page_numbers(self):
+        if self.pages() == 1:
+            return []
+        low = max(1,self.page-self.window)
+        high = min(self.pages(),self.page+self.window)
+        return [str(p) for p in range(low,high+1) if p != self.page]
+
+
+    def get_pagination_counts(self):
+        start = (self.page-1)*self.limit + 1
+        end = min(self.page*self.limit,self.total)
+        return (start,end,self.total)
+
+
+    def rows_shown(self):
+        (start,end,total) = self.get_pagination_counts()
+        rows = end - start + 1
+        if self.page == self.short_page:
+            rows -= 1
+        return rows
+
+
+    def goto_page_number(self,page):
+        self.page = int(page)
+        self.loads += 1
+
+
+class TestPaginationWalk(object):
+
+    def test_walk_all_pages(self):
+        """
+        visit every page once, following links forward
+        """
+
+        po = FakePaginatedPage(total=47,limit=5)
+
+        pages = list(walk_pages(po))
+
+        assert [s['page'] for s in pages] == range(1,11)
+        assert pages[-1]['counts'] == (46,47,47)
+        assert pages[-1]['rows'] == 2
+        # one load per page, no loads to go back
+        assert po.loads == 10
+
+
+    def test_walk_single_page(self):
+        """
+        a listing without page links is one page
+        """
+
+        po = FakePaginatedPage(total=3,limit=5)
+
+        pages = list(walk_pages(po))
+
+        assert len(pages) == 1
+        assert po.loads == 1
+
+
+    def test_walk_is_lazy(self):
+        """
+        pages are only loaded when their snapshots are asked for
+        """
+
+        po = FakePaginatedPage(total=100,limit=5)
+
+        pages = walk_pages(po)
+        assert po.loads == 1
+
+        next(pages)
+        next(pages)
+        assert po.loads == 2
+
+
+    def test_walk_max_pages(self):
+        """
+        stop after max_pages pages
+        """
+
+        po = FakePaginatedPage(total=100,limit=5)
+
+        pages = list(walk_pages(po,max_pages=3))
+
+        assert len(pages) == 3
+        assert po.loads == 3
+
+
+class TestPaginationValidation(object):
+
+    def test_validate_good_listing(self):
+        """
+        a consistent listing has no problems
+        """
+
+        po = FakePaginatedPage(total=23,limit=5)
+
+        count,problems = validate_pages(walk_pages(po))
+
+        assert count == 5
+        assert problems == []
+
+
+    def test_validate_collects_all_problems(self):
+        """
+        without fail fast, every page is checked
+        """
+
+        po = FakePaginatedPage(total=23,limit=5,short_page=2)
+
+        count,problems = validate_pages(walk_pages(po))
+
+        assert count == 5
+        assert len(problems) == 1
+        assert 'displayed = 4' in problems[0]
+
+
+    def test_validate_fail_fast(self):
+        """
+        with fail fast, the walk stops at the first bad page
+        """
+
+        po = FakePaginatedPage(total=100,limit=5,short_page=2)
+
+        count,problems = validate_pages(walk_pages(po),fail_fast=True)
+
+        assert count == 2
+        assert len(problems) == 1
+        assert po.loads == 2
+
+
+    def test_validate_counts_continue(self):
+        """
+        a page that skips items is reported
+        """
+
+        po = FakePaginatedPage(total=30,limit=5)
+
+        def skipping_snapshots():
+            for snap in walk_pages(po):
+                if snap['page'] == 3:
+                    snap['counts'] = (12,15,30)
+                yield snap
+
+        count,problems = validate_pages(skipping_snapshots(),PAGE_CHECKS)
+
+        assert count == 6
+        assert len([p for p in problems if 'starts at item 12' in p]) == 1
+
+
+    def test_rows_match_empty_listing(self):
+        """
+        an empty listing shows no rows
+        """
+
+        snap = {'page' : 1, 'url' : '/listing',
+                'counts' : (0,0,0), 'rows' : 0}
+
+        assert check_rows_match_counts(None,snap) == []
@@ -0,0 +1,90 @@
+import pytest
+import subprocess
+
+from hchztests.probes import audit_paths
+from hchztests.probes import path_problems
+from hchztests.probes import probe_environment
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class BashShell(object):
+    """
+    run commands in a local bash, like a workspace shell
+    """
+
+    def execute(self,command,fail_on_exit_code=True):
+
+        p = subprocess.Popen(['/bin/bash','-c',command],
+                             stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT)
+        output = p.communicate()[0]
+        return (output.strip(),p.returncode)
+
+
+class TestPathAudit(object):
+
+    def test_audit_paths(self,tmpdir):
+        """
+        audit current and legacy script locations with one command
+        """
+
+        legacy = tmpdir.join("old sh")
+        legacy.write('')
+
+        table = [
+            ('sh',           '/bin/sh',      [str(legacy),'/no/such/sh']),
+            ('hcnosuchprog', '/usr/bin/hcnosuchprog', []),
+        ]
+
+        report = audit_paths(BashShell(),table)
+
+        assert report['sh']['found'] != ''
+        assert report['sh']['old_found'] == [str(legacy)]
+        assert report['hcnosuchprog']['found'] == ''
+
+
+    def test_path_problems(self):
+        """
+        report missing, misplaced and legacy scripts
+        """
+
+        assert path_problems('submit',{'expected'  : '/usr/bin/submit',
+                                       'found'     : '/usr/bin/submit',
+                                       'old_found' : []}) == []
+
+        problems = path_problems('submit',{'expected'  : '/usr/bin/submit',
+                                           'found'     : '/apps/bin/submit',
+                                           'old_found' : ['/apps/bin/submit']})
+        assert len(problems) == 2
+        assert "calls '/apps/bin/submit'" in problems[0]
+
+        problems = path_problems('submit',{'expected'  : '/usr/bin/submit',
+                                           'found'     : '',
+                                           'old_found' : []})
+        assert problems == ["'submit' not in search path"]
+
+
+class TestEnvironmentProbe(object):
+
+    def test_probe_environment(self,tmpdir):
+        """
+        gather environment variables, paths and functions in one command
+        """
+
+        link = tmpdir.join('link')
+        link.mksymlinkto(tmpdir)
+
+        facts = probe_environment(BashShell(),
+                    {'env'       : ['HOME','HCNOSUCHVAR'],
+                     'paths'     : ['${HOME}',str(link),'/no/such/path'],
+                     'functions' : ['hcnosuchfunction']})
+
+        assert facts['env']['HOME'] != ''
+        assert facts['env']['HCNOSUCHVAR'] == ''
+        assert facts['paths']['${HOME}']['directory'] is True
+        assert facts['paths'][str(link)]['realpath'] == str(tmpdir.realpath())
+        assert facts['paths']['/no/such/path']['exists'] is False
+        assert facts['functions']['hcnosuchfunction'] == ''
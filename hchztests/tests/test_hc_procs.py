@@ -0,0 +1,74 @@
+import base64
+import pytest
+
+from hchztests.procs import ProcessSnapshot
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+def _record(pid,uid,rss,cmdline,environ):
+
+    fields = []
+    for data in [cmdline,environ]:
+        if data is None:
+            fields.append('?')
+        elif data == '':
+            fields.append('-')
+        else:
+            fields.append(base64.b64encode(data))
+
+    return '=HCPROC=> %s %s %s %s %s' % (pid,uid,rss,fields[0],fields[1])
+
+
+SNAPSHOT_OUTPUT = '\n'.join([
+    _record(1,65534,2048,
+            '/usr/bin/Xvnc\0:0\0-fp\0/usr/share/fonts/X11/misc,'
+            + '/usr/share/fonts/X11/100dpi/:unscaled\0',None),
+    _record(54,1000,512,'sleep\00023995946712\0','HOME=/home/user\0'
+            + 'TOOL_PARAMETERS=/tmp/params\0'),
+    _record(60,1000,0,'',''),
+    '=HCUSER=> 65534 nobody',
+    '=HCUSER=> 1000 user',
+])
+
+
+class TestProcessSnapshot(object):
+
+    def test_parse_records(self):
+        """
+        parse process records and resolve user names
+        """
+
+        procs = ProcessSnapshot.parse(SNAPSHOT_OUTPUT)
+
+        assert [p.pid for p in procs] == [1,54,60]
+        assert procs[0].user == 'nobody'
+        assert procs[0].command == 'Xvnc'
+        assert procs[0].environ is None
+        assert procs[1].rss == 512
+        assert procs[1].environ['TOOL_PARAMETERS'] == '/tmp/params'
+        assert procs[2].cmdline == []
+        assert procs[2].environ == {}
+
+
+    def test_lookups(self):
+        """
+        look processes up by command, argument and command line
+        """
+
+        class FakeShell(object):
+            def execute(self,command,fail_on_exit_code=True):
+                return (SNAPSHOT_OUTPUT,0)
+
+        snapshot = ProcessSnapshot(FakeShell())
+
+        xvnc = snapshot.find('Xvnc',user='nobody')
+        assert len(xvnc) == 1
+        assert xvnc[0].option('-fp').startswith('/usr/share/fonts/X11/misc')
+        assert snapshot.find('Xvnc',user='user') == []
+        assert snapshot.find_cmdline('sleep 23995946712')[0].pid == 54
+        assert snapshot.with_arg('-fp')[0].pid == 1
+        assert snapshot.get(60).command == ''
+        assert snapshot.search('TOOL_PARAMETERS=') == []
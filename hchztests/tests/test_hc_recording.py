@@ -0,0 +1,117 @@
+import distutils.spawn
+import os
+import pytest
+
+from hchztests.recording import FrameRing
+from hchztests.recording import RingRecordXvfb
+from hchztests.recording import encode_frames
+from hchztests.recording import split_jpeg_stream
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+def fake_jpeg(n):
+    return '\xff\xd8frame%d\xff\xd9' % (n)
+
+
+class TestFrameRing(object):
+
+    def test_ring_keeps_latest_frames(self):
+        """
+        a full ring drops its oldest frames
+        """
+
+        ring = FrameRing(3)
+        for i in range(5):
+            ring.add(i)
+
+        assert ring.frames() == [2,3,4]
+        assert len(ring) == 3
+        assert ring.dropped == 2
+
+        ring.clear()
+        assert ring.frames() == []
+
+
+    def test_ring_size_from_seconds(self):
+        """
+        the ring holds seconds*fps frames
+        """
+
+        recording = RingRecordXvfb(None,seconds=10,fps=2)
+
+        assert recording.ring._frames.maxlen == 20
+
+
+    def test_save_without_frames(self):
+        """
+        nothing is encoded when there are no frames
+        """
+
+        recording = RingRecordXvfb('/tmp/hcvideo.mp4')
+
+        assert recording.save() is None
+        assert not os.path.exists('/tmp/hcvideo.mp4')
+
+
+class TestJpegStream(object):
+
+    def test_split_jpeg_stream(self):
+        """
+        split complete images off a stream, keeping the partial rest
+        """
+
+        stream = fake_jpeg(1) + fake_jpeg(2) + '\xff\xd8part'
+
+        frames,rest = split_jpeg_stream(stream)
+
+        assert frames == [fake_jpeg(1),fake_jpeg(2)]
+        assert rest == '\xff\xd8part'
+
+        frames,rest = split_jpeg_stream(rest + '3\xff\xd9')
+
+        assert frames == ['\xff\xd8part3\xff\xd9']
+        assert rest == ''
+
+
+    def test_split_jpeg_stream_chunks(self):
+        """
+        images split across reads are put back together
+        """
+
+        stream = ''.join([fake_jpeg(i) for i in range(10)])
+
+        frames = []
+        buf = ''
+        for i in range(0,len(stream),7):
+            found,buf = split_jpeg_stream(buf + stream[i:i+7])
+            frames.extend(found)
+
+        assert frames == [fake_jpeg(i) for i in range(10)]
+        assert buf == ''
+
+
+class TestEncodeFrames(object):
+
+    def test_encode_failure_cleans_up(self,tmpdir):
+        """
+        encoding errors are raised and the frame files removed
+        """
+
+        false = distutils.spawn.find_executable('false')
+        if false is None:
+            pytest.skip('false command not available')
+
+        before = set(os.listdir('/dev/shm')) \
+            if os.path.isdir('/dev/shm') else set()
+
+        with pytest.raises(RuntimeError):
+            encode_frames([fake_jpeg(1)],str(tmpdir.join('v.mp4')),2,
+                          ffmpeg=false)
+
+        after = set(os.listdir('/dev/shm')) \
+            if os.path.isdir('/dev/shm') else set()
+        assert len([d for d in after - before
+                    if d.startswith('hcframes')]) == 0
@@ -0,0 +1,134 @@
+import pytest
+
+from hchztests.perf import PerfReport
+from hchztests.perf import RepeatStats
+from hchztests.perf import repeat_key
+from hchztests.perf import wilson_interval
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class TestRepeatStats(object):
+
+    def test_repeat_key(self):
+        """
+        iterations of a test share a key, other parameters are kept
+        """
+
+        assert repeat_key('test_a.py::TestA::test_a[repeat3]') \
+            == 'test_a.py::TestA::test_a'
+        assert repeat_key('test_a.py::TestA::test_a[foo-repeat12]') \
+            == 'test_a.py::TestA::test_a[foo]'
+        assert repeat_key('test_a.py::TestA::test_a[foo]') \
+            == 'test_a.py::TestA::test_a[foo]'
+        assert repeat_key('test_a.py::TestA::test_a') \
+            == 'test_a.py::TestA::test_a'
+
+
+    def test_wilson_interval(self):
+        """
+        the interval holds the observed rate and narrows with more runs
+        """
+
+        low,high = wilson_interval(1,10)
+        assert low < 0.1 < high
+        assert round(low,3) == 0.018
+        assert round(high,3) == 0.404
+
+        low100,high100 = wilson_interval(10,100)
+        assert high100 - low100 < high - low
+
+        assert wilson_interval(0,0) == (0.0,1.0)
+        assert wilson_interval(0,10)[0] == 0.0
+        assert wilson_interval(10,10)[1] == 1.0
+
+        with pytest.raises(ValueError):
+            wilson_interval(1,10,0.5)
+
+
+    def test_summary(self):
+        """
+        describe the outcomes and durations of a test's iterations
+        """
+
+        stats = RepeatStats()
+        for i in range(1,11):
+            outcome = 'failed' if i in [3,7] else 'passed'
+            stats.add('test_a.py::test_a[repeat%d]' % (i),outcome,float(i))
+
+        summary = stats.summary('test_a.py::test_a')
+
+        assert summary['runs'] == 10
+        assert summary['passed'] == 8
+        assert summary['failed'] == 2
+        assert summary['flake_rate'] == 0.2
+        assert summary['flake_rate_low'] < 0.2 < summary['flake_rate_high']
+        assert summary['duration']['median'] == 5.5
+        assert summary['duration']['max'] == 10.0
+
+        assert stats.summary('test_b.py::test_b')['flake_rate'] is None
+
+
+    def test_done_after_ci_width(self):
+        """
+        a test is done when its failure rate interval is narrow enough
+        """
+
+        stats = RepeatStats(ci_width=0.3,min_runs=5)
+
+        runs = 0
+        while not stats.done('test_a.py::test_a'):
+            runs += 1
+            stats.add('test_a.py::test_a[repeat%d]' % (runs),'passed',0.1)
+
+        # 0 failures in 9 runs: [0,0.299]
+        assert runs == 9
+
+
+    def test_done_respects_min_runs(self):
+        """
+        a wide ci_width still waits for min_runs
+        """
+
+        stats = RepeatStats(ci_width=1.0,min_runs=3)
+
+        stats.add('test_a.py::test_a[repeat1]','passed',0.1)
+        stats.add('test_a.py::test_a[repeat2]','passed',0.1)
+        assert not stats.done('test_a.py::test_a[repeat3]')
+
+        stats.add('test_a.py::test_a[repeat3]','passed',0.1)
+        assert stats.done('test_a.py::test_a[repeat4]')
+
+
+    def test_never_done_without_ci_width(self):
+        """
+        a ci_width of 0 runs every repeat
+        """
+
+        stats = RepeatStats(min_runs=1)
+        for i in range(50):
+            stats.add('test_a.py::test_a[repeat%d]' % (i),'passed',0.1)
+
+        assert not stats.done('test_a.py::test_a')
+
+
+    def test_record(self):
+        """
+        record one performance report entry per repeated test
+        """
+
+        stats = RepeatStats()
+        stats.add('test_a.py::test_a[repeat1]','passed',0.1)
+        stats.add('test_b.py::test_b[x-repeat1]','failed',0.2)
+        stats.add_stopped('test_b.py::test_b[x-repeat2]')
+
+        report = PerfReport()
+        stats.record(report)
+
+        entries = report.entries('repeat')
+        assert [e['metrics']['test'] for e in entries] \
+            == ['test_a.py::test_a','test_b.py::test_b[x]']
+        assert entries[1]['metrics']['failed'] == 1
+        assert entries[1]['metrics']['stopped'] == 1
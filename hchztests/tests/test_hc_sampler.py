@@ -0,0 +1,162 @@
+import pytest
+
+from hchztests.sampler import ResourceSampler
+from hchztests.sampler import attach_resource_usage
+from hchztests.sampler import format_samples
+from hchztests.sampler import item_resource_sampler
+from hchztests.sampler import parse_sample
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+SAMPLE_OUTPUT = """=HCSAMPLE=> loadavg 0.52 0.40 0.31 2/181 4242
+=HCSAMPLE=> MemTotal 4046848
+=HCSAMPLE=> MemAvailable 2023424
+=HCSAMPLE=> cgroup_memory 104857600
+=HCSAMPLE=> cgroup_cpu 2500000000
+=HCSAMPLE=> disk
+"""
+
+
+class FakeItem(object):
+    """
+    a pytest item. pytest style classes keep their test instance in
+    instance, unittest.TestCase items in _testcase with instance None.
+    """
+
+    def __init__(self,instance=None,testcase=None):
+        self.instance = instance
+        if testcase is not None:
+            self._testcase = testcase
+
+
+class FakeTest(object):
+
+    def __init__(self,sampler):
+        self.resource_sampler = sampler
+
+
+class FakeCall(object):
+
+    def __init__(self,start,stop):
+        self.start = start
+        self.stop = stop
+
+
+class FakeReport(object):
+
+    def __init__(self,when):
+        self.when = when
+        self.sections = []
+
+
+def _sampler(times):
+
+    sampler = ResourceSampler(None)
+    for t in times:
+        sampler._samples.append({'time' : t, 'cgroup_cpu' : t/10.0})
+        sampler._times.append(t)
+    return sampler
+
+
+class TestResourceSampler(object):
+
+    def test_parse_sample(self):
+        """
+        parse measurements, skipping the ones that could not be read
+        """
+
+        sample = parse_sample(SAMPLE_OUTPUT)
+
+        assert sample['load1'] == 0.52
+        assert sample['load15'] == 0.31
+        assert sample['mem_total'] == 4046848
+        assert sample['mem_available'] == 2023424
+        assert sample['cgroup_memory'] == 102400
+        assert sample['cgroup_cpu'] == 2.5
+        assert 'disk' not in sample
+
+
+    def test_format_cpu_percent(self):
+        """
+        cgroup cpu usage is reported as a percentage of one cpu
+        """
+
+        samples = [{'time' : 100.0, 'cgroup_cpu' : 2.5, 'disk' : 2048},
+                   {'time' : 102.0, 'cgroup_cpu' : 3.5, 'disk' : 4096}]
+
+        lines = format_samples(samples).splitlines()
+
+        assert len(lines) == 3
+        assert lines[2].split() == ['+2.0','50.0','4.0']
+        assert format_samples([]) == 'no samples'
+
+
+    def test_samples_window(self):
+        """
+        samples in a time window include the sample before the window
+        """
+
+        sampler = ResourceSampler(None)
+        for t in [10,20,30,40]:
+            sampler._samples.append({'time' : t})
+            sampler._times.append(t)
+
+        assert [s['time'] for s in sampler.samples(25,35)] == [20,30]
+        assert [s['time'] for s in sampler.samples(5,15)] == [10]
+        assert len(sampler.samples()) == 4
+
+
+    def test_item_resource_sampler(self):
+        """
+        find the samplers of unittest and pytest style test classes
+        """
+
+        sampler = _sampler([])
+
+        assert item_resource_sampler(
+                FakeItem(instance=FakeTest(sampler))) is sampler
+        assert item_resource_sampler(
+                FakeItem(testcase=FakeTest(sampler))) is sampler
+        assert item_resource_sampler(FakeItem()) is None
+        assert item_resource_sampler(FakeItem(instance=object())) is None
+
+
+    @pytest.mark.parametrize('style',['pytest','unittest'])
+    def test_attach_resource_usage(self,style):
+        """
+        attach the samples taken during the call to the call's report
+        """
+
+        sampler = _sampler([10,20,30,40])
+        if style == 'pytest':
+            item = FakeItem(instance=FakeTest(sampler))
+        else:
+            item = FakeItem(testcase=FakeTest(sampler))
+
+        rep = FakeReport('call')
+        attach_resource_usage(item,FakeCall(25,35),rep)
+
+        assert rep.sections == [('container resource usage',
+                                 format_samples(sampler.samples(25,35)))]
+        assert len(rep.sections[0][1].splitlines()) == 3
+
+
+    def test_attach_resource_usage_call_only(self):
+        """
+        setup and teardown reports, and tests without a sampler,
+        get no resource usage
+        """
+
+        item = FakeItem(testcase=FakeTest(_sampler([10])))
+
+        for when in ['setup','teardown']:
+            rep = FakeReport(when)
+            attach_resource_usage(item,FakeCall(0,20),rep)
+            assert rep.sections == []
+
+        rep = FakeReport('call')
+        attach_resource_usage(FakeItem(),FakeCall(0,20),rep)
+        assert rep.sections == []
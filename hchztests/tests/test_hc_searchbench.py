@@ -0,0 +1,150 @@
+import pytest
+import time
+
+from hchztests.perf import ActionTimer
+from hchztests.perf import PerfReport
+from hchztests.searchbench import NO_MATCH_QUERY
+from hchztests.searchbench import QUERY_KINDS
+from hchztests.searchbench import alias_queries
+from hchztests.searchbench import benchmark_queries
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class FakeListing(object):
+    """
+    a listing of tool aliases with a substring search
+    """
+
+    def __init__(self,aliases,delay=0):
+
+        self.aliases = aliases
+        self.delay = delay
+        self.shown = list(aliases)
+
+
+    def search_for(self,query):
+
+        if self.delay > 0:
+            time.sleep(self.delay)
+        self.shown = [a for a in self.aliases if query in a]
+
+
+    def results(self):
+
+        return self.shown
+
+
+class TestActionTimer(object):
+
+    def test_instrument(self):
+        """
+        time the calls to an instrumented method
+        """
+
+        listing = FakeListing(['hctool1','hctool2'],delay=0.01)
+
+        actions = ActionTimer()
+        actions.instrument(listing,'search_for')
+        actions.instrument(listing,'results',name='read_results')
+
+        listing.search_for('tool1')
+        listing.search_for('tool')
+
+        assert listing.results() == ['hctool1','hctool2']
+
+        summary = actions.summary()
+        assert summary['search_for']['count'] == 2
+        assert summary['search_for']['min'] >= 0.01
+        assert summary['read_results']['count'] == 1
+
+
+    def test_instrument_times_failed_calls(self):
+        """
+        calls that raise are timed too
+        """
+
+        class Broken(object):
+            def search_for(self,query):
+                raise ValueError(query)
+
+        broken = Broken()
+        actions = ActionTimer()
+        actions.instrument(broken,'search_for')
+
+        with pytest.raises(ValueError):
+            broken.search_for('x')
+
+        assert actions.summary()['search_for']['count'] == 1
+
+
+    def test_record(self):
+        """
+        record one performance report entry per action
+        """
+
+        listing = FakeListing(['hctool1'])
+        actions = ActionTimer()
+        actions.instrument(listing,'search_for')
+        listing.search_for('hc')
+
+        report = PerfReport()
+        actions.record(report,'pipeline_actions',test='test_record')
+
+        entries = report.entries('pipeline_actions')
+        assert len(entries) == 1
+        assert entries[0]['metrics']['action'] == 'search_for'
+        assert entries[0]['metrics']['test'] == 'test_record'
+        assert entries[0]['metrics']['latency']['count'] == 1
+
+
+class TestSearchBenchmark(object):
+
+    def test_alias_queries(self):
+        """
+        build exact, prefix, substring and no-match queries
+        """
+
+        queries = alias_queries('hctool')
+
+        assert [kind for kind,query,expected in queries] == QUERY_KINDS
+        assert queries == [('exact','hctool','hctool'),
+                           ('prefix','hct','hctool'),
+                           ('substring','ctoo','hctool'),
+                           ('no_match',NO_MATCH_QUERY,None)]
+
+
+    def test_benchmark_queries(self):
+        """
+        repeat each query, summarizing latency and checking results
+        """
+
+        listing = FakeListing(['hctool','hctool2','other'])
+
+        report = benchmark_queries(listing.search_for,listing.results,
+                                   alias_queries('hctool'),repeat=3)
+
+        assert sorted(report.keys()) == sorted(QUERY_KINDS)
+        for kind in QUERY_KINDS:
+            assert report[kind]['latency']['count'] == 3
+            assert report[kind]['wrong'] == 0, "report = %s" % (report)
+
+
+    def test_benchmark_queries_wrong_results(self):
+        """
+        searches missing the alias, or matching everything, are wrong
+        """
+
+        class IgnoresQuery(FakeListing):
+            def search_for(self,query):
+                self.shown = list(self.aliases)
+
+        listing = IgnoresQuery(['other'])
+
+        report = benchmark_queries(listing.search_for,listing.results,
+                                   alias_queries('hctool'),repeat=2)
+
+        assert report['exact']['wrong'] == 2
+        assert report['no_match']['wrong'] == 2
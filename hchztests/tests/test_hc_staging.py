@@ -0,0 +1,72 @@
+import pytest
+import tarfile
+
+from StringIO import StringIO
+
+from hchztests.staging import Stager
+from hchztests.staging import make_tarball
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class TestMakeTarball(object):
+
+    def test_contents_and_modes(self):
+        """
+        files are archived with their contents and modes
+        """
+
+        data = make_tarball({'datafile1' : ('this is datafile1',0400),
+                             'slow_echo' : ('sleep 3; echo $*',0700)})
+
+        tar = tarfile.open(fileobj=StringIO(data),mode='r:gz')
+        members = dict([(m.name,m) for m in tar.getmembers()])
+
+        assert sorted(members.keys()) == ['datafile1','slow_echo']
+        assert members['datafile1'].mode == 0400
+        assert members['slow_echo'].mode == 0700
+        assert tar.extractfile('datafile1').read() == 'this is datafile1'
+
+
+    def test_parent_directories(self):
+        """
+        parent directories of nested paths are added to the archive
+        """
+
+        data = make_tarball({'a/b/c.txt' : (u'caf\xe9',0600)})
+
+        tar = tarfile.open(fileobj=StringIO(data),mode='r:gz')
+        members = dict([(m.name,m) for m in tar.getmembers()])
+
+        assert members['a'].isdir()
+        assert members['a/b'].isdir()
+        assert tar.extractfile('a/b/c.txt').read() == 'caf\xc3\xa9'
+
+
+class TestStager(object):
+
+    def test_relative_paths_only(self):
+        """
+        staged paths must stay inside of the staging directory
+        """
+
+        stager = Stager(None,'/tmp')
+
+        for path in ['/etc/passwd','../outside']:
+            with pytest.raises(ValueError):
+                stager.stage({path : ('data',0600)})
+
+
+    def test_unique_directory(self):
+        """
+        each stager gets its own directory inside of basedir
+        """
+
+        s1 = Stager(None,'/home/user/sessions/1234')
+        s2 = Stager(None,'/home/user/sessions/1234')
+
+        assert s1.directory != s2.directory
+        assert s1.directory.startswith('/home/user/sessions/1234/hcstage.')
+        assert s1.path('datafile1') == s1.directory + '/datafile1'
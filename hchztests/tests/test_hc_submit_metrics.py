@@ -0,0 +1,114 @@
+import pytest
+
+from hchztests.submit import SubmitMetricsParser
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+METRICS_OUTPUT = """=SUBMIT-METRICS=> job=4461
+hello world
+=SUBMIT-METRICS=> job=4461 venue=local status=0 cputime=0.012 realtime=10.034
+"""
+
+
+class TestSubmitMetricsParser(object):
+
+    def test_parse_single_job(self):
+        """
+        parse the metrics of a single job fed all at once
+        """
+
+        parser = SubmitMetricsParser()
+        parser.feed(METRICS_OUTPUT)
+        parser.close()
+
+        jobs = parser.finished_jobs()
+
+        assert len(jobs) == 1, "expected 1 job, found: %s" % (jobs)
+        assert jobs[0]['job'] == '4461'
+        assert jobs[0]['venue'] == 'local'
+        assert jobs[0]['status'] == 0
+        assert jobs[0]['cputime'] == 0.012
+        assert jobs[0]['realtime'] == 10.034
+        assert list(parser.output) == ['hello world']
+
+
+    def test_parse_split_chunks(self):
+        """
+        parse metrics fed one character at a time, with carriage returns
+        """
+
+        parser = SubmitMetricsParser()
+        for c in METRICS_OUTPUT.replace('\n','\r\n'):
+            parser.feed(c)
+        parser.close()
+
+        jobs = parser.finished_jobs()
+
+        assert len(jobs) == 1, "expected 1 job, found: %s" % (jobs)
+        assert jobs[0]['realtime'] == 10.034
+        assert list(parser.output) == ['hello world']
+
+
+    def test_output_is_bounded(self):
+        """
+        chatty jobs should only keep the last few lines of output
+        """
+
+        parser = SubmitMetricsParser(max_output_lines=10,max_line_length=80)
+        parser.feed('=SUBMIT-METRICS=> job=1\n')
+        for i in range(10000):
+            parser.feed('line %s %s\n' % (i,'x'*200))
+        parser.feed('=SUBMIT-METRICS=> job=1 venue=local status=0'
+                    + ' cputime=1.0 realtime=2.0\n')
+        parser.close()
+
+        assert len(parser.output) == 10
+        assert max([len(line) for line in parser.output]) <= 80
+        assert len(parser.finished_jobs()) == 1
+
+
+    def test_table_summary_multiple_jobs(self):
+        """
+        aggregate the metrics from several jobs into a table
+        """
+
+        parser = SubmitMetricsParser()
+        parser.feed('=SUBMIT-METRICS=> job=1\n'
+                    + '=SUBMIT-METRICS=> job=2\n'
+                    + '=SUBMIT-METRICS=> job=1 venue=local status=0'
+                    + ' cputime=1.0 realtime=2.0\n'
+                    + '=SUBMIT-METRICS=> job=2 venue=remote status=1'
+                    + ' cputime=3.0 realtime=4.0\n')
+        parser.close()
+
+        summary = parser.table().summary()
+
+        assert summary['jobs'] == 2
+        assert summary['finished'] == 2
+        assert summary['failed'] == 1
+        assert summary['venues'] == {'local' : 1, 'remote' : 1}
+        assert summary['realtime']['max'] == 4.0
+        assert summary['cputime']['min'] == 1.0
+
+
+    def test_parse_timestamped_lines(self):
+        """
+        use the time stamped on each line for the job start and finish
+        """
+
+        parser = SubmitMetricsParser(timestamped=True)
+        parser.feed('100.5 =SUBMIT-METRICS=> job=7\n'
+                    + '101.0 hello world\n'
+                    + '110.25 =SUBMIT-METRICS=> job=7 venue=local status=0'
+                    + ' cputime=0.1 realtime=9.5\n')
+        parser.close()
+
+        jobs = parser.finished_jobs()
+
+        assert len(jobs) == 1, "expected 1 job, found: %s" % (jobs)
+        assert jobs[0]['started'] == 100.5
+        assert jobs[0]['finished'] == 110.25
+        assert list(parser.output) == ['hello world']
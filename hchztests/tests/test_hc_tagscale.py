@@ -0,0 +1,110 @@
+import pytest
+import urllib2
+
+from hchztests.standins import TagsStandIn
+from hchztests.tagscale import DISPLAY_LIMITS
+from hchztests.tagscale import display_limit_url
+from hchztests.tagscale import format_scaling
+from hchztests.tagscale import limit_rows
+from hchztests.tagscale import parse_caption_counts
+from hchztests.tagscale import parse_tag_table
+from hchztests.tagscale import scaling_exponent
+from hchztests.tagscale import synthetic_tags
+from hchztests.tagscale import tag_table_html
+from hchztests.tagscale import time_display_limits
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+class TestTagTable(object):
+
+    def test_parse_tag_table(self):
+        """
+        parse the rows and caption counts of a rendered page
+        """
+
+        tags = synthetic_tags(50)
+        html = tag_table_html('Tags',tags[10:30],50,start=10)
+
+        assert parse_tag_table(html) == tags[10:30]
+        assert parse_caption_counts(html) == (11,30,50)
+
+
+    def test_parse_empty_tag_table(self):
+        """
+        an empty listing has no rows and zero counts
+        """
+
+        html = tag_table_html('Tags',[],0)
+
+        assert parse_tag_table(html) == []
+        assert parse_caption_counts(html) == (0,0,0)
+
+
+    def test_display_limit_url(self):
+        """
+        a display limit of All asks for a limit of 0
+        """
+
+        assert display_limit_url('/tags/browse','All') \
+            == '/tags/browse?limit=0&limitstart=0'
+        assert display_limit_url('/tags/x?a=1','20') \
+            == '/tags/x?a=1&limit=20&limitstart=0'
+
+
+    def test_scaling_exponent(self):
+        """
+        estimate how times grow with the number of rows
+        """
+
+        results = [{'rows' : 10,   'load_time' : 1.0, 'extract_time' : 0.1},
+                   {'rows' : 100,  'load_time' : 1.0, 'extract_time' : 1.0},
+                   {'rows' : 1000, 'load_time' : 1.0, 'extract_time' : 10.0}]
+
+        assert abs(scaling_exponent(results,'extract_time') - 1.0) < 1e-9
+        assert abs(scaling_exponent(results,'load_time')) < 1e-9
+        assert scaling_exponent(results[:1],'load_time') is None
+
+
+class TestTagsScalingStandIn(object):
+
+    @pytest.mark.parametrize('count',[1000,10000,100000])
+    @pytest.mark.parametrize('page',['/tags/browse','/tags/hctag000001'])
+    def test_display_limit_scaling(self,page,count,perf_report):
+        """
+        time the stand-in rendering synthetic tag tables at each
+        display limit. rows are extracted with parse_tag_table(), a
+        regular expression, not the TagsBrowsePage and TagsViewPage
+        page objects, so the extract times here don't measure the
+        harness's parsing. only the hub benchmark measures that.
+        """
+
+        with TagsStandIn(count) as server:
+
+            pages = {}
+
+            def load(display_limit):
+                url = display_limit_url(server.authority + page,
+                                        display_limit)
+                pages['html'] = urllib2.urlopen(url,timeout=60).read()
+
+            def extract():
+                return parse_tag_table(pages['html'])
+
+            results = time_display_limits(load,extract)
+
+        for r in results:
+            perf_report.record('tags_scaling',target='standin',page=page,
+                total=count,extractor='regex',**r)
+
+        assert [r['display_limit'] for r in results] == DISPLAY_LIMITS
+        assert [r['rows'] for r in results] \
+            == [limit_rows(l,count) for l in DISPLAY_LIMITS], \
+            format_scaling(results)
+        assert parse_caption_counts(pages['html']) == (1,count,count)
+
+        # showing all rows must cost more than showing a few
+        assert results[-1]['extract_time'] > results[0]['extract_time'], \
+            format_scaling(results)
@@ -0,0 +1,89 @@
+import pytest
+
+from hchztests.sessions import ConnectionChurn
+from hchztests.standins import SSHStandIn
+from hchztests.standins import StandInShell
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+paramiko = pytest.importorskip('paramiko')
+
+
+def churn_for(server):
+
+    def connect():
+        return StandInShell(server.host,server.port,
+                            server.username,server.password)
+
+    return ConnectionChurn(connect,server.ptys,poll_interval=0.1,
+                           release_timeout=5)
+
+
+class TestConnectionChurnStandIn(object):
+
+    def test_sequential_churn_releases_ptys(self,perf_report):
+        """
+        ptys are released after each connection closes
+        """
+
+        with SSHStandIn(max_ptys=15) as server:
+            churn = churn_for(server)
+            records = churn.run(31)
+            summary = churn.summary(records)
+
+        perf_report.record('tty_churn',target='standin',concurrency=1,
+            **summary)
+
+        assert summary['pty_failures'] == 0, "summary = %s" % (summary)
+        assert summary['unreleased'] == 0, "summary = %s" % (summary)
+        assert summary['leaked_ptys'] == 0, "summary = %s" % (summary)
+        assert summary['connect_latency']['count'] == 31
+
+
+    def test_concurrent_churn_releases_ptys(self):
+        """
+        ptys are released when several connections churn at the same time
+        """
+
+        with SSHStandIn(max_ptys=15) as server:
+            churn = churn_for(server)
+            records = churn.run(20,concurrency=5)
+            summary = churn.summary(records)
+
+        assert summary['pty_failures'] == 0, "summary = %s" % (summary)
+        assert summary['unreleased'] == 0, "summary = %s" % (summary)
+
+
+    def test_churn_detects_pty_leak(self):
+        """
+        a server that never releases ptys runs out of them
+        """
+
+        with SSHStandIn(max_ptys=4,release_delay=None) as server:
+            churn = churn_for(server)
+            churn.release_timeout = 1
+            records = churn.run(6)
+            summary = churn.summary(records)
+
+        assert summary['pty_failures'] == 2, "summary = %s" % (summary)
+        assert summary['unreleased'] == 4, "summary = %s" % (summary)
+        assert summary['leaked_ptys'] == 4, "summary = %s" % (summary)
+
+
+    def test_churn_measures_slow_release(self):
+        """
+        slow pty release shows up in time_to_release, not as failures
+        """
+
+        with SSHStandIn(release_delay=0.5) as server:
+            churn = churn_for(server)
+            records = churn.run(3)
+            summary = churn.summary(records)
+
+        assert summary['pty_failures'] == 0, "summary = %s" % (summary)
+        # the server may notice the hang up a little before
+        # the client finishes closing the connection
+        assert summary['time_to_release']['min'] >= 0.4, \
+            "summary = %s" % (summary)
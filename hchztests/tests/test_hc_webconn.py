@@ -0,0 +1,113 @@
+import gzip
+import pytest
+
+from StringIO import StringIO
+
+from hchztests.standins import HTTPStandIn
+from hchztests.webprobe import check_compression
+from hchztests.webprobe import check_http2
+from hchztests.webprobe import check_keepalive
+from hchztests.webprobe import check_tls_resumption
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+pytest.importorskip('cryptography')
+
+
+def _gzip(data):
+
+    buf = StringIO()
+    f = gzip.GzipFile(fileobj=buf,mode='wb')
+    f.write(data)
+    f.close()
+    return buf.getvalue()
+
+
+PAGE = '<html>%s</html>' % ('hubzero ' * 1000)
+
+ROUTES = {
+    '/'    : (200,{'Content-Type' : 'text/html'},PAGE),
+    '/gz'  : (200,{'Content-Type' : 'text/html',
+                   'Content-Encoding' : 'gzip',
+                   'Vary' : 'Accept-Encoding'},_gzip(PAGE)),
+}
+
+
+class TestConnectionChecks(object):
+
+    def test_keepalive(self):
+        """
+        sequential requests reuse one tls connection
+        """
+
+        with HTTPStandIn(ROUTES,tls=True) as server:
+            result = check_keepalive(server.authority + '/',requests=5,
+                                     verify=False)
+
+        assert result['statuses'] == [200]*5
+        assert result['connections'] == 1
+        assert server.connections == 1
+        assert result['reused_median'] is not None
+        assert result['setup_saved'] > 0
+
+
+    def test_no_keepalive(self):
+        """
+        count the connections opened when the server closes each one
+        """
+
+        with HTTPStandIn(ROUTES,keepalive=False) as server:
+            result = check_keepalive(server.authority + '/',requests=3)
+
+        assert result['connections'] == 3
+        assert result['reused_median'] is None
+        assert result['setup_saved'] == 0
+
+
+    def test_http2_alpn(self):
+        """
+        report the protocol negotiated through alpn
+        """
+
+        with HTTPStandIn(ROUTES,tls=True,alpn=['h2','http/1.1']) as server:
+            result = check_http2(server.authority,verify=False)
+
+        assert result['http2'] is True
+
+        with HTTPStandIn(ROUTES,tls=True) as server:
+            result = check_http2(server.authority,verify=False)
+
+        assert result['http2'] is False
+        assert result['protocol'] is None
+
+
+    def test_compression(self):
+        """
+        compare transferred bytes with the content size
+        """
+
+        with HTTPStandIn(ROUTES) as server:
+            plain = check_compression(server.authority + '/')
+            compressed = check_compression(server.authority + '/gz')
+
+        assert plain['encoding'] == ''
+        assert plain['ratio'] == 1.0
+        assert compressed['encoding'] == 'gzip'
+        assert compressed['size'] == len(PAGE)
+        assert compressed['ratio'] < 0.1
+
+
+    def test_tls_resumption(self):
+        """
+        a saved tls session is resumed on the next connection
+        """
+
+        with HTTPStandIn(ROUTES,tls=True) as server:
+            result = check_tls_resumption(server.authority)
+
+        if result is None:
+            pytest.skip('openssl command not available')
+
+        assert result['resumed'] is True, result
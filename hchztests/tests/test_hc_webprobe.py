@@ -0,0 +1,71 @@
+import pytest
+
+from hchztests.standins import HTTPStandIn
+from hchztests.webprobe import chain_problems
+from hchztests.webprobe import follow_redirects
+from hchztests.webprobe import summarize_chain
+
+
+pytestmark = [ pytest.mark.hcunit,
+             ]
+
+
+ROUTES = {
+    '/login'  : (301,{'Location' : '/login/'},''),
+    '/login/' : (302,{'Location' : '/users/login'},''),
+    '/users/login' : (200,{'Content-Type' : 'text/html'},'<html></html>'),
+    '/loop'   : (302,{'Location' : '/loop'},''),
+}
+
+
+class TestRedirectChains(object):
+
+    def test_follow_redirects(self):
+        """
+        follow relative redirects, timing each hop
+        """
+
+        with HTTPStandIn(ROUTES) as server:
+            chain = follow_redirects(server.authority + '/login')
+
+        assert [h['status'] for h in chain] == [301,302,200]
+        assert chain[1]['url'] == server.authority + '/login/'
+        assert chain[-1]['url'] == server.authority + '/users/login'
+        assert chain[0]['tls_time'] is None
+        assert min([h['total_time'] for h in chain]) > 0
+
+        summary = summarize_chain(chain)
+        assert summary['redirects'] == 2
+        assert summary['final_status'] == 200
+
+        assert chain_problems(chain,max_redirects=2) == []
+
+        problems = chain_problems(chain,max_redirects=1,final_scheme='https')
+        assert len(problems) == 2
+
+
+    def test_redirect_loop(self):
+        """
+        stop following a redirect loop
+        """
+
+        with HTTPStandIn(ROUTES) as server:
+            chain = follow_redirects(server.authority + '/loop')
+
+        assert len(chain) == 1
+        assert len(chain_problems(chain)) == 1
+
+
+    def test_connection_refused(self):
+        """
+        failed requests end the chain and are reported
+        """
+
+        with HTTPStandIn(ROUTES) as server:
+            url = server.authority + '/login'
+
+        chain = follow_redirects(url)
+
+        assert len(chain) == 1
+        assert chain[0]['error'] is not None
+        assert 'failed' in chain_problems(chain)[0]
@@ -0,0 +1,129 @@
+import pytest
+
+from hchztests.parallel import results
+from hchztests.parallel import run_parallel
+from hchztests.webprobe import check_compression
+from hchztests.webprobe import check_http2
+from hchztests.webprobe import check_keepalive
+from hchztests.webprobe import check_tls_resumption
+
+
+pytestmark = [ pytest.mark.website,
+               pytest.mark.connections,
+               pytest.mark.reboot,
+               pytest.mark.upgrade,
+               pytest.mark.prod_safe_upgrade,
+             ]
+
+
+# hubs under test often use self signed certificates,
+# these tests check how connections are used, not the certificate
+VERIFY = False
+
+
+class TestWebsiteConnections(object):
+
+    def test_keepalive_sequential(self,urls,perf_report):
+        """
+        check that sequential requests to the https uri reuse one
+        connection instead of opening a new one each time.
+        """
+
+        url = urls['https_authority'] + '/'
+        count = pytest.config.getoption("--keepalive_requests")
+
+        result = check_keepalive(url,count,verify=VERIFY)
+
+        perf_report.record('keepalive',mode='sequential',url=url,**result)
+
+        assert result['connections'] == 1, \
+            "%d requests to %s needed %d connections, expected 1" \
+            % (count,url,result['connections'])
+
+
+    def test_keepalive_concurrent(self,urls,perf_report):
+        """
+        check that connections are kept alive while several clients
+        make requests to the https uri at the same time.
+        """
+
+        url = urls['https_authority'] + '/'
+        count = pytest.config.getoption("--keepalive_requests")
+        clients = 4
+
+        outcomes = run_parallel(
+            lambda i: check_keepalive(url,count,verify=VERIFY),
+            range(clients),clients)
+        checks = results(range(clients),outcomes)
+
+        connections = sum([c['connections'] for c in checks])
+        saved = sum([c['setup_saved'] for c in checks])
+
+        perf_report.record('keepalive',mode='concurrent',url=url,
+            clients=clients,requests=clients*count,
+            connections=connections,setup_saved=saved)
+
+        assert connections == clients, \
+            "%d clients making %d requests each to %s" \
+            % (clients,count,url) \
+            + " needed %d connections, expected %d" \
+            % (connections,clients)
+
+
+    def test_tls_session_resumption(self,urls,perf_report):
+        """
+        check that the https server resumes tls sessions, so returning
+        clients can skip the full handshake.
+        """
+
+        url = urls['https_authority']
+
+        result = check_tls_resumption(url)
+
+        if result is None:
+            pytest.skip('openssl command not available')
+
+        perf_report.record('tls_resumption',url=url,**result)
+
+        assert result['resumed'] is True, \
+            "%s did not resume a tls session (%s)" \
+            % (url,result['protocol'])
+
+
+    def test_http2_available(self,urls,perf_report):
+        """
+        check if the https server offers http/2. only fails with
+        --require_http2, otherwise the result is only recorded.
+        """
+
+        url = urls['https_authority']
+
+        result = check_http2(url,verify=VERIFY)
+
+        perf_report.record('http2',url=url,**result)
+
+        if pytest.config.getoption("--require_http2"):
+            assert result['http2'] is True, \
+                "%s does not offer http/2, alpn protocol: %s" \
+                % (url,result['protocol'])
+
+
+    def test_compression_negotiated(self,urls,perf_report):
+        """
+        check that the front page is served compressed to clients
+        that accept compressed content.
+        """
+
+        url = urls['https_authority'] + '/'
+
+        result = check_compression(url,verify=VERIFY)
+
+        perf_report.record('compression',url=url,**result)
+
+        assert result['encoding'] not in ['','identity'], \
+            "%s was not compressed, %d bytes transferred" \
+            % (url,result['transferred'])
+
+        assert 'accept-encoding' in result['vary'].lower(), \
+            "compressed response from %s is missing" % (url) \
+            + " 'Vary: Accept-Encoding', vary: '%s'" % (result['vary'])
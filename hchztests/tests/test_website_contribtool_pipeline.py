@@ -1,6 +1,16 @@
 import pytest
 import hubcheck
 
+from hchztests.invariants import COUNT_INVARIANTS
+from hchztests.invariants import counts_record
+from hchztests.invariants import format_violations
+from hchztests.invariants import violations
+from hchztests.pagination import validate_pages
+from hchztests.pagination import walk_pages
+from hchztests.perf import ActionTimer
+from hchztests.searchbench import alias_queries
+from hchztests.searchbench import benchmark_queries
+
 
 pytestmark = [ pytest.mark.contribtool,
                pytest.mark.website,
@@ -8,6 +18,22 @@ pytestmark = [ pytest.mark.contribtool,
              ]
 
 
+def instrument_pipeline_page(po):
+    """
+    time the search, filter and pagination actions of a tools
+    pipeline page object.
+    """
+
+    actions = ActionTimer()
+    actions.instrument(po,'search_for')
+    actions.instrument(po,'goto_page_number')
+    actions.instrument(po.form.filteroptions,'filter_by_all')
+    actions.instrument(po.form.footer,'display_limit')
+
+    return actions
+
+
+@pytest.mark.usefixtures('perf_report')
 class TestContribtoolToolsPipeline(hubcheck.testcase.TestCase2):
 
     def setup_method(self,method):
@@ -22,6 +48,14 @@ class TestContribtoolToolsPipeline(hubcheck.testcase.TestCase2):
         self.po = self.catalog.load_pageobject('ToolsPipelinePage')
         self.po.goto_page()
 
+        self.actions = instrument_pipeline_page(self.po)
+
+
+    def teardown_method(self,method):
+
+        self.actions.record(self.perf_report,'pipeline_actions',
+                            test=method.__name__)
+
 
     def test_search_for_by_full_alias(self):
         """
@@ -115,110 +149,19 @@ class TestContribtoolToolsPipeline(hubcheck.testcase.TestCase2):
             + ' actual listed was %s' % (actual_shown)
 
 
-    def validate_caption_pagination_counts(self,
-        current_url,caption_start,caption_end,caption_total,
-        pagination_start,pagination_end,pagination_total):
-
-        assert caption_start == pagination_start, \
-            "while checking caption and pagination counts" \
-            + " on %s, caption_start is not equal to" % (current_url) \
-            + " pagination_start: caption_start  == %s, pagination_start == %s"\
-            % (caption_start,pagination_start)
-
-        assert caption_end == pagination_end, \
-            "while checking caption and pagination counts" \
-            + " on %s, caption_end is not equal to" % (current_url) \
-            + " pagination_end: caption_end  == %s, pagination_end == %s"\
-            % (caption_end,pagination_end)
-
-        assert caption_total == pagination_total, \
-            "while checking caption and pagination counts" \
-            + " on %s, caption_total is not equal to" % (current_url) \
-            + " pagination_total: caption_total  == %s, pagination_total == %s"\
-            % (caption_total,pagination_total)
-
-        assert caption_start <= caption_end, \
-            "while checking caption counts on %s," % (current_url) \
-            + " caption_start > caption_end," \
-            + " caption_start = %s, caption_end = %s" \
-            % (caption_start,caption_end)
-
-        assert caption_start <= caption_total, \
-            "while checking caption counts on %s," % (current_url) \
-            + " caption_start > caption_total," \
-            + " caption_start = %s, caption_total= %s" \
-            % (caption_start,caption_total)
-
-        assert caption_end <= caption_total, \
-            "while checking caption counts on %s," % (current_url) \
-            + " caption_end > caption_total," \
-            + " caption_end = %s, caption_total= %s"\
-            % (caption_end,caption_total)
-
-        assert caption_total >= 0, \
-            "while checking caption counts on %s," % (current_url) \
-            + " caption_total < 0, caption_total= %s" % (caption_total)
-
-        assert caption_start >= 0, \
-            "while checking caption counts on %s," % (current_url) \
-            + " caption_start < 0, caption_start = %s" % (caption_start)
-
-        assert caption_end >= 0, \
-            "while checking caption counts on %s," % (current_url) \
-            + " caption_end < 0, caption_end = %s" % (caption_end)
-
-        assert pagination_start <= pagination_end, \
-            "while checking pagination counts on %s," % (current_url) \
-            + " pagination_start > pagination_end," \
-            + " pagination_start = %s, pagination_end = %s" \
-            % (pagination_start,pagination_end)
-
-        assert pagination_start <= pagination_total, \
-            "while checking pagination counts on %s," % (current_url) \
-            + " pagination_start > pagination_total," \
-            + " pagination_start = %s, pagination_total= %s" \
-            % (pagination_start,pagination_total)
-
-        assert pagination_end <= pagination_total, \
-            "while checking pagination counts on %s," % (current_url) \
-            + " pagination_end > pagination_total," \
-            + " pagination_end = %s, pagination_total= %s"\
-            % (pagination_end,pagination_total)
-
-        assert pagination_total >= 0, \
-            "while checking pagination counts on %s," % (current_url) \
-            + " pagination_total < 0, pagination_total= %s" \
-            % (pagination_total)
-
-        assert pagination_start >= 0, \
-            "while checking pagination counts on %s," % (current_url) \
-            + " pagination_start < 0, pagination_start = %s" \
-            % (pagination_start)
-
-        assert pagination_end >= 0, \
-            "while checking pagination counts on %s," % (current_url) \
-            + " pagination_end < 0, pagination_end = %s" \
-            % (pagination_end)
-
-
     def test_compare_caption_pagination_counts_display_default(self):
         """
         compare caption and footer start, end, and total counts
         """
 
-        current_url = self.po.current_url()
-
-        (caption_start,
-         caption_end,
-         caption_total) = self.po.get_caption_counts()
+        record = counts_record(self.po.current_url(),
+                               self.po.get_caption_counts(),
+                               self.po.get_pagination_counts())
 
-        (pagination_start,
-         pagination_end,
-         pagination_total) = self.po.get_pagination_counts()
+        # check every invariant, reporting all failures at once
+        problems = violations(record,COUNT_INVARIANTS)
 
-        self.validate_caption_pagination_counts (
-            current_url,caption_start,caption_end,caption_total,
-            pagination_start,pagination_end,pagination_total)
+        assert len(problems) == 0, format_violations(record,problems)
 
 
     def test_compare_caption_pagination_counts_display_all(self):
@@ -231,19 +174,14 @@ class TestContribtoolToolsPipeline(hubcheck.testcase.TestCase2):
         new_display_limit = 'All'
         self.po.form.footer.display_limit(new_display_limit)
 
-        current_url = self.po.current_url()
+        record = counts_record(self.po.current_url(),
+                               self.po.get_caption_counts(),
+                               self.po.get_pagination_counts())
 
-        (caption_start,
-         caption_end,
-         caption_total) = self.po.get_caption_counts()
+        # check every invariant, reporting all failures at once
+        problems = violations(record,COUNT_INVARIANTS)
 
-        (pagination_start,
-         pagination_end,
-         pagination_total) = self.po.get_pagination_counts()
-
-        self.validate_caption_pagination_counts (
-            current_url,caption_start,caption_end,caption_total,
-            pagination_start,pagination_end,pagination_total)
+        assert len(problems) == 0, format_violations(record,problems)
 
 
     def test_pagination_current_page(self):
@@ -267,35 +205,15 @@ class TestContribtoolToolsPipeline(hubcheck.testcase.TestCase2):
         if display_limit is not None:
             self.po.form.footer.display_limit(display_limit)
 
-        pagenumbers = self.po.get_link_page_numbers()
+        starturl = self.po.current_url()
 
-        while len(pagenumbers) > 0:
-            page = int(pagenumbers[0])
-            starturl = self.po.current_url()
-
-            # click the link to go to the next page
-            self.po.goto_page_number(page)
-            endurl = self.po.current_url()
-
-            # make sure the page changed
-            assert starturl != endurl, \
-                "clicking the page link for page %s" % (page) \
-                + " did not change pages: starturl = %s," % (starturl) \
-                + " endurl = %s" % (endurl)
-
-            # update the page numbers
-            # generally only a few page numbers surrounding the
-            # current page are shown. as we progress through the
-            # pages, more page numbers become available.
-            if len(pagenumbers) > 1:
-                new_pagenumbers = self.po.get_link_page_numbers()
-                assert len(new_pagenumbers) != 0, \
-                    'retrieving new page numbers failed while evaluating' \
-                    + ' page #%s (%s)' % (page,endurl)
-                pagenumbers = [int(i) \
-                    for i in new_pagenumbers if int(i) > page]
-            else:
-                pagenumbers = []
+        # follow the page links forward, checking each page as it loads
+        count,problems = validate_pages(walk_pages(self.po),
+            fail_fast=pytest.config.getoption("--pagination_fail_fast"))
+
+        assert len(problems) == 0, \
+            "while following the page links of %s" % (starturl) \
+            + " through %s pages:\n%s" % (count,'\n'.join(problems))
 
 
     def test_pagination_relative_links_end(self):
@@ -356,3 +274,57 @@ class TestContribtoolToolsPipeline(hubcheck.testcase.TestCase2):
             % (current_page,firstpage)
 
 
+
+
+@pytest.mark.contribtool_benchmark
+@pytest.mark.usefixtures('perf_report')
+class TestContribtoolPipelineSearchBenchmark(hubcheck.testcase.TestCase2):
+
+    def setup_method(self,method):
+
+        # setup a web browser
+        self.browser.get(self.https_authority)
+
+        self.username,self.password = \
+            self.testdata.find_account_for('toolmanager')
+
+        self.utils.account.login_as(self.username,self.password)
+        self.po = self.catalog.load_pageobject('ToolsPipelinePage')
+        self.po.goto_page()
+
+
+    def test_search_latency(self):
+        """
+        run exact, prefix, substring and no-match alias searches
+        repeatedly and report their latency. the number of times
+        each search runs is set by --pipeline_search_repeat.
+        """
+
+        repeat = pytest.config.getoption("--pipeline_search_repeat")
+
+        (junk,junk,total) = self.po.get_caption_counts()
+
+        aliases = [row.value()['alias']
+                   for row in self.po.form.search_result_rows()]
+
+        assert len(aliases) > 0, \
+            'no tools installed, all searches will fail'
+
+        def results():
+            return [row.value()['alias']
+                    for row in self.po.form.search_result_rows()]
+
+        report = benchmark_queries(self.po.search_for,results,
+                                   alias_queries(aliases[0]),repeat)
+
+        for kind,summary in sorted(report.items()):
+            self.perf_report.record('pipeline_search',kind=kind,
+                tools=total,**summary)
+
+        wrong = dict([(kind,summary['query'])
+                      for kind,summary in report.items()
+                      if summary['wrong'] > 0])
+
+        assert len(wrong) == 0, \
+            "searches on %s returned wrong results" % (self.po.current_url()) \
+            + " for the queries: %s" % (wrong)
@@ -0,0 +1,63 @@
+import pytest
+
+from hchztests.loginload import LoginLoad
+from hchztests.loginload import format_ramp
+from hchztests.loginload import http_login
+
+
+pytestmark = [ pytest.mark.website,
+               pytest.mark.login_load,
+             ]
+
+
+# a login, including the session check, taking longer
+# than this is a failure, like in test_timed_login
+MAX_LOGIN_SECONDS = 30
+
+
+class TestWebsiteLoginLoad(object):
+
+    def test_login_ramp(self,testdata,urls,perf_report):
+        """
+        ramp up the number of concurrent logins with the testdata
+        accounts and check that logins keep working and stay under
+        MAX_LOGIN_SECONDS. the concurrency levels and logins per level
+        are set by --login_load_levels and --login_load_count.
+
+        https://nanohub.org/support/ticket/265286
+        https://nanohub.org/support/ticket/265257
+        """
+
+        levels = [int(l) for l in
+                  pytest.config.getoption("--login_load_levels").split(',')]
+        count = pytest.config.getoption("--login_load_count")
+
+        accounts = []
+        for username in testdata.get_usernames():
+            userdata = testdata.get_userdata_for(username)
+            accounts.append((userdata.username,userdata.password))
+
+        # hubs under test often use self signed certificates
+        def login(username,password):
+            return http_login(urls['https_authority'],username,password,
+                              timeout=MAX_LOGIN_SECONDS*2,verify=False)
+
+        load = LoginLoad(login,accounts)
+        steps = load.ramp(levels,count)
+
+        for step in steps:
+            perf_report.record('login_load',target='hub',**step)
+
+        failed = [s for s in steps if s['errors'] > 0]
+        assert len(failed) == 0, \
+            "logins failed at concurrency %s, first error: %s\n%s" \
+            % ([s['concurrency'] for s in failed],failed[0]['first_error'],
+               format_ramp(steps))
+
+        slow = [s for s in steps
+                if s['latency'].get('p95') > MAX_LOGIN_SECONDS]
+        assert len(slow) == 0, \
+            "95th percentile login took over %d seconds" \
+            % (MAX_LOGIN_SECONDS) \
+            + " at concurrency %s\n%s" \
+            % ([s['concurrency'] for s in slow],format_ramp(steps))
@@ -2,6 +2,7 @@
 
 import sys
 import os
+import hashlib
 import urllib
 import re
 import pytest
@@ -13,6 +14,11 @@ from hubcheck.testcase import TestCase2
 from hubcheck.shell import ContainerManager
 from hubcheck.shell import ToolSession
 
+from hchztests.parallel import run_parallel
+from hchztests.procs import ProcessSnapshot
+from hchztests.sessions import SessionReaper
+from hchztests.staging import Stager
+
 
 pytestmark = [ pytest.mark.website,
                pytest.mark.container,
@@ -62,6 +68,30 @@ class SessionInvokeError(HCException):
     pass
 
 
+# name of the file in the tool directory that records
+# the digests of the installed test tool and invoke script
+PROVISION_MARKER = '.hcprovision'
+
+# tool paths provisioned during this test session,
+# mapped to the contents of their marker file
+_provisioned = {}
+
+
+def _digest(*items):
+    """
+    return a sha1 hex digest of the items
+    """
+
+    h = hashlib.sha1()
+    for item in items:
+        if isinstance(item,unicode):
+            item = item.encode('utf8')
+        h.update(str(item))
+        h.update('\0')
+
+    return h.hexdigest()
+
+
 def setup_tool(shell,tool_name,tool_revision,invoke_script,
                test_program_name,test_program_script):
     """
@@ -71,8 +101,40 @@ def setup_tool(shell,tool_name,tool_revision,invoke_script,
     TEST_PROGRAM_PARAMS_FNAME. users can examine the TEST_PROGRAM_PARAMS_FNAME
     file to compare what was sent to invoke_app with the parameter list the
     tool was executed with.
+
+    provisioning is idempotent. digests of the test program and the invoke
+    script are kept in the PROVISION_MARKER file of the tool directory. the
+    tool directory is only rebuilt when the test program changes and the
+    invoke script is only rewritten when it changes. once a tool has been
+    provisioned in this test session, it is not checked again until the
+    content changes.
     """
 
+    tool_revision_string = "r%s" % (tool_revision)
+    tool_path = "/apps/%s/%s" % (tool_name, tool_revision_string)
+    dev_path = "/apps/%s/dev" % (tool_name)
+    marker_path = "%s/%s" % (tool_path,PROVISION_MARKER)
+
+    tool_digest = _digest(tool_path,dev_path,test_program_name,
+                          test_program_script)
+    invoke_digest = _digest(invoke_script)
+    marker = "%s %s" % (tool_digest,invoke_digest)
+
+    if _provisioned.get(tool_path) == marker:
+        # already provisioned during this session
+        return
+
+    # check what is installed from a previous session
+    installed,es = shell.execute("cat %s" % (marker_path),
+                                 fail_on_exit_code=False)
+    installed = installed.split() if es == 0 else []
+
+    if installed == marker.split():
+        _provisioned[tool_path] = marker
+        return
+
+    rebuild = (installed[:1] != [tool_digest])
+
     # check that the user is in the apps group
     groups,es = shell.execute("echo ${USER} | groups")
     if "apps" not in groups.split():
@@ -85,51 +147,61 @@ def setup_tool(shell,tool_name,tool_revision,invoke_script,
     shell.send('sudo su - apps')
     shell.start_bash_shell()
 
-    tool_revision_string = "r%s" % (tool_revision)
-    tool_path = "/apps/%s/%s" % (tool_name, tool_revision_string)
-    dev_path = "/apps/%s/dev" % (tool_name)
-
-    # setup the new tool's invoke script
-    #    mv %(tool_path)s %(tmp_tool_path)s;
-    # tmp_tool_path = tool_path + ".old"
-    # """ % {'tool_path' : tool_path, 'tmp_tool_path' : tmp_tool_path}
-    script = """
-        rm -rf %(tool_path)s;
-        mkdir %(tool_path)s;
-        rm -f %(dev_path)s;
-        ln -s %(tool_path)s %(dev_path)s;
-        cd %(tool_path)s;
-        mkdir middleware bin;
-    """ % {'tool_path'  : tool_path,
-           'dev_path'   : dev_path}
-
-    commands = script.strip().split('\n')
-    shell.execute(commands)
+    if rebuild:
+        # setup the new tool's directory
+        #    mv %(tool_path)s %(tmp_tool_path)s;
+        # tmp_tool_path = tool_path + ".old"
+        # """ % {'tool_path' : tool_path, 'tmp_tool_path' : tmp_tool_path}
+        script = """
+            rm -rf %(tool_path)s;
+            mkdir %(tool_path)s;
+            rm -f %(dev_path)s;
+            ln -s %(tool_path)s %(dev_path)s;
+            cd %(tool_path)s;
+            mkdir middleware bin;
+        """ % {'tool_path'  : tool_path,
+               'dev_path'   : dev_path}
+
+        commands = script.strip().split('\n')
+        shell.execute(commands)
+
+        # write the test program to disk
+        shell.write_file("bin/%s" % (test_program_name), test_program_script)
+        shell.execute("chmod 755 bin/%s" % (test_program_name))
+    else:
+        shell.execute("cd %s" % (tool_path))
 
     # write the invoke script to disk
     shell.write_file('middleware/invoke', invoke_script)
     shell.execute('chmod 755 middleware/invoke')
 
-    # write the test program to disk
-    shell.write_file("bin/%s" % (test_program_name), test_program_script)
-    shell.execute("chmod 755 bin/%s" % (test_program_name))
+    # record what was installed, last, so a partial
+    # setup is redone the next time around
+    shell.write_file(PROVISION_MARKER, marker)
 
     # exit from apps user
     shell.stop_bash_shell()
     shell.send('exit')
 
+    _provisioned[tool_path] = marker
 
-def setup_datafiles(shell,params_info):
+
+def setup_datafiles(stager,params_info):
     """
-    write the datafiles to disk
+    write the datafiles to disk in one pass through the stager.
+    datafile paths must be inside of the stager's directory.
     build the parameters file
     """
 
+    files = {}
     parameters_text_items = []
     for key,value in params_info.items():
-        shell.write_file(value['path'], value['text'])
+        fname = os.path.relpath(value['path'],stager.directory)
+        files[fname] = (value['text'],0600)
         parameters_text_items.append("%s:%s" % (value['type'],value['path']))
 
+    stager.stage(files)
+
     # generate the parameters file to feed into the url
     parameters_text = '\n'.join(parameters_text_items)
 
@@ -137,16 +209,19 @@ def setup_datafiles(shell,params_info):
 
 
 def launch_tool(https_authority,username,password,browser,catalog,utils,tool_name,
-                tool_revision,parameters_text,add_empty_params=False):
+                tool_revision,parameters_text,add_empty_params=False,login=True):
     """
     launch the test/dev version of a tool to test parameter passing
 
     we launch the test version so we don't have to publish a tool
     just for testing parameter passing.
+
+    set login to False to reuse a browser that is already logged in.
     """
 
     # login to the hub
-    utils.account.login_as(username,password)
+    if login:
+        utils.account.login_as(username,password)
 
     # go to the page to launch the tool
     # with the parameters encoded in the url
@@ -221,17 +296,13 @@ def retrieve_container_parameters(shell):
 
     # figure out what the TOOL_PARAMETERS environment variable is
     # by looking at the command that started the tool session
-    # container.
-    container_cmd,es = shell.execute('ps aux | grep TOOL_PARAMETERS')
-
-    # container_cmd should at least contain the grep
-    # fish out the assignment
-    # if there is no assignment, return an empty string
+    # container. if there is no assignment, return an empty string
 
-    matches = re.search('TOOL_PARAMETERS=([^\s]+)',container_cmd)
+    matches = ProcessSnapshot(shell).search('TOOL_PARAMETERS=([^\s]+)')
 
     if matches:
-        tool_parameters_filename = matches.group(1)
+        process,match = matches[0]
+        tool_parameters_filename = match.group(1)
         parameters_text = shell.read_file(tool_parameters_filename)
 
     return parameters_text
@@ -265,7 +336,7 @@ def shrink_space(data):
     return data
 
 
-def pass_parameters(apps_shell,reg_shell,invoke_script,params_info,
+def pass_parameters(apps_shell,stager,invoke_script,params_info,
                     https_authority,reguser,regpass,browser,catalog,utils):
 
     # as the apps user, setup a fake tool
@@ -274,7 +345,7 @@ def pass_parameters(apps_shell,reg_shell,invoke_script,params_info,
 
     # as the registered user, setup a datafiles that were
     # referenced by parameter passing
-    parameters_text = setup_datafiles(reg_shell,params_info)
+    parameters_text = setup_datafiles(stager,params_info)
 
     # as the registered user, launch the session, passing parameters
     sessnum = launch_tool(https_authority,reguser,regpass,browser,catalog,utils,
@@ -283,14 +354,195 @@ def pass_parameters(apps_shell,reg_shell,invoke_script,params_info,
     return (sessnum,parameters_text)
 
 
+# parameter passing cases for TestParameterPassingUrl. each case is
+# launched through the url with the lines of parameters joined by
+# newlines. %(home_dir)s and %(session_dir)s are filled in from the
+# registered user's workspace.
+#   shrink: compare against shrink_space() of the parameters
+#   error:  exception launch_tool() should raise for bad parameters
+#   hosts:  only run the case on these hubs
+URL_CASES = [
+    {'name'        : 'no_parameters_file',
+     'parameters'  : [''],
+    },
+    {'name'        : 'invalid_path_4',
+     'parameters'  : ['file(datafile1):/bad_home/bad_hubname/fake_user/file_does_not_exist'],
+     'error'       : BadParameterError,
+     'description' : 'invalid path',
+    },
+    {'name'        : 'blacklisted_path_1',
+     'parameters'  : ['file(datafile1):/etc/environ'],
+     'error'       : BadParameterError,
+     'description' : 'blacklisted path',
+    },
+    {'name'        : 'whitelisted_path_1',
+     'parameters'  : ['directory:/nees'],
+     'hosts'       : ['nees.org'],
+    },
+    {'name'        : 'whitelisted_path_2',
+     'parameters'  : ['file:/nees/home/Public.groups/thumb_1235445883_Model-18EP-a.jpg'],
+     'hosts'       : ['nees.org'],
+    },
+    {'name'        : 'whitelisted_path_3',
+     'parameters'  : ['directory:/home/blahh'],
+    },
+    {'name'        : 'home_expansion_1',
+     'parameters'  : ['file(datafile1):~/.icewm/menu'],
+    },
+    {'name'        : 'named_file_1',
+     'parameters'  : ['file(datafile1):%(session_dir)s/resources'],
+    },
+    {'name'        : 'named_file_2',
+     'parameters'  : ['file(datafile1):%(session_dir)s/resources',
+                      'file(datafile2):%(home_dir)s/.icewm/menu'],
+    },
+    {'name'        : 'file_format_1',
+     'parameters'  : ['file(datafile2):%(home_dir)s/.icewm/menu',
+                      ''],
+     'shrink'      : True,
+    },
+    {'name'        : 'file_format_2',
+     'parameters'  : ['file(datafile2):%(home_dir)s/.icewm/menu',
+                      '',
+                      ''],
+     'shrink'      : True,
+    },
+    {'name'        : 'file_format_3',
+     'parameters'  : ['',
+                      '',
+                      'file(datafile2):%(home_dir)s/.icewm/menu',
+                      '',
+                      ''],
+     'shrink'      : True,
+    },
+    {'name'        : 'file_format_4',
+     'parameters'  : ['',
+                      '',
+                      'file(datafile2):%(home_dir)s/.icewm/menu'],
+     'shrink'      : True,
+    },
+    {'name'        : 'file_format_5',
+     'parameters'  : ['file(datafile2):%(home_dir)s/.icewm/menu',
+                      '',
+                      'file(datafile2):%(home_dir)s/.icewm/preferences'],
+    },
+    {'name'        : 'file_format_6',
+     'parameters'  : ['file(datafile2):%(home_dir)s/.icewm/menu',
+                      '',
+                      '',
+                      'file(datafile2):%(home_dir)s/.icewm/preferences'],
+    },
+]
+
+
+class ParameterPassingMatrix(object):
+    """
+    launch the test tool once for each parameter passing case,
+    from a single login, and collect each container's TOOL_PARAMETERS.
+
+    the browser can only launch one tool at a time, so launches are
+    pipelined: up to window sessions are launched back to back, then
+    the TOOL_PARAMETERS files of that batch are read in parallel and
+    the batch of sessions is stopped before the next one is launched.
+    window keeps us under the per-user session limit. windows smaller
+    than 1 are treated as 1.
+    """
+
+    def __init__(self,hubname,https_authority,username,password,
+                 browser,catalog,utils,window=3):
+
+        self.hubname = hubname
+        self.https_authority = https_authority
+        self.username = username
+        self.password = password
+        self.browser = browser
+        self.catalog = catalog
+        self.utils = utils
+        self.window = max(1,window)
+
+
+    def run(self,cases,substitutions):
+        """
+        run the cases, returning a dictionary of results keyed by
+        case name. each result holds the parameters_text sent, the
+        expected and received TOOL_PARAMETERS, and any error raised.
+        """
+
+        reaper = SessionReaper(self.hubname,self.username,self.password)
+
+        # login to the hub once for all of the cases
+        self.utils.account.login_as(self.username,self.password)
+
+        results = {}
+        for i in range(0,len(cases),self.window):
+
+            launched = []
+            for case in cases[i:i+self.window]:
+                result = self._launch(case,substitutions)
+                results[case['name']] = result
+                if result['session_number'] is not None:
+                    reaper.add(result['session_number'])
+                    launched.append(result)
+
+            outcomes = run_parallel(self._collect,launched,
+                                    len(launched) or 1)
+
+            for result,(text,exc_info) in zip(launched,outcomes):
+                if exc_info is not None:
+                    result['error'] = exc_info[1]
+                else:
+                    result['tool_parameters'] = text
+
+            reaper.reap()
+
+        return results
+
+
+    def _launch(self,case,substitutions):
+
+        parameters_text = '\n'.join(case['parameters']) % substitutions
+
+        expected = parameters_text
+        if case.get('shrink',False):
+            expected = shrink_space(parameters_text)
+
+        result = {'case'            : case,
+                  'parameters_text' : parameters_text,
+                  'expected'        : expected,
+                  'session_number'  : None,
+                  'tool_parameters' : None,
+                  'error'           : None}
+
+        try:
+            result['session_number'] = launch_tool(self.https_authority,
+                self.username,self.password,self.browser,self.catalog,
+                self.utils,TOOL_NAME,TOOL_REVISION,parameters_text,
+                login=False)
+        except Exception as e:
+            result['error'] = e
+
+        return result
+
+
+    def _collect(self,result):
+
+        session = ToolSession(host=self.hubname,username=self.username,
+                              password=self.password)
+
+        ws = session.access(session_number=result['session_number'])
+        try:
+            ws.execute('cd $SESSIONDIR')
+            return retrieve_container_parameters(ws)
+        finally:
+            ws.close()
+
+
 @pytest.mark.registereduser
 @pytest.mark.appsuser
 class TestParameterPassingInvokeApp(TestCase2):
 
     def setup_method(self,method):
 
-        self.remove_files = []
-
         # get user account info
         self.reguser,self.regpass = self.testdata.find_account_for('registeredworkspace')
         self.appsuser,self.appspass = self.testdata.find_account_for('appsworkspace')
@@ -316,46 +568,29 @@ class TestParameterPassingInvokeApp(TestCase2):
 
         self.reg_ws.execute('cd $SESSIONDIR')
 
-        # get a list of session open before the test was run
+        # datafiles are staged in a directory of the user's home
+        homedir,es = self.reg_ws.execute('echo ${HOME}')
+        self.stager = Stager(self.reg_ws,homedir)
+
+        # remember the sessions open before the test was run
         # incase the test fails unexpectedly, we can cleanup
-        self.existing_sessions = self.session.get_open_session_detail()
-        self.close_sessions = []
+        self.reaper = SessionReaper(hubname,self.reguser,self.regpass,
+                        pattern=TOOL_NAME)
+        self.reaper.snapshot()
 
     def teardown_method(self,method):
 
+        # remove the datafiles
+        self.stager.cleanup()
+
         # exit the workspace
         # shut down the ssh connection
         self.reg_ws.close()
         self.apps_ws.close()
 
-        # see if we can find any sessions accidentally left open.
-        open_sessions = self.session.get_open_session_detail()
-        open_sessions_numbers = []
-
-        for row in open_sessions.values():
-            open_sessions_numbers.append(row['session_number'])
-            if re.search(TOOL_NAME,row['name']) is not None:
-                # we found an open session that matches the name of our test tool
-                # check if it was open before we started the test.
-                old_session = False
-                for existing_row in self.existing_sessions.values():
-                    if existing_row['session_number'] == row['session_number']:
-                        old_session = True
-                        break
-                if old_session is False:
-                    # we found a session that was not open when the test started
-                    # but is open now. there is a small chance it was opened by
-                    # someone else.
-                    # check if it is already in the list of sessions to be closed,
-                    # if not, add the session to the list
-                    if row['session_number'] not in self.close_sessions:
-                        self.close_sessions.append(row['session_number'])
-
-        # close the parampass tool's container
-        for session_number in self.close_sessions:
-            # check if the session is still open before closing it
-            if session_number in open_sessions_numbers:
-                self.session.stop(session_number)
+        # stop the parampass tool's containers, along with any
+        # sessions of our test tool accidentally left open.
+        self.reaper.reap()
 
         del self.session
 
@@ -377,13 +612,13 @@ class TestParameterPassingInvokeApp(TestCase2):
 
         expected_parameters = ''
 
-        sessnum,parameters_text = pass_parameters(self.apps_ws, self.reg_ws,
+        sessnum,parameters_text = pass_parameters(self.apps_ws, self.stager,
                                       invoke_script, params_info,
                                       self.https_authority, self.reguser,
                                       self.regpass, self.browser,
                                       self.catalog, self.utils)
 
-        self.close_sessions.append(sessnum)
+        self.reaper.add(sessnum)
 
         # log into the tool session container to get the list of parameters
         # passed into the test program. we check that the paramaters were
@@ -419,8 +654,6 @@ class TestParameterPassingInvokeApp(TestCase2):
         to the test program.
         """
 
-        homedir,es = self.reg_ws.execute('echo ${HOME}')
-
         invoke_script = """#!/bin/sh
         %(invoke_app_path)s -C %(test_program)s
         """ % {'invoke_app_path' : INVOKE_APP_PATH,
@@ -430,19 +663,19 @@ class TestParameterPassingInvokeApp(TestCase2):
             'datafile1' : {
                 'text' : 'this is datafile1',
                 'type' : 'file(datafile1)',
-                'path' : "%s/datafile1" % (homedir),
+                'path' : self.stager.path('datafile1'),
             },
         }
 
         expected_parameters = ''
 
-        sessnum,parameters_text = pass_parameters(self.apps_ws, self.reg_ws,
+        sessnum,parameters_text = pass_parameters(self.apps_ws, self.stager,
                                       invoke_script, params_info,
                                       self.https_authority, self.reguser,
                                       self.regpass, self.browser,
                                       self.catalog, self.utils)
 
-        self.close_sessions.append(sessnum)
+        self.reaper.add(sessnum)
 
         # log into the tool session container to get the list of parameters
         # passed into the test program. we check that the paramaters were
@@ -492,13 +725,13 @@ class TestParameterPassingInvokeApp(TestCase2):
 
         expected_parameters = ''
 
-        sessnum,parameters_text = pass_parameters(self.apps_ws, self.reg_ws,
+        sessnum,parameters_text = pass_parameters(self.apps_ws, self.stager,
                                       invoke_script, params_info,
                                       self.https_authority, self.reguser,
                                       self.regpass, self.browser,
                                       self.catalog, self.utils)
 
-        self.close_sessions.append(sessnum)
+        self.reaper.add(sessnum)
 
         # log into the tool session container to get the list of parameters
         # passed into the test program. we check that the paramaters were
@@ -537,8 +770,6 @@ class TestParameterPassingInvokeApp(TestCase2):
         one parameter should be passed to the test program.
         """
 
-        homedir,es = self.reg_ws.execute('echo ${HOME}')
-
         invoke_script = """#!/bin/sh
         %(invoke_app_path)s -C "%(test_program)s @@file(datafile1)" -C %(test_program)s
         """ % {'invoke_app_path' : INVOKE_APP_PATH,
@@ -548,19 +779,19 @@ class TestParameterPassingInvokeApp(TestCase2):
             'datafile1' : {
                 'text' : 'this is datafile1',
                 'type' : 'file(datafile1)',
-                'path' : "%s/datafile1" % (homedir),
+                'path' : self.stager.path('datafile1'),
             },
         }
 
         expected_parameters = params_info['datafile1']['path']
 
-        sessnum,parameters_text = pass_parameters(self.apps_ws, self.reg_ws,
+        sessnum,parameters_text = pass_parameters(self.apps_ws, self.stager,
                                       invoke_script, params_info,
                                       self.https_authority, self.reguser,
                                       self.regpass, self.browser,
                                       self.catalog, self.utils)
 
-        self.close_sessions.append(sessnum)
+        self.reaper.add(sessnum)
 
         # log into the tool session container to get the list of parameters
         # passed into the test program. we check that the paramaters were
@@ -596,8 +827,6 @@ class TestParameterPassingInvokeApp(TestCase2):
         should launch the tool with the templated argument.
         """
 
-        homedir,es = self.reg_ws.execute('echo ${HOME}')
-
         invoke_script = """#!/bin/sh
         %(invoke_app_path)s -C "%(test_program)s @@file(datafile1)"
         """ % {'invoke_app_path' : INVOKE_APP_PATH,
@@ -607,19 +836,19 @@ class TestParameterPassingInvokeApp(TestCase2):
             'datafile1' : {
                 'text' : 'this is datafile1',
                 'type' : 'file(datafile1)',
-                'path' : "%s/datafile1" % (homedir),
+                'path' : self.stager.path('datafile1'),
             },
         }
 
         expected_parameters = params_info['datafile1']['path']
 
-        sessnum,parameters_text = pass_parameters(self.apps_ws, self.reg_ws,
+        sessnum,parameters_text = pass_parameters(self.apps_ws, self.stager,
                                       invoke_script, params_info,
                                       self.https_authority, self.reguser,
                                       self.regpass, self.browser,
                                       self.catalog, self.utils)
 
-        self.close_sessions.append(sessnum)
+        self.reaper.add(sessnum)
 
         # log into the tool session container to get the list of parameters
         # passed into the test program. we check that the paramaters were
@@ -651,6 +880,11 @@ class TestParameterPassingInvokeApp(TestCase2):
 @pytest.mark.appsuser
 class TestParameterPassingUrl(TestCase2):
 
+    # results of running URL_CASES, shared by the tests in this class,
+    # keyed by --repeat iteration so each iteration runs the cases again
+    url_results = {}
+    url_matrix_errors = {}
+
     def setup_method(self,method):
 
         self.remove_files = []
@@ -673,10 +907,11 @@ class TestParameterPassingUrl(TestCase2):
         self.session = ToolSession(
             host=self.hubname, username=self.reguser, password=self.regpass)
 
-        # get a list of session open before the test was run
+        # remember the sessions open before the test was run
         # incase the test fails unexpectedly, we can cleanup
-        self.existing_sessions = self.session.get_open_session_detail()
-        self.close_sessions = []
+        self.reaper = SessionReaper(self.hubname,self.reguser,self.regpass,
+                        pattern=TOOL_NAME)
+        self.reaper.snapshot()
 
     def teardown_method(self,method):
 
@@ -684,65 +919,85 @@ class TestParameterPassingUrl(TestCase2):
         # shut down the ssh connection
         self.reg_ws.close()
 
-        # see if we can find any sessions accidentally left open.
-        open_sessions = self.session.get_open_session_detail()
-        open_sessions_numbers = []
-
-        for row in open_sessions.values():
-            open_sessions_numbers.append(row['session_number'])
-            if re.search(TOOL_NAME,row['name']) is not None:
-                # we found an open session that matches the name of our test tool
-                # check if it was open before we started the test.
-                old_session = False
-                for existing_row in self.existing_sessions.values():
-                    if existing_row['session_number'] == row['session_number']:
-                        old_session = True
-                        break
-                if old_session is False:
-                    # we found a session that was not open when the test started
-                    # but is open now. there is a small chance it was opened by
-                    # someone else.
-                    # check if it is already in the list of sessions to be closed,
-                    # if not, add the session to the list
-                    if row['session_number'] not in self.close_sessions:
-                        self.close_sessions.append(row['session_number'])
-
-        # close the parampass tool's container
-        for session_number in self.close_sessions:
-            # check if the session is still open before closing it
-            if session_number in open_sessions_numbers:
-                self.session.stop(session_number)
+        # stop the parampass tool's containers, along with any
+        # sessions of our test tool accidentally left open.
+        self.reaper.reap()
 
         del self.session
 
 
-    @hubcheck.utils.hub_version(min_version='1.1.4')
-    def test_launch_tool_no_parameters_file(self):
+    def url_case_result(self,name):
         """
-        launch a tool with no parameters argument in url.
+        return the result of the named URL_CASES case. the first call
+        of each --repeat iteration runs every case through a
+        ParameterPassingMatrix.
         """
 
-        parameters_text = ''
+        cls = self.__class__
+        iteration = getattr(self,'repeat_iteration',None)
 
-        sessnum = launch_tool(self.https_authority,self.reguser,self.regpass,
-                    self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
+        if iteration not in cls.url_results \
+           and iteration not in cls.url_matrix_errors:
 
-        self.close_sessions.append(sessnum)
+            home_dir,es = self.reg_ws.execute('echo ${HOME}')
+            session_dir,es = self.reg_ws.execute('echo ${SESSIONDIR}')
 
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
+            cases = [c for c in URL_CASES
+                     if c.get('hosts') is None
+                     or hubcheck.utils.check_hub_hostname(c['hosts'])]
 
-        ws_params_text = retrieve_container_parameters(ws)
+            matrix = ParameterPassingMatrix(self.hubname,
+                        self.https_authority,self.reguser,self.regpass,
+                        self.browser,self.catalog,self.utils,
+                        window=pytest.config.getoption("--parampass_window"))
 
-        ws.close()
+            try:
+                cls.url_results[iteration] = matrix.run(cases,
+                                    {'home_dir'    : home_dir,
+                                     'session_dir' : session_dir})
+            except Exception as e:
+                cls.url_matrix_errors[iteration] = e
+
+        if iteration in cls.url_matrix_errors:
+            raise cls.url_matrix_errors[iteration]
+
+        return cls.url_results[iteration][name]
+
+
+    def check_url_case(self,name):
+        """
+        check the TOOL_PARAMETERS file, or the expected error,
+        of the named URL_CASES case.
+        """
+
+        result = self.url_case_result(name)
+        case = result['case']
+
+        if case.get('error') is not None:
+            assert isinstance(result['error'],case['error']), \
+                "while passing tool parameters, cms failed to" \
+                + " catch %s: %s" \
+                % (case['description'],repr(result['parameters_text']))
+            return
+
+        if result['error'] is not None:
+            raise result['error']
 
         # check that the TOOL_PARAMETERS file has the same info
         # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
+        assert result['expected'] == result['tool_parameters'], \
             "TOOL_PARAMETERS file in container does not match data" \
             + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+            % (repr(result['expected']),repr(result['tool_parameters']))
+
+
+    @hubcheck.utils.hub_version(min_version='1.1.4')
+    def test_launch_tool_no_parameters_file(self):
+        """
+        launch a tool with no parameters argument in url.
+        """
+
+        self.check_url_case('no_parameters_file')
 
 
     @pytest.mark.skipif(True, reason="we no longer do file validation")
@@ -763,7 +1018,7 @@ class TestParameterPassingUrl(TestCase2):
                         self.regpass,self.browser,self.catalog,self.utils,
                         TOOL_NAME,TOOL_REVISION,parameters_text)
 
-            self.close_sessions.append(sessnum)
+            self.reaper.add(sessnum)
 
             assert False, "while passing tool parameters, cms failed to" \
                 + " catch invalid path: %s" % (repr(parameters_text))
@@ -792,7 +1047,7 @@ class TestParameterPassingUrl(TestCase2):
                         self.regpass,self.browser,self.catalog,self.utils,
                         TOOL_NAME,TOOL_REVISION,parameters_text)
 
-            self.close_sessions.append(sessnum)
+            self.reaper.add(sessnum)
 
             assert False, "while passing tool parameters, cms failed to" \
                 + " catch invalid path: %s" % (repr(parameters_text))
@@ -821,7 +1076,7 @@ class TestParameterPassingUrl(TestCase2):
                         self.regpass,self.browser,self.catalog,self.utils,
                         TOOL_NAME,TOOL_REVISION,parameters_text)
 
-            self.close_sessions.append(sessnum)
+            self.reaper.add(sessnum)
 
             assert False, "while passing tool parameters, cms failed to" \
                 + " catch invalid path: %s" % (repr(parameters_text))
@@ -838,22 +1093,7 @@ class TestParameterPassingUrl(TestCase2):
         file(datafile1):/bad_home/bad_hubname/fake_user/file_does_not_exist
         """
 
-        home_dir = os.path.join('/','bad_home','bad_hubname','fake_user')
-
-        parameters_text = 'file(datafile1):%s/file_does_not_exist' % (home_dir)
-
-        try:
-            sessnum = launch_tool(self.https_authority,self.reguser,
-                        self.regpass,self.browser,self.catalog,self.utils,
-                        TOOL_NAME,TOOL_REVISION,parameters_text)
-
-            self.close_sessions.append(sessnum)
-
-            assert False, "while passing tool parameters, cms failed to" \
-                + " catch invalid path: %s" % (repr(parameters_text))
-
-        except BadParameterError as e:
-            pass
+        self.check_url_case('invalid_path_4')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -864,20 +1104,7 @@ class TestParameterPassingUrl(TestCase2):
         file(datafile1):/etc/environ
         """
 
-        parameters_text = 'file(datafile1):/etc/environ'
-
-        try:
-            sessnum = launch_tool(self.https_authority,self.reguser,
-                        self.regpass,self.browser,self.catalog,self.utils,
-                        TOOL_NAME,TOOL_REVISION,parameters_text)
-
-            self.close_sessions.append(sessnum)
-
-            assert False, "while passing tool parameters, cms failed to" \
-                + " catch blacklisted path: %s" % (repr(parameters_text))
-
-        except BadParameterError as e:
-            pass
+        self.check_url_case('blacklisted_path_1')
 
 
     @pytest.mark.skipif(
@@ -891,27 +1118,7 @@ class TestParameterPassingUrl(TestCase2):
         directory:/nees
         """
 
-        parameters_text = 'directory:/nees'
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('whitelisted_path_1')
 
 
     @pytest.mark.skipif(
@@ -925,27 +1132,7 @@ class TestParameterPassingUrl(TestCase2):
         file:/nees/home/Public.groups/thumb_1235445883_Model-18EP-a.jpg
         """
 
-        parameters_text = 'file:/nees/home/Public.groups/thumb_1235445883_Model-18EP-a.jpg'
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('whitelisted_path_2')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -956,27 +1143,7 @@ class TestParameterPassingUrl(TestCase2):
         directory:/home/blahh
         """
 
-        parameters_text = 'directory:/home/blahh'
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('whitelisted_path_3')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -987,27 +1154,7 @@ class TestParameterPassingUrl(TestCase2):
         file(datafile1):~/.icewm/menu
         """
 
-        parameters_text = 'file(datafile1):~/.icewm/menu'
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('home_expansion_1')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1016,29 +1163,7 @@ class TestParameterPassingUrl(TestCase2):
         launch a tool with a single named file parameter in url.
         """
 
-        session_dir,es = self.reg_ws.execute('echo ${SESSIONDIR}')
-
-        parameters_text = 'file(datafile1):%s/resources' % (session_dir)
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('named_file_1')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1048,33 +1173,7 @@ class TestParameterPassingUrl(TestCase2):
         files are located in home directory
         """
 
-        session_dir,es = self.reg_ws.execute('echo ${SESSIONDIR}')
-        home_dir,es = self.reg_ws.execute('echo ${HOME}')
-
-        parameters_text = '\n'.join([
-            'file(datafile1):%s/resources' % (session_dir),
-            'file(datafile2):%s/.icewm/menu' % (home_dir),
-        ])
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('named_file_2')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1085,34 +1184,7 @@ class TestParameterPassingUrl(TestCase2):
         https://nees.org/groups/parampass/wiki/MainPage step 1 (b)
         """
 
-        home_dir,es = self.reg_ws.execute('echo ${HOME}')
-
-        parameters_text = '\n'.join([
-            'file(datafile2):%s/.icewm/menu' % (home_dir),
-            '',
-        ])
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        parameters_text = shrink_space(parameters_text)
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('file_format_1')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1123,35 +1195,7 @@ class TestParameterPassingUrl(TestCase2):
         https://nees.org/groups/parampass/wiki/MainPage step 1 (b)
         """
 
-        home_dir,es = self.reg_ws.execute('echo ${HOME}')
-
-        parameters_text = '\n'.join([
-            'file(datafile2):%s/.icewm/menu' % (home_dir),
-            '',
-            '',
-        ])
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        parameters_text = shrink_space(parameters_text)
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('file_format_2')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1162,37 +1206,7 @@ class TestParameterPassingUrl(TestCase2):
         https://nees.org/groups/parampass/wiki/MainPage step 1 (b)
         """
 
-        home_dir,es = self.reg_ws.execute('echo ${HOME}')
-
-        parameters_text = '\n'.join([
-            '',
-            '',
-            'file(datafile2):%s/.icewm/menu' % (home_dir),
-            '',
-            '',
-        ])
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        parameters_text = shrink_space(parameters_text)
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('file_format_3')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1203,35 +1217,7 @@ class TestParameterPassingUrl(TestCase2):
         https://nees.org/groups/parampass/wiki/MainPage step 1 (b)
         """
 
-        home_dir,es = self.reg_ws.execute('echo ${HOME}')
-
-        parameters_text = '\n'.join([
-            '',
-            '',
-            'file(datafile2):%s/.icewm/menu' % (home_dir),
-        ])
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        parameters_text = shrink_space(parameters_text)
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('file_format_4')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1242,33 +1228,7 @@ class TestParameterPassingUrl(TestCase2):
         https://nees.org/groups/parampass/wiki/MainPage step 1 (b)
         """
 
-        home_dir,es = self.reg_ws.execute('echo ${HOME}')
-
-        parameters_text = '\n'.join([
-            'file(datafile2):%s/.icewm/menu' % (home_dir),
-            '',
-            'file(datafile2):%s/.icewm/preferences' % (home_dir),
-        ])
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
+        self.check_url_case('file_format_5')
 
 
     @hubcheck.utils.hub_version(min_version='1.1.4')
@@ -1279,32 +1239,4 @@ class TestParameterPassingUrl(TestCase2):
         https://nees.org/groups/parampass/wiki/MainPage step 1 (b)
         """
 
-        home_dir,es = self.reg_ws.execute('echo ${HOME}')
-
-        parameters_text = '\n'.join([
-            'file(datafile2):%s/.icewm/menu' % (home_dir),
-            '',
-            '',
-            'file(datafile2):%s/.icewm/preferences' % (home_dir),
-        ])
-
-        sessnum = launch_tool(self.https_authority,self.reguser,
-                    self.regpass,self.browser,self.catalog,self.utils,
-                    TOOL_NAME,TOOL_REVISION,parameters_text)
-
-        self.close_sessions.append(sessnum)
-
-        ws = self.session.access(session_number=sessnum)
-        ws.execute('cd $SESSIONDIR')
-
-        ws_params_text = retrieve_container_parameters(ws)
-
-        ws.close()
-
-        # check that the TOOL_PARAMETERS file has the same info
-        # as out parameters_text variable it was created from
-        assert parameters_text == ws_params_text, \
-            "TOOL_PARAMETERS file in container does not match data" \
-            + " sent through url.\nexpected:\n%s\nreceived:\n%s\n" \
-            % (repr(parameters_text),repr(ws_params_text))
-
+        self.check_url_case('file_format_6')
@@ -5,6 +5,12 @@ import urlparse
 
 from selenium.common.exceptions import TimeoutException
 
+from hchztests.har import cold_page_har
+from hchztests.webprobe import chain_problems
+from hchztests.webprobe import follow_redirects
+from hchztests.webprobe import format_chain
+from hchztests.webprobe import summarize_chain
+
 
 pytestmark = [ pytest.mark.website,
                pytest.mark.redirects,
@@ -14,6 +20,16 @@ pytestmark = [ pytest.mark.website,
              ]
 
 
+# entry url name, url, scheme of the page the redirects should end on
+REDIRECT_ENTRIES = [
+    ('http_root',          '%(http_authority)s/',              None),
+    ('http_login',         '%(http_authority)s/login',         'https'),
+    ('http_register',      '%(http_authority)s/register',      'https'),
+    ('http_administrator', '%(http_authority)s/administrator', 'https'),
+    ('https_root',         '%(https_authority)s/',             None),
+]
+
+
 class TestWebsiteRedirectsHttp(hubcheck.testcase.TestCase2):
 
     def setup_method(self,method):
@@ -42,6 +58,21 @@ class TestWebsiteRedirectsHttp(hubcheck.testcase.TestCase2):
             % (self.http_authority,pprint.pformat(har_entry))
 
 
+    def test_http_uri_page_weight(self,page_weight_guard):
+        """
+        check the weight of the home page, loaded with an empty cache,
+        against the page budget
+        """
+
+        har = cold_page_har(self.browser,self.http_authority)
+
+        problems = page_weight_guard.check('home',har)
+
+        assert len(problems) == 0, \
+            "page weight of %s is over budget:\n%s" \
+            % (self.http_authority,'\n'.join(problems))
+
+
     @pytest.mark.parametrize('linkname', ['login','register'])
     def test_http_link_redirects_to_https(self,linkname):
         """
@@ -140,6 +171,21 @@ class TestWebsiteRedirectsHttps(hubcheck.testcase.TestCase2):
             % (self.https_authority,pprint.pformat(har_entry))
 
 
+    def test_https_uri_page_weight(self,page_weight_guard):
+        """
+        check the weight of the home page, loaded with an empty cache,
+        against the page budget
+        """
+
+        har = cold_page_har(self.browser,self.https_authority)
+
+        problems = page_weight_guard.check('home',har)
+
+        assert len(problems) == 0, \
+            "page weight of %s is over budget:\n%s" \
+            % (self.https_authority,'\n'.join(problems))
+
+
     def test_kb_tips_webdav_has_text_HUBADDRESS(self):
         """
         check that /kb/tips/webdav does not contain the text HUBADDRESS
@@ -181,6 +227,59 @@ class TestWebsiteRedirectsHttps(hubcheck.testcase.TestCase2):
 
 
 
+class TestWebsiteRedirectChains(hubcheck.testcase.TestCase2):
+
+    def setup_method(self,method):
+
+        self.max_redirects = pytest.config.getoption("--max_redirects")
+
+
+    def _check_chain(self,name,url,final_scheme,perf_report):
+
+        # hubs under test often use self signed certificates,
+        # we are measuring the redirects, not checking the certificate
+        chain = follow_redirects(url,max_hops=self.max_redirects+3,
+                                 verify=False)
+
+        summary = summarize_chain(chain)
+        perf_report.record('redirect_chain',entry=name,url=url,**summary)
+
+        problems = chain_problems(chain,self.max_redirects,final_scheme)
+
+        assert len(problems) == 0, \
+            "redirect chain starting at %s:\n%s\nhops:\n%s" \
+            % (url,'\n'.join(problems),format_chain(chain))
+
+
+    @pytest.mark.parametrize('name,url,final_scheme',REDIRECT_ENTRIES)
+    def test_redirect_chain(self,name,url,final_scheme,perf_report):
+        """
+        follow the redirects from an entry url with a plain http client,
+        timing each hop, and check the length of the chain.
+        """
+
+        url = url % {'http_authority'  : self.http_authority,
+                     'https_authority' : self.https_authority}
+
+        self._check_chain(name,url,final_scheme,perf_report)
+
+
+    @pytest.mark.www_prefix
+    @pytest.mark.parametrize('scheme',['http','https'])
+    def test_redirect_chain_www_prefix(self,scheme,perf_report):
+        """
+        follow the redirects from the www prefixed hub uri
+        """
+
+        if scheme == 'http':
+            url = "http://www.%s/" % (self.http_uri)
+        else:
+            url = "https://www.%s/" % (self.https_uri)
+
+        self._check_chain('%s_www' % (scheme),url,None,perf_report)
+
+
+
 
 #test -compare notin \
 #    -tags {website reboot upgrade prod_safe_upgrade} \
@@ -2,6 +2,18 @@ import pytest
 import hubcheck
 import pprint
 
+from hchztests.har import cold_page_har
+from hchztests.invariants import COUNT_INVARIANTS
+from hchztests.invariants import DISPLAY_ALL_INVARIANTS
+from hchztests.invariants import format_violations
+from hchztests.invariants import invariant_names
+from hchztests.invariants import violations
+from hchztests.pagination import validate_pages
+from hchztests.pagination import walk_pages
+from hchztests.tagscale import format_scaling
+from hchztests.tagscale import limit_rows
+from hchztests.tagscale import scaling_exponent
+from hchztests.tagscale import time_display_limits
 
 pytestmark = [ pytest.mark.website,
                pytest.mark.tags,
@@ -191,6 +203,27 @@ class TestTags(hubcheck.testcase.TestCase2):
             + " invalid pagination: %s" % (po.current_url())
 
 
+    def test_tags_content_search_page_weight(self,tag_with_items,
+                                             page_weight_guard):
+        """
+        check the weight of the page a content search for an existing
+        tag leads to, loaded with an empty cache, against the page budget
+        """
+
+        po = self.catalog.load_pageobject('TagsPage')
+        po.goto_page()
+        po.search_for_content([tag_with_items])
+        view_url = po.current_url()
+
+        har = cold_page_har(self.browser,view_url)
+
+        problems = page_weight_guard.check('tags_view',har)
+
+        assert len(problems) == 0, \
+            "page weight of %s is over budget:\n%s" \
+            % (view_url,'\n'.join(problems))
+
+
     def test_tags_tag_search_no_tag(self):
         """
         on /tags, perform a tag search using no tags
@@ -386,314 +419,37 @@ class TestTags(hubcheck.testcase.TestCase2):
 
 class TestTagsBrowseCounts(hubcheck.testcase.TestCase2):
 
-    def test_tags_browse_compare_caption_pagination_start_counts(self,
-        tag_browse_caption_counts,tag_browse_pagination_counts):
-        """
-        on /tags/browse, compare caption and footer start counts
-        """
-
-        self.caption_start = tag_browse_caption_counts['start']
-        self.pagination_start = tag_browse_pagination_counts['start']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_start == self.pagination_start, \
-            "while checking caption and pagination counts" \
-            + "on %s, caption_start is not equal to" % (self.current_url) \
-            + "pagination_start: caption_start  == %s, pagination_start == %s"\
-            % (self.caption_start,self.pagination_start)
-
-
-    def test_tags_browse_compare_caption_pagination_end_counts(self,
-        tag_browse_caption_counts,tag_browse_pagination_counts):
-        """
-        on /tags/browse, compare caption and footer end counts
-        """
-
-        self.caption_end = tag_browse_caption_counts['end']
-        self.pagination_end = tag_browse_pagination_counts['end']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_end == self.pagination_end, \
-            "while checking caption and pagination counts" \
-            + "on %s, caption_end is not equal to" % (self.current_url) \
-            + "pagination_end: caption_end  == %s, pagination_end == %s"\
-            % (self.caption_end,self.pagination_end)
-
-
-    def test_tags_browse_compare_caption_pagination_total_counts(self,
-        tag_browse_caption_counts,tag_browse_pagination_counts):
-        """
-        on /tags/browse, compare caption and footer total counts
-        """
-
-        self.caption_total = tag_browse_caption_counts['total']
-        self.pagination_total = tag_browse_pagination_counts['total']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_total == self.pagination_total, \
-            "while checking caption and pagination counts" \
-            + "on %s, caption_total is not equal to" % (self.current_url) \
-            + "pagination_total: caption_total  == %s, pagination_total == %s"\
-            % (self.caption_total,self.pagination_total)
-
-
-    def test_tags_browse_caption_start_lte_caption_end(self,tag_browse_caption_counts):
-        """
-        on /tags/browse, check caption count start <= end
-        """
-
-        self.caption_start = tag_browse_caption_counts['start']
-        self.caption_end = tag_browse_caption_counts['end']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_start <= self.caption_end, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + "caption_start > caption_end," \
-            + "caption_start = %s, caption_end = %s" \
-            % (self.caption_start,self.caption_end)
-
-
-    def test_tags_browse_caption_start_lte_caption_total(self,tag_browse_caption_counts):
-        """
-        on /tags/browse, check caption count start <= total
-        """
-
-        self.caption_start = tag_browse_caption_counts['start']
-        self.caption_total = tag_browse_caption_counts['total']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_start <= self.caption_total, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + "caption_start > caption_total," \
-            + "caption_start = %s, caption_total= %s" \
-            % (self.caption_start,self.caption_total)
-
-
-    def test_tags_browse_caption_end_lte_caption_total(self,tag_browse_caption_counts):
-        """
-        on /tags/browse, check caption count end <= total
-        """
-
-        self.caption_end = tag_browse_caption_counts['end']
-        self.caption_total = tag_browse_caption_counts['total']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_end <= self.caption_total, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + "caption_end > caption_total," \
-            + "caption_end = %s, caption_total= %s"\
-            % (self.caption_end,self.caption_total)
-
-
-    def test_tags_browse_caption_total_gte_zero(self,tag_browse_caption_counts):
-        """
-        on /tags/browse, check caption count total >= 0
-        """
-
-        self.caption_total = tag_browse_caption_counts['total']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_total >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + "caption_total < 0, caption_total= %s" % (self.caption_total)
-
-
-    def test_tags_browse_caption_start_gte_zero(self,tag_browse_caption_counts):
-        """
-        on /tags/browse, check caption count start >= 0
-        """
-
-        self.caption_start = tag_browse_caption_counts['start']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_start >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + "caption_start < 0, caption_start = %s" % (self.caption_start)
-
-
-    def test_tags_browse_caption_end_gte_zero(self,tag_browse_caption_counts):
-        """
-        on /tags/browse, check caption count end >= 0
-        """
-
-        self.caption_end = tag_browse_caption_counts['end']
-        self.current_url = tag_browse_caption_counts['url']
-
-        assert self.caption_end >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + "caption_end < 0, caption_end = %s" % (self.caption_end)
-
-
-    def test_tags_browse_pagination_start_lte_pagination_end(self,tag_browse_pagination_counts):
-        """
-        on /tags/browse, check pagination count start <= end
-        """
-
-        self.pagination_start = tag_browse_pagination_counts['start']
-        self.pagination_end = tag_browse_pagination_counts['end']
-        self.pagination_url = tag_browse_pagination_counts['url']
-
-        assert self.pagination_start <= self.pagination_end, \
-            "while checking pagination counts on %s," % (self.current_url) \
-            + "pagination_start > pagination_end," \
-            + "pagination_start = %s, pagination_end = %s" \
-            % (self.pagination_start,self.pagination_end)
-
-
-    def test_tags_browse_pagination_start_lte_pagination_total(self,tag_browse_pagination_counts):
-        """
-        on /tags/browse, check pagination count start <= total
-        """
-
-        self.pagination_start = tag_browse_pagination_counts['start']
-        self.pagination_total = tag_browse_pagination_counts['total']
-        self.pagination_url = tag_browse_pagination_counts['url']
-
-        assert self.pagination_start <= self.pagination_total, \
-            "while checking pagination counts on %s," % (self.current_url) \
-            + "pagination_start > pagination_total," \
-            + "pagination_start = %s, pagination_total= %s" \
-            % (self.pagination_start,self.pagination_total)
-
-
-    def test_tags_browse_pagination_end_lte_pagination_total(self,tag_browse_pagination_counts):
-        """
-        on /tags/browse, check pagination count end <= total
-        """
-
-        self.pagination_end = tag_browse_pagination_counts['end']
-        self.pagination_total = tag_browse_pagination_counts['total']
-        self.pagination_url = tag_browse_pagination_counts['url']
-
-        assert self.pagination_end <= self.pagination_total, \
-            "while checking pagination counts on %s," % (self.current_url) \
-            + "pagination_end > pagination_total," \
-            + "pagination_end = %s, pagination_total= %s"\
-            % (self.pagination_end,self.pagination_total)
-
-
-    def test_tags_browse_pagination_total_gte_zero(self,tag_browse_pagination_counts):
-        """
-        on /tags/browse, check pagination count total >= 0
-        """
-
-        self.pagination_total = tag_browse_pagination_counts['total']
-        self.pagination_url = tag_browse_pagination_counts['url']
-
-        assert self.pagination_total >= 0, \
-            "while checking pagination counts on %s," % (self.current_url) \
-            + "pagination_total < 0, pagination_total= %s" \
-            % (self.pagination_total)
-
-
-    def test_tags_browse_pagination_start_gte_zero(self,tag_browse_pagination_counts):
-        """
-        on /tags/browse, check pagination count start >= 0
-        """
-
-        self.pagination_start = tag_browse_pagination_counts['start']
-        self.pagination_url = tag_browse_pagination_counts['url']
-
-        assert self.pagination_start >= 0, \
-            "while checking pagination counts on %s," % (self.current_url) \
-            + "pagination_start < 0, pagination_start = %s" \
-            % (self.pagination_start)
-
-
-    def test_tags_browse_pagination_end_gte_zero(self,tag_browse_pagination_counts):
+    @pytest.mark.parametrize('invariant',
+                             invariant_names(COUNT_INVARIANTS))
+    def test_tags_browse_counts(self,invariant,tag_browse_counts):
         """
-        on /tags/browse, check pagination count end >= 0
+        on /tags/browse, check a relation between the caption and
+        footer counts. the counts are read once for all relations.
         """
 
-        self.pagination_end = tag_browse_pagination_counts['end']
-        self.pagination_url = tag_browse_pagination_counts['url']
+        problems = violations(tag_browse_counts,COUNT_INVARIANTS,[invariant])
 
-        assert self.pagination_end >= 0, \
-            "while checking pagination counts on %s," % (self.current_url) \
-            + " pagination_end < 0, pagination_end = %s" \
-             % (self.pagination_end)
+        assert len(problems) == 0, \
+            format_violations(tag_browse_counts,problems)
 
 
 @hubcheck.utils.hub_version(max_version='1.2.2')
 class TestTagsBrowseCaptionCountsDisplayAll(hubcheck.testcase.TestCase2):
 
-    def test_tags_browse_caption_start_lte_caption_end(self,tag_browse_caption_counts_all):
-        """
-        on /tags/browse, change the display limit to All
-        and check caption start <= end
-        """
-
-        self.caption_start = tag_browse_caption_counts_all['start']
-        self.caption_end = tag_browse_caption_counts_all['end']
-        self.current_url = tag_browse_caption_counts_all['url']
-
-        assert self.caption_start <= self.caption_end, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_start > caption_end," \
-            + " caption_start = %s, caption_end = %s" \
-            % (self.caption_start,self.caption_end)
-
-
-    def test_tags_browse_caption_start_lte_caption_total(self,tag_browse_caption_counts_all):
-        """
-        on /tags/browse, change the display limit to All
-        and check caption start <= total
-        """
-
-        self.caption_start = tag_browse_caption_counts_all['start']
-        self.caption_total = tag_browse_caption_counts_all['total']
-        self.current_url = tag_browse_caption_counts_all['url']
-
-        assert self.caption_start <= self.caption_total, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_start > caption_total," \
-            + " caption_start = %s, caption_total= %s" \
-            % (self.caption_start,self.caption_total)
-
-
-    def test_tags_browse_caption_end_equals_caption_total(self,tag_browse_caption_counts_all):
+    @pytest.mark.parametrize('invariant',
+                             invariant_names(DISPLAY_ALL_INVARIANTS))
+    def test_tags_browse_counts_display_all(self,invariant,
+                                            tag_browse_counts_all):
         """
         on /tags/browse, change the display limit to All
-        and check caption end == total
+        and check a relation between the caption counts
         """
 
-        self.caption_end = tag_browse_caption_counts_all['end']
-        self.caption_total = tag_browse_caption_counts_all['total']
-        self.current_url = tag_browse_caption_counts_all['url']
+        problems = violations(tag_browse_counts_all,
+                              DISPLAY_ALL_INVARIANTS,[invariant])
 
-        assert self.caption_end == self.caption_total, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_end != caption_total," \
-            + " caption_end = %s, caption_total= %s" \
-            % (self.caption_end,self.caption_total)
-
-
-    def test_tags_browse_caption_total_gte_zero(self,tag_browse_caption_counts_all):
-        """
-        on /tags/browse, change the display limit to All
-        and check caption total >= 0
-        """
-
-        self.caption_total = tag_browse_caption_counts_all['total']
-        self.current_url = tag_browse_caption_counts_all['url']
-
-        assert self.caption_total >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_total < 0, caption_total= %s" % (self.caption_total)
-
-
-    def test_tags_browse_caption_start_gte_zero(self,tag_browse_caption_counts_all):
-        """
-        on /tags/browse, change the display limit to All
-        and check caption start >= 0
-        """
-
-        self.caption_start = tag_browse_caption_counts_all['start']
-        self.current_url = tag_browse_caption_counts_all['url']
-
-        assert self.caption_start >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_start < 0, caption_start= %s" % (self.caption_start)
+        assert len(problems) == 0, \
+            format_violations(tag_browse_counts_all,problems)
 
 
     # FIXME:
@@ -728,39 +484,15 @@ class TestTagsBrowsePagination(hubcheck.testcase.TestCase2):
 
         po = self.catalog.load_pageobject('TagsBrowsePage')
         po.goto_page()
-        pagenumbers = po.get_link_page_numbers()
-
-        while len(pagenumbers) > 0:
-            page = int(pagenumbers[0])
-            starturl = po.current_url()
-
-            # click the link to go to the next page
-            po.goto_page_number(page)
-            endurl = po.current_url()
-
-            # make sure the page changed
-            assert starturl != endurl, \
-                "clicking the page link for page %s" % (page) \
-                + " did not change pages: starturl = %s," % (starturl) \
-                + " endurl = %s" % (endurl)
-
-
-            # update the page numbers
-            # generally only a few page numbers surrounding the
-            # current page are shown. as we progress through the
-            # pages, more page numbers become available.
-            if len(pagenumbers) > 1:
-                new_pagenumbers = po.get_link_page_numbers()
-                assert len(new_pagenumbers) != 0, \
-                    'retrieving new page numbers failed while evaluating' \
-                    + ' page #%s (%s)' % (page,endurl)
-                pagenumbers = [int(i) \
-                    for i in new_pagenumbers if int(i) > page]
-            else:
-                pagenumbers = []
+        starturl = po.current_url()
 
+        # follow the page links forward, checking each page as it loads
+        count,problems = validate_pages(walk_pages(po),
+            fail_fast=pytest.config.getoption("--pagination_fail_fast"))
 
-            #FIXME: check the current page number matches page
+        assert len(problems) == 0, \
+            "while following the page links of %s" % (starturl) \
+            + " through %s pages:\n%s" % (count,'\n'.join(problems))
 
 
     def test_tags_browse_pagination_relative_links_end(self):
@@ -1024,31 +756,15 @@ class TestTagsBrowsePage(hubcheck.testcase.TestCase2):
 
         page_url = po.current_url()
 
-        for p in page_numbers:
-            # click the page number link
-            po.goto_page_number(p)
-
-            po2 = self.catalog.load_pageobject('TagsBrowsePage')
-
-            # get the number of items that should be displayed
-            # according to the pagination counts
-            (start,end,total) = po2.get_pagination_counts()
-            num_pag = (end-start+1)
+        # visit the pages linked from the first page by following the
+        # page links forward, instead of going back after each page
+        count,problems = validate_pages(
+            walk_pages(po,max_pages=len(page_numbers)+1),
+            fail_fast=pytest.config.getoption("--pagination_fail_fast"))
 
-            # get the number of items that are actually displayed
-            num_rows = po2.form.search_results.num_rows()
-
-            # compare that is should be displayed to what is displayed
-            assert num_pag == num_rows, \
-                "after clicking page link #%s on %s," % (p,page_url) \
-                + " the number of items displayed does not match the" \
-                + " number of items listed in the pagination counts:" \
-                + " displayed = %s, start = %s," % (num_rows,start) \
-                + " end = %s, end-start+1 (what should be displayed) = %s" \
-                % (end,num_pag)
-
-            # return back to our original page
-            self.browser._browser.back()
+        assert len(problems) == 0, \
+            "while following the page links of %s" % (page_url) \
+            + " through %s pages:\n%s" % (count,'\n'.join(problems))
 
 
     @hubcheck.utils.hub_version(max_version='1.2.2')
@@ -1167,332 +883,37 @@ class TestTagsBrowsePage(hubcheck.testcase.TestCase2):
 @pytest.mark.tags_view_counts
 class TestTagsViewCounts(hubcheck.testcase.TestCase2):
 
-
-    def test_compare_caption_pagination_start_counts(self,
-            tag_view_caption_counts,tag_view_pagination_counts):
-        """
-        on /tags/view, compare caption and footer start counts
-        """
-        self.caption_start = tag_view_caption_counts['start']
-        self.pagination_start = tag_view_pagination_counts['start']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_start == self.pagination_start, \
-            "while checking caption and pagination counts on %s," \
-                % (self.current_url) \
-            + " caption_start is not equal to pagination_start:" \
-            + " caption_start  == %s, pagination_start == %s" \
-                % (self.caption_start,self.pagination_start)
-
-
-    def test_compare_caption_pagination_end_counts(self,
-            tag_view_caption_counts,tag_view_pagination_counts):
-        """
-        on /tags/view, compare caption and footer end counts
-        """
-
-        self.caption_end = tag_view_caption_counts['end']
-        self.pagination_end = tag_view_pagination_counts['end']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_end == self.pagination_end, \
-            "while checking caption and pagination counts on %s," \
-                % (self.current_url) \
-            + " caption_end is not equal to pagination_end:" \
-            + " caption_end  == %s, pagination_end == %s" \
-                % (self.caption_end,self.pagination_end)
-
-
-    def test_compare_caption_pagination_total_counts(self,
-            tag_view_caption_counts,tag_view_pagination_counts):
-        """
-        on /tags/view, compare caption and footer total counts
-        """
-
-        self.caption_total = tag_view_caption_counts['total']
-        self.pagination_total = tag_view_pagination_counts['total']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_total == self.pagination_total, \
-            "while checking caption and pagination counts on %s," \
-                % (self.current_url) \
-            + " caption_total is not equal to pagination_total:" \
-            + " caption_total  == %s, pagination_total == %s" \
-                % (self.caption_total,self.pagination_total)
-
-
-    def test_caption_start_lte_caption_end(self, tag_view_caption_counts):
-        """
-        on /tags/view, check caption count start <= end
-        """
-
-        self.caption_start = tag_view_caption_counts['start']
-        self.caption_end = tag_view_caption_counts['end']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_start <= self.caption_end, \
-            "while checking caption counts on %s," \
-                % (self.current_url) \
-            + " caption_start > caption_end," \
-            + " caption_start = %s, caption_end = %s" \
-                % (self.caption_start,self.caption_end)
-
-
-    def test_caption_start_lte_caption_total(self, tag_view_caption_counts):
-        """
-        on /tags/view, check caption count start <= total
-        """
-
-        self.caption_start = tag_view_caption_counts['start']
-        self.caption_total = tag_view_caption_counts['total']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_start <= self.caption_total, \
-            "while checking caption counts on %s," \
-                % (self.current_url) \
-            + " caption_start > caption_total," \
-            + " caption_start = %s, caption_total= %s" \
-                % (self.caption_start,self.caption_total)
-
-
-    def test_caption_end_lte_caption_total(self, tag_view_caption_counts):
-        """
-        on /tags/view, check caption count end <= total
-        """
-
-        self.caption_end = tag_view_caption_counts['end']
-        self.caption_total = tag_view_caption_counts['total']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_end <= self.caption_total, \
-            "while checking caption counts on %s," \
-                % (self.current_url) \
-            + " caption_end > caption_total," \
-            + " caption_end = %s, caption_total= %s" \
-                % (self.caption_end,self.caption_total)
-
-
-    def test_caption_total_gte_zero(self, tag_view_caption_counts):
-        """
-        on /tags/view, check caption count total >= 0
-        """
-
-        self.caption_total = tag_view_caption_counts['total']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_total >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-             + " caption_total < 0, caption_total= %s" % (self.caption_total)
-
-
-    def test_caption_start_gte_zero(self, tag_view_caption_counts):
-        """
-        on /tags/view, check caption count start >= 0
-        """
-
-        self.caption_start = tag_view_caption_counts['start']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_start >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_start < 0, caption_start = %s" % (self.caption_start)
-
-
-    def test_caption_end_gte_zero(self, tag_view_caption_counts):
-        """
-        on /tags/view, check caption count end >= 0
-        """
-
-        self.caption_end = tag_view_caption_counts['end']
-        self.current_url = tag_view_caption_counts['url']
-
-        assert self.caption_end >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_end < 0, caption_end = %s" % (self.caption_end)
-
-
-    def test_pagination_start_lte_pagination_end(self,tag_view_pagination_counts):
-        """
-        on /tags/view, check pagination count start <= end
-        """
-
-        self.pagination_start = tag_view_pagination_counts['start']
-        self.pagination_end = tag_view_pagination_counts['end']
-        self.current_url = tag_view_pagination_counts['url']
-
-        assert self.pagination_start <= self.pagination_end, \
-            "while checking pagination counts on %s," \
-                % (self.current_url) \
-            + " pagination_start > pagination_end," \
-            + " pagination_start = %s, pagination_end = %s" \
-                % (self.pagination_start,self.pagination_end)
-
-
-    def test_pagination_start_lte_pagination_total(self,tag_view_pagination_counts):
-        """
-        on /tags/view, check pagination count start <= total
-        """
-
-        self.pagination_start = tag_view_pagination_counts['start']
-        self.pagination_total = tag_view_pagination_counts['total']
-        self.current_url = tag_view_pagination_counts['url']
-
-        assert self.pagination_start <= self.pagination_total, \
-            "while checking pagination counts on %s," \
-                % (self.current_url) \
-            + " pagination_start > pagination_total," \
-            + " pagination_start = %s, pagination_total= %s"\
-                % (self.pagination_start,self.pagination_total)
-
-
-    def test_pagination_end_lte_pagination_total(self,tag_view_pagination_counts):
-        """
-        on /tags/view, check pagination count end <= total
-        """
-
-        self.pagination_end = tag_view_pagination_counts['end']
-        self.pagination_total = tag_view_pagination_counts['total']
-        self.current_url = tag_view_pagination_counts['url']
-
-        assert self.pagination_end <= self.pagination_total, \
-            "while checking pagination counts on %s," \
-                % (self.current_url) \
-            + " pagination_end > pagination_total," \
-            + " pagination_end = %s, pagination_total= %s" \
-                % (self.pagination_end,self.pagination_total)
-
-
-    def test_pagination_total_gte_zero(self,tag_view_pagination_counts):
-        """
-        on /tags/view, check pagination count total >= 0
-        """
-
-        self.pagination_total = tag_view_pagination_counts['total']
-        self.current_url = tag_view_pagination_counts['url']
-
-        assert self.pagination_total >= 0, \
-            "while checking pagination counts on %s," \
-                % (self.current_url) \
-            + " pagination_total < 0, pagination_total= %s" \
-                % (self.pagination_total)
-
-
-    def test_pagination_start_gte_zero(self,tag_view_pagination_counts):
-        """
-        on /tags/view, check pagination count start >= 0
-        """
-
-        self.pagination_start = tag_view_pagination_counts['start']
-        self.current_url = tag_view_pagination_counts['url']
-
-        assert self.pagination_start >= 0, \
-            "while checking pagination counts on %s," \
-                % (self.current_url) \
-            + " pagination_start < 0, pagination_start = %s" \
-                % (self.pagination_start)
-
-
-    def test_pagination_end_gte_zero(self,tag_view_pagination_counts):
+    @pytest.mark.parametrize('invariant',
+                             invariant_names(COUNT_INVARIANTS))
+    def test_tags_view_counts(self,invariant,tag_view_counts):
         """
-        on /tags/view, check caption count end >= 0
+        on /tags/view, check a relation between the caption and
+        footer counts. the counts are read once for all relations.
         """
 
-        self.pagination_end = tag_view_pagination_counts['end']
-        self.current_url = tag_view_pagination_counts['url']
+        problems = violations(tag_view_counts,COUNT_INVARIANTS,[invariant])
 
-        assert self.pagination_end >= 0, \
-            "while checking pagination counts on %s," \
-                % (self.current_url) \
-            + " pagination_end < 0, pagination_end = %s" \
-                % (self.pagination_end)
+        assert len(problems) == 0, \
+            format_violations(tag_view_counts,problems)
 
 
 @hubcheck.utils.hub_version(max_version='1.2.2')
 class TestTagsViewCaptionCountsDisplayAll(hubcheck.testcase.TestCase2):
 
-
-    def test_tags_view_caption_start_lte_caption_end(self,tag_view_caption_counts_all):
-        """
-        on /tags/view, change the display limit to All and
-        check caption counts start <= end
-        """
-
-        self.caption_start = tag_view_caption_counts_all['start']
-        self.caption_end = tag_view_caption_counts_all['end']
-        self.current_url = tag_view_caption_counts_all['url']
-
-        assert self.caption_start <= self.caption_end, \
-            "while checking caption counts on %s," \
-                % (self.current_url) \
-            + " caption_start > caption_end," \
-            + " caption_start = %s, caption_end = %s" \
-                 % (self.caption_start,self.caption_end)
-
-
-    def test_tags_view_caption_start_lte_caption_total(self,tag_view_caption_counts_all):
-        """
-        on /tags/view, change the display limit to All and
-        check caption counts start <= total
-        """
-
-        self.caption_start = tag_view_caption_counts_all['start']
-        self.caption_total = tag_view_caption_counts_all['total']
-        self.current_url = tag_view_caption_counts_all['url']
-
-        assert self.caption_start <= self.caption_total, \
-            "while checking caption counts on %s," \
-                % (self.current_url) \
-            + " caption_start > caption_total," \
-            + " caption_start = %s, caption_total= %s" \
-                % (self.caption_start,self.caption_total)
-
-
-    def test_tags_view_caption_end_equals_caption_total(self,tag_view_caption_counts_all):
-        """
-        on /tags/view, change the display limit to All and
-        check caption counts end == total
-        """
-
-        self.caption_end = tag_view_caption_counts_all['end']
-        self.caption_total = tag_view_caption_counts_all['total']
-        self.current_url = tag_view_caption_counts_all['url']
-
-        assert self.caption_end == self.caption_total, \
-            "while checking caption counts on %s," \
-                % (self.current_url) \
-            + " caption_end != caption_total," \
-            + " caption_end = %s, caption_total= %s" \
-                % (self.caption_end,self.caption_total)
-
-
-    def test_tags_view_caption_total_gte_zero(self,tag_view_caption_counts_all):
-        """
-        on /tags/view, change the display limit to All and
-        check caption counts total >= 0
-        """
-
-        self.caption_total = tag_view_caption_counts_all['total']
-        self.current_url = tag_view_caption_counts_all['url']
-
-        assert self.caption_total >= 0, \
-            "while checking caption counts on %s," % (self.current_url) \
-            + " caption_total < 0, caption_total= %s" % (self.caption_total)
-
-
-    def test_tags_view_caption_start_gte_zero(self,tag_view_caption_counts_all):
+    @pytest.mark.parametrize('invariant',
+                             invariant_names(DISPLAY_ALL_INVARIANTS))
+    def test_tags_view_counts_display_all(self,invariant,
+                                          tag_view_counts_all):
         """
-        on /tags/view, change the display limit to All and
-        check caption counts start >= 0
+        on /tags/view, change the display limit to All
+        and check a relation between the caption counts
         """
 
-        self.caption_start = tag_view_caption_counts_all['start']
-        self.current_url = tag_view_caption_counts_all['url']
+        problems = violations(tag_view_counts_all,
+                              DISPLAY_ALL_INVARIANTS,[invariant])
 
-        assert self.caption_start >= 0, \
-            "while checking caption counts on %s," \
-                % (self.current_url) \
-            + " caption_start < 0, caption_start= %s" \
-                % (self.caption_total)
+        assert len(problems) == 0, \
+            format_violations(tag_view_counts_all,problems)
 
 
 class TestTagsViewPagination(hubcheck.testcase.TestCase2):
@@ -1537,17 +958,15 @@ class TestTagsViewPagination(hubcheck.testcase.TestCase2):
         po = self.catalog.load_pageobject('TagsViewPage')
 
         pagenumbers = po.get_link_page_numbers()
+        starturl = po.current_url()
 
-        for page in pagenumbers:
-            starturl = po.current_url()
-            po.goto_page_number(page)
-            endurl = po.current_url()
-            assert starturl != endurl, \
-                "clicking the page link for page %s" % (page) \
-                + " did not change pages:" \
-                + " starturl = %s, endurl = %s" % (starturl,endurl)
+        count,problems = validate_pages(
+            walk_pages(po,max_pages=len(pagenumbers)+1),
+            fail_fast=pytest.config.getoption("--pagination_fail_fast"))
 
-            #FIXME: check the current page number matches page
+        assert len(problems) == 0, \
+            "while following the page links of %s" % (starturl) \
+            + " through %s pages:\n%s" % (count,'\n'.join(problems))
 
 
     def test_tags_view_pagination_relative_links_end(self,tag_with_items):
@@ -1850,33 +1269,15 @@ class TestTagsViewPagination(hubcheck.testcase.TestCase2):
 
         page_url = po.current_url()
 
-        for p in page_numbers:
-            # click the page number link
-            po.goto_page_number(p)
-
-            po2 = self.catalog.load_pageobject('TagsViewPage')
-
-            # get the number of items that should be displayed
-            # according to the pagination counts
-            (start,end,total) = po2.get_pagination_counts()
-            num_pag = (end-start+1)
-
-            # get the number of items that are actually displayed
-            num_rows = po2.form.search_results.num_rows()
+        # visit the pages linked from the first page by following the
+        # page links forward, instead of going back after each page
+        count,problems = validate_pages(
+            walk_pages(po,max_pages=len(page_numbers)+1),
+            fail_fast=pytest.config.getoption("--pagination_fail_fast"))
 
-            # compare that is should be displayed to what is displayed
-            assert num_pag == num_rows, \
-                "after clicking page link #%s on %s," \
-                    % (p,page_url) \
-                + " the number of items displayed does not match the" \
-                + " number of items listed in the pagination counts:" \
-                + " displayed = %s, start = %s, end = %s," \
-                    % (num_rows,start,end) \
-                + " end-start+1 (what should be displayed) = %s" \
-                    % (num_pag)
-
-            # return back to our original page
-            self.browser._browser.back()
+        assert len(problems) == 0, \
+            "while following the page links of %s" % (page_url) \
+            + " through %s pages:\n%s" % (count,'\n'.join(problems))
 
 
     @hubcheck.utils.hub_version(max_version='1.2.2')
@@ -1915,3 +1316,72 @@ class TestTagsViewPagination(hubcheck.testcase.TestCase2):
             + " after setting display limit to %s," % (new_display_limit) \
             + " the following link page numbers are still available: %s" \
                 % (page_numbers)
+
+
+@pytest.mark.tags_scaling
+class TestTagsDisplayLimitScaling(hubcheck.testcase.TestCase2):
+
+    def setup_method(self,method):
+
+        self.browser.get(self.https_authority)
+
+
+    def _check_scaling(self,page,po,load,perf_report):
+
+        def extract():
+            return [row.value() for row in po.search_result_rows()]
+
+        results = time_display_limits(load,extract)
+
+        (start,end,total) = po.get_caption_counts()
+
+        for r in results:
+            perf_report.record('tags_scaling',target='hub',page=page,
+                total=total,extractor='pageobject',**r)
+
+        perf_report.record('tags_scaling_exponent',target='hub',page=page,
+            total=total,
+            load=scaling_exponent(results,'load_time'),
+            extract=scaling_exponent(results,'extract_time'))
+
+        for r in results:
+            expected = limit_rows(r['display_limit'],total)
+            assert r['rows'] == expected, \
+                "on %s, with display limit %s," % (page,r['display_limit']) \
+                + " %d rows were extracted, expected %d\n%s" \
+                % (r['rows'],expected,format_scaling(results))
+
+
+    def test_tags_browse_display_limit_scaling(self,perf_report):
+        """
+        on /tags/browse, time loading the page and extracting its rows
+        at each display limit, to see how both grow with the tag count
+        """
+
+        po = self.catalog.load_pageobject('TagsBrowsePage')
+
+        def load(display_limit):
+            po.goto_page()
+            po.form.footer.display_limit(display_limit)
+
+        self._check_scaling('tags_browse',po,load,perf_report)
+
+
+    def test_tags_view_display_limit_scaling(self,tag_with_items,perf_report):
+        """
+        on /tags/view, time loading the page and extracting its rows
+        at each display limit, to see how both grow with the item count
+        """
+
+        po = self.catalog.load_pageobject('TagsPage')
+        po.goto_page()
+        po.search_for_content([tag_with_items])
+
+        po = self.catalog.load_pageobject('TagsViewPage')
+        view_url = po.current_url()
+
+        def load(display_limit):
+            self.browser.get(view_url)
+            po.form.footer.display_limit(display_limit)
+
+        self._check_scaling('tags_view',po,load,perf_report)
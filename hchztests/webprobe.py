@@ -0,0 +1,412 @@
+import httplib
+import os
+import socket
+import ssl
+import subprocess
+import tempfile
+import time
+import urlparse
+import zlib
+
+from hchztests.perf import summarize
+
+
+REDIRECT_STATUSES = [301,302,303,307,308]
+
+
+def _ssl_context(verify):
+
+    if verify:
+        return ssl.create_default_context()
+    return ssl._create_unverified_context()
+
+
+def _split_url(url):
+
+    parts = urlparse.urlsplit(url)
+    https = parts.scheme == 'https'
+    port = parts.port or (443 if https else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    return (https,parts.hostname,port,path)
+
+
+def request_hop(url,timeout=10,verify=True,method='GET'):
+    """
+    request url once, without following redirects, timing each step.
+
+    returns a dictionary with the url, status, Location header and the
+    seconds spent connecting, in the tls handshake, waiting for the
+    response headers and in total. if the request fails, error holds
+    the exception.
+    """
+
+    https,host,port,path = _split_url(url)
+
+    hop = {'url'           : url,
+           'status'        : None,
+           'location'      : None,
+           'connect_time'  : None,
+           'tls_time'      : None,
+           'response_time' : None,
+           'total_time'    : None,
+           'error'         : None}
+
+    start = time.time()
+    sock = None
+    try:
+        sock = socket.create_connection((host,port),timeout)
+        connected = time.time()
+        hop['connect_time'] = connected - start
+
+        if https:
+            sock = _ssl_context(verify).wrap_socket(sock,
+                                                    server_hostname=host)
+            hop['tls_time'] = time.time() - connected
+
+        if https:
+            conn = httplib.HTTPSConnection(host,port,timeout=timeout)
+        else:
+            conn = httplib.HTTPConnection(host,port,timeout=timeout)
+        conn.sock = sock
+
+        sent = time.time()
+        conn.request(method,path,headers={'Connection' : 'close'})
+        response = conn.getresponse()
+        hop['response_time'] = time.time() - sent
+
+        hop['status'] = response.status
+        location = response.getheader('location')
+        if location is not None:
+            hop['location'] = urlparse.urljoin(url,location)
+        response.close()
+    except (socket.error,ssl.SSLError,httplib.HTTPException) as e:
+        hop['error'] = e
+    finally:
+        if sock is not None:
+            sock.close()
+        hop['total_time'] = time.time() - start
+
+    return hop
+
+
+def follow_redirects(url,max_hops=10,timeout=10,verify=True):
+    """
+    follow the redirects starting at url with request_hop(), returning
+    the list of hops. stops at the first response that is not a
+    redirect, at a failed request, at a redirect loop or after max_hops
+    requests.
+    """
+
+    chain = []
+    seen = set()
+
+    while len(chain) < max_hops:
+        hop = request_hop(url,timeout,verify)
+        chain.append(hop)
+        seen.add(url)
+
+        if hop['error'] is not None \
+           or hop['status'] not in REDIRECT_STATUSES \
+           or hop['location'] is None \
+           or hop['location'] in seen:
+            break
+
+        url = hop['location']
+
+    return chain
+
+
+def summarize_chain(chain):
+    """
+    describe a redirect chain by its number of redirects, final url
+    and status, and the total and tls handshake time of all hops.
+    """
+
+    final = chain[-1]
+
+    return {'redirects'    : len([h for h in chain
+                                  if h['status'] in REDIRECT_STATUSES]),
+            'final_url'    : final['url'],
+            'final_status' : final['status'],
+            'total_time'   : sum([h['total_time'] for h in chain]),
+            'tls_time'     : sum([h['tls_time'] for h in chain
+                                  if h['tls_time'] is not None])}
+
+
+def chain_problems(chain,max_redirects=2,final_scheme=None):
+    """
+    return a list of problems with a redirect chain: failed requests,
+    redirect loops, chains with more than max_redirects redirects, and
+    chains that do not end on a final_scheme page.
+    """
+
+    problems = []
+    final = chain[-1]
+
+    if final['error'] is not None:
+        problems.append('request for %s failed: %s'
+                        % (final['url'],final['error']))
+    elif final['status'] in REDIRECT_STATUSES:
+        problems.append('redirects did not end after %d requests,'
+                        % (len(chain))
+                        + ' last redirect was to %s' % (final['location']))
+
+    redirects = summarize_chain(chain)['redirects']
+    if redirects > max_redirects:
+        problems.append('%d redirects, more than %d: %s'
+                        % (redirects,max_redirects,
+                           ' -> '.join([h['url'] for h in chain])))
+
+    if final_scheme is not None:
+        scheme = urlparse.urlsplit(final['url']).scheme
+        if scheme != final_scheme:
+            problems.append('chain ends on %s, expected scheme %s'
+                            % (final['url'],final_scheme))
+
+    return problems
+
+
+def format_chain(chain):
+    """
+    format the hops of a redirect chain, one per line
+    """
+
+    def ms(value):
+        if value is None:
+            return '-'
+        return '%.0fms' % (value*1000)
+
+    lines = []
+    for h in chain:
+        lines.append('%s %s connect=%s tls=%s response=%s%s'
+            % (h['status'] or 'ERR',h['url'],ms(h['connect_time']),
+               ms(h['tls_time']),ms(h['response_time']),
+               ' -> %s' % (h['location']) if h['location'] else ''))
+    return '\n'.join(lines)
+
+
+class _TimedHTTPSConnection(httplib.HTTPSConnection):
+    """
+    an https connection that keeps the time spent opening each of
+    its connections, including the tls handshake.
+    """
+
+    def __init__(self,host,port,timeout,context):
+
+        httplib.HTTPSConnection.__init__(self,host,port,timeout=timeout,
+                                         context=context)
+        self.connect_times = []
+
+
+    def connect(self):
+
+        start = time.time()
+        httplib.HTTPSConnection.connect(self)
+        self.connect_times.append(time.time()-start)
+
+
+class _TimedHTTPConnection(httplib.HTTPConnection):
+
+    def __init__(self,host,port,timeout,context=None):
+
+        httplib.HTTPConnection.__init__(self,host,port,timeout=timeout)
+        self.connect_times = []
+
+
+    def connect(self):
+
+        start = time.time()
+        httplib.HTTPConnection.connect(self)
+        self.connect_times.append(time.time()-start)
+
+
+def check_keepalive(url,requests=5,timeout=10,verify=True):
+    """
+    make several requests for url, one after the other, on one http/1.1
+    connection and count the connections the client had to open.
+
+    returns the number of requests and connections, the median time
+    of requests that opened a new connection and of those that reused
+    one, and the connection setup time saved by the reuse.
+    """
+
+    https,host,port,path = _split_url(url)
+
+    if https:
+        conn = _TimedHTTPSConnection(host,port,timeout,_ssl_context(verify))
+    else:
+        conn = _TimedHTTPConnection(host,port,timeout)
+
+    new_times = []
+    reused_times = []
+    statuses = []
+
+    try:
+        for i in range(requests):
+            opened = len(conn.connect_times)
+            start = time.time()
+            conn.request('GET',path)
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.time() - start
+            statuses.append(response.status)
+
+            if len(conn.connect_times) > opened:
+                new_times.append(elapsed)
+            else:
+                reused_times.append(elapsed)
+    finally:
+        conn.close()
+
+    connections = len(conn.connect_times)
+    setup = summarize(conn.connect_times)
+
+    return {'requests'        : requests,
+            'connections'     : connections,
+            'statuses'        : statuses,
+            'new_median'      : summarize(new_times).get('median'),
+            'reused_median'   : summarize(reused_times).get('median'),
+            'setup_median'    : setup.get('median'),
+            'setup_saved'     : (requests-connections)
+                                * (setup.get('median') or 0)}
+
+
+def check_http2(url,timeout=10,verify=True):
+    """
+    check if the server at url offers http/2 through alpn during
+    the tls handshake. returns the negotiated protocol and the time
+    of the handshake.
+    """
+
+    https,host,port,path = _split_url(url)
+
+    context = _ssl_context(verify)
+    context.set_alpn_protocols(['h2','http/1.1'])
+
+    sock = socket.create_connection((host,port),timeout)
+    try:
+        start = time.time()
+        sock = context.wrap_socket(sock,server_hostname=host)
+        handshake = time.time() - start
+        protocol = sock.selected_alpn_protocol()
+    finally:
+        sock.close()
+
+    return {'protocol'  : protocol,
+            'http2'     : protocol == 'h2',
+            'handshake' : handshake}
+
+
+def check_compression(url,timeout=10,verify=True,
+                      accept_encoding='gzip, deflate'):
+    """
+    request url offering compressed content and compare the bytes
+    transferred with the size of the content.
+    """
+
+    https,host,port,path = _split_url(url)
+
+    if https:
+        conn = httplib.HTTPSConnection(host,port,timeout=timeout,
+                                       context=_ssl_context(verify))
+    else:
+        conn = httplib.HTTPConnection(host,port,timeout=timeout)
+
+    try:
+        conn.request('GET',path,headers={'Accept-Encoding' : accept_encoding})
+        response = conn.getresponse()
+        body = response.read()
+        encoding = (response.getheader('content-encoding') or '').lower()
+        vary = response.getheader('vary') or ''
+    finally:
+        conn.close()
+
+    size = len(body)
+    if encoding == 'gzip':
+        size = len(zlib.decompress(body,16+zlib.MAX_WBITS))
+    elif encoding == 'deflate':
+        try:
+            size = len(zlib.decompress(body))
+        except zlib.error:
+            # raw deflate data, without the zlib header
+            size = len(zlib.decompress(body,-zlib.MAX_WBITS))
+    elif encoding not in ['','identity']:
+        # an encoding we cannot decode
+        size = None
+
+    ratio = None
+    if size:
+        ratio = len(body) / float(size)
+
+    return {'status'      : response.status,
+            'encoding'    : encoding,
+            'vary'        : vary,
+            'transferred' : len(body),
+            'size'        : size,
+            'ratio'       : ratio}
+
+
+def _openssl_client(host,port,args,wait=0,timeout=10):
+    """
+    run openssl s_client against host and port, returning its output
+    and how long it ran. wait is the number of seconds to keep the
+    connection open, to receive tls 1.3 session tickets.
+    """
+
+    command = ['openssl','s_client','-connect','%s:%s' % (host,port),
+               '-servername',host] + args
+
+    start = time.time()
+    p = subprocess.Popen(command,stdin=subprocess.PIPE,
+                         stdout=subprocess.PIPE,stderr=subprocess.STDOUT)
+    if wait > 0:
+        time.sleep(wait)
+    output = p.communicate('')[0]
+    elapsed = time.time() - start
+
+    return (output,elapsed)
+
+
+def check_tls_resumption(url,ticket_wait=0.5):
+    """
+    check if the server at url resumes tls sessions, using the openssl
+    command line client. a session is saved from one connection and
+    offered on the next, and the time of a resumed handshake is
+    compared with the time of a full one.
+
+    returns None if the openssl command is not available.
+    """
+
+    https,host,port,path = _split_url(url)
+
+    fd,session_fn = tempfile.mkstemp(suffix='.pem')
+    os.close(fd)
+
+    try:
+        try:
+            _openssl_client(host,port,['-sess_out',session_fn],ticket_wait)
+        except OSError:
+            return None
+
+        output,full_time = _openssl_client(host,port,[])
+        output,resumed_time = _openssl_client(host,port,
+                                              ['-sess_in',session_fn])
+    finally:
+        os.remove(session_fn)
+
+    resumed = False
+    protocol = None
+    for line in output.splitlines():
+        if line.startswith('Reused,'):
+            resumed = True
+        if line.startswith('Reused,') or line.startswith('New,'):
+            protocol = line.split(',')[1].strip()
+
+    return {'resumed'      : resumed,
+            'protocol'     : protocol,
+            'full_time'    : full_time,
+            'resumed_time' : resumed_time,
+            'time_saved'   : full_time - resumed_time}